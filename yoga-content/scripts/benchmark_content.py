@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк скриптов контента на синтетических каталогах разного размера
+Замеряет импорт, генерацию индексов, валидацию и превью, результаты пишутся в JSON
+Использование: python benchmark_content.py --sizes 100,1000,10000 --output bench.json --baseline prev.json
+"""
+
+import io
+import os
+import sys
+import json
+import shutil
+import argparse
+import platform
+import tempfile
+import contextlib
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from generate_thumbnails import ThumbnailGenerator
+from import_lessons import LessonImporter
+from synthetic_catalog import SyntheticCatalog, generate_catalog
+from validate_content import ContentValidator
+
+
+RESULTS_VERSION = 1
+# Этапы, которые можно пропустить через --skip (импорт нужен всем остальным)
+OPTIONAL_STAGES = ('thumbnails', 'index', 'validate')
+ROOT_DIR = Path(__file__).parent.parent
+
+
+def timed(run: Callable[[], Optional[Dict]]) -> Dict:
+    """Замер одного этапа: вывод скрипта подавляется, к результату добавляется время"""
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        details = run() or {}
+    return dict(seconds=round(time.perf_counter() - started, 4), **details)
+
+
+class ContentBenchmark:
+    """Прогон этапов сборки контента на одном синтетическом каталоге"""
+    
+    def __init__(self, catalog: SyntheticCatalog, schemas_dir: Path, templates_dir: Path,
+                 jobs: int, link_mode: str):
+        self.catalog = catalog
+        self.schemas_dir = schemas_dir
+        self.templates_dir = templates_dir
+        self.jobs = jobs
+        self.link_mode = link_mode
+    
+    def importer(self) -> LessonImporter:
+        return LessonImporter(
+            source_dir=str(self.catalog.source_dir),
+            output_dir=str(self.catalog.lessons_dir),
+            schema_path=str(self.schemas_dir / "lesson.schema.json"),
+            link_mode=self.link_mode,
+            templates_dir=str(self.templates_dir)
+        )
+    
+    def run_import(self) -> Dict:
+        lessons_config = self.catalog.load_config()
+        self.importer().batch_import(lessons_config, jobs=self.jobs, restart=True)
+        imported = sum(1 for path in self.catalog.lessons_dir.iterdir() if path.is_dir())
+        return {"imported": imported, "failed": len(lessons_config) - imported}
+    
+    def run_thumbnails(self) -> Dict:
+        generator = ThumbnailGenerator(lessons_dir=str(self.catalog.lessons_dir), jobs=self.jobs)
+        generator.process_all_lessons()
+        return {"created": generator.success_count, "failed": generator.failed_count}
+    
+    def run_program_thumbnails(self) -> Dict:
+        generator = ThumbnailGenerator(lessons_dir=str(self.catalog.lessons_dir), jobs=self.jobs)
+        generator.generate_program_thumbnails(self.catalog.programs_dir)
+        return {}
+    
+    def run_index(self) -> Dict:
+        """Индекс уроков, индексы фильтров, поиска и похожих уроков, каталог для приложения"""
+        importer = self.importer()
+        entries = importer.generate_index()
+        importer.generate_query_index(entries)
+        importer.generate_search_index(entries)
+        importer.generate_similarity_index(entries)
+        importer.generate_catalog([entry['summary'] for entry in entries], self.catalog.categories_dir)
+        index_path = self.catalog.lessons_dir / LessonImporter.INDEX_NAME
+        return {"entries": len(entries), "index_bytes": index_path.stat().st_size}
+    
+    def run_validate(self) -> Dict:
+        validator = ContentValidator(content_dir=str(self.catalog.content_dir),
+                                     schemas_dir=str(self.schemas_dir), jobs=self.jobs)
+        validator.run_full_validation()
+        return {"errors": validator.error_count, "warnings": validator.warning_count}
+    
+    def run(self, skip: List[str], ffmpeg: bool) -> Dict[str, Dict]:
+        """
+        Все этапы по порядку сборки
+        
+        Индекс строится дважды: с нуля и повторно без изменений
+        (проверка инкрементального кеша).
+        """
+        stages = {}
+        print("  📦 Импорт...")
+        stages['import'] = timed(self.run_import)
+        
+        if 'thumbnails' not in skip:
+            if ffmpeg:
+                print("  🖼  Превью уроков и программ...")
+                stages['thumbnails'] = timed(self.run_thumbnails)
+                stages['program_thumbnails'] = timed(self.run_program_thumbnails)
+            else:
+                stages['thumbnails'] = {"skipped": "ffmpeg не найден"}
+        
+        if 'index' not in skip:
+            print("  🗂  Индексы...")
+            stages['index'] = timed(self.run_index)
+            stages['index_warm'] = timed(self.run_index)
+        
+        if 'validate' not in skip:
+            print("  🔍 Валидация...")
+            stages['validate'] = timed(self.run_validate)
+        
+        return stages
+
+
+def environment(jobs: int, ffmpeg: bool) -> Dict:
+    """Описание окружения: результаты сравнимы только на одной машине"""
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "jobs": jobs,
+        "ffmpeg": ffmpeg
+    }
+
+
+def compare(results: Dict, baseline: Dict, threshold: float) -> List[str]:
+    """
+    Сравнение с прошлым прогоном
+    
+    Returns:
+        Описания этапов, которые стали медленнее в threshold раз и больше
+    """
+    previous = {(run['lessons'], stage): data.get('seconds')
+                for run in baseline.get('runs', []) for stage, data in run['stages'].items()}
+    regressions = []
+    
+    print("\n" + "=" * 60)
+    print("📈 СРАВНЕНИЕ С БАЗОВЫМ ПРОГОНОМ")
+    print("=" * 60)
+    for run in results['runs']:
+        for stage, data in run['stages'].items():
+            before = previous.get((run['lessons'], stage))
+            after = data.get('seconds')
+            if not before or after is None:
+                continue
+            ratio = after / before
+            mark = "🔴" if ratio >= threshold else "✅"
+            print(f"{mark} {run['lessons']:>6} уроков, {stage}: {before:.2f} → {after:.2f} сек (x{ratio:.2f})")
+            if ratio >= threshold:
+                regressions.append(f"{run['lessons']} уроков, {stage}: x{ratio:.2f}")
+    return regressions
+
+
+def print_results(results: Dict):
+    print("\n" + "=" * 60)
+    print("📊 РЕЗУЛЬТАТЫ")
+    print("=" * 60)
+    for run in results['runs']:
+        print(f"\nУроков: {run['lessons']}, программ: {run['programs']}")
+        for stage, data in run['stages'].items():
+            if 'skipped' in data:
+                print(f"  {stage:<20} пропущено ({data['skipped']})")
+            else:
+                per_lesson = data['seconds'] / run['lessons'] * 1000
+                print(f"  {stage:<20} {data['seconds']:>8.2f} сек  ({per_lesson:.2f} мс/урок)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Бенчмарк импорта, индексов, валидации и превью')
+    parser.add_argument('--sizes', default='100,1000,10000',
+                        help='Размеры каталогов через запятую (по умолчанию 100,1000,10000)')
+    parser.add_argument('--jobs', type=int, default=os.cpu_count(), help='Потоков для каждого этапа')
+    parser.add_argument('--link-mode', choices=LessonImporter.LINK_MODES, default='copy',
+                        help='Способ импорта видео (hardlink экономит место на 10k уроков)')
+    parser.add_argument('--videos', type=int, default=4,
+                        help='Количество тестовых видео на каталог (0 - без видео)')
+    parser.add_argument('--skip', default='', help=f'Пропустить этапы через запятую: {", ".join(OPTIONAL_STAGES)}')
+    parser.add_argument('--schemas', default=str(ROOT_DIR / 'schemas'), help='Папка со схемами')
+    parser.add_argument('--templates', default=str(ROOT_DIR / 'templates'), help='Папка с шаблонами описаний')
+    parser.add_argument('--workdir', help='Папка для каталогов (по умолчанию временная, удаляется после прогона)')
+    parser.add_argument('--output', help='Файл для результатов в JSON')
+    parser.add_argument('--baseline', help='JSON прошлого прогона для сравнения')
+    parser.add_argument('--threshold', type=float, default=1.2,
+                        help='Замедление, которое считается регрессией (по умолчанию x1.2)')
+    args = parser.parse_args()
+    
+    sizes = [int(size) for size in args.sizes.split(',') if size.strip()]
+    skip = [stage.strip() for stage in args.skip.split(',') if stage.strip()]
+    unknown = set(skip) - set(OPTIONAL_STAGES)
+    if unknown:
+        parser.error(f"Неизвестные этапы: {', '.join(sorted(unknown))}")
+    
+    ffmpeg = shutil.which('ffmpeg') is not None
+    videos = args.videos if ffmpeg else 0
+    if not ffmpeg:
+        print("⚠️  ffmpeg не найден: уроки без видео, превью не замеряются")
+    
+    results = {
+        "version": RESULTS_VERSION,
+        "created_at": datetime.now().isoformat(timespec='seconds'),
+        "environment": environment(args.jobs, ffmpeg),
+        "runs": []
+    }
+    
+    with contextlib.ExitStack() as stack:
+        workdir = Path(args.workdir) if args.workdir else Path(stack.enter_context(tempfile.TemporaryDirectory()))
+        for size in sizes:
+            print(f"\n🧪 Каталог на {size} уроков")
+            root = workdir / f"catalog_{size}"
+            if root.exists():
+                shutil.rmtree(root)
+            
+            started = time.perf_counter()
+            catalog = generate_catalog(root, size, videos=videos)
+            generated = round(time.perf_counter() - started, 4)
+            
+            benchmark = ContentBenchmark(catalog, Path(args.schemas), Path(args.templates),
+                                         args.jobs, args.link_mode)
+            stages = benchmark.run(skip, ffmpeg)
+            results['runs'].append({
+                "lessons": size,
+                "programs": catalog.programs_count,
+                "generate_seconds": generated,
+                "stages": stages
+            })
+    
+    print_results(results)
+    
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"\n💾 Результаты сохранены: {args.output}")
+    
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n🔴 Регрессий: {len(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
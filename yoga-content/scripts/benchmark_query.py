@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк фильтрации уроков: инвертированные индексы против линейного прохода
+Строит синтетический каталог и сравнивает время ответа на типовые фильтры
+Использование: python benchmark_query.py --lessons 50000
+"""
+
+import argparse
+import random
+import time
+from typing import Dict, List
+
+from lesson_query import LessonQuery, build_query_index, lesson_facets
+from synthetic_catalog import synthetic_lesson
+
+
+QUERIES = [
+    {'category': 'back_health', 'level': 1},
+    {'category': 'flexibility', 'max_duration': 20, 'tags': ['растяжка']},
+    {'level': 2, 'min_duration': 30, 'max_duration': 45, 'equipment': ['Болстер']},
+    {'tags': ['спина', 'утро'], 'focus_areas': ['Позвоночник']},
+    {'category': 'meditation', 'level': 3, 'tags': ['дыхание', 'вечер'], 'equipment': ['Подушка']},
+]
+
+
+def linear_filter(lessons: List[Dict], category=None, level=None, min_duration=None,
+                  max_duration=None, tags=(), equipment=(), focus_areas=()) -> List[str]:
+    """Прежний способ: проверка каждого урока из lessons_index.json"""
+    result = []
+    for lesson in lessons:
+        if category is not None and lesson['category'] != category:
+            continue
+        if level is not None and lesson['level'] != level:
+            continue
+        if min_duration is not None and lesson['duration'] < min_duration:
+            continue
+        if max_duration is not None and lesson['duration'] > max_duration:
+            continue
+        if not all(tag in lesson['tags'] for tag in tags):
+            continue
+        if not all(item in lesson['equipment'] for item in equipment):
+            continue
+        if not all(area in lesson['focus_areas'] for area in focus_areas):
+            continue
+        result.append(lesson['id'])
+    return result
+
+
+def bench(name: str, rounds: int, run) -> float:
+    """Среднее время одного прогона всех запросов в миллисекундах"""
+    started = time.perf_counter()
+    for _ in range(rounds):
+        for params in QUERIES:
+            run(params)
+    per_query = (time.perf_counter() - started) / (rounds * len(QUERIES)) * 1000
+    print(f"{name}: {per_query:.3f} мс/запрос")
+    return per_query
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Бенчмарк фильтрации уроков')
+    parser.add_argument('--lessons', type=int, default=50000, help='Количество синтетических уроков')
+    parser.add_argument('--rounds', type=int, default=20, help='Повторов каждого запроса')
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    lessons = [synthetic_lesson(i, rng) for i in range(1, args.lessons + 1)]
+
+    started = time.perf_counter()
+    query = LessonQuery(build_query_index([lesson_facets(lesson) for lesson in lessons]))
+    build_time = time.perf_counter() - started
+
+    print(f"📊 Синтетический каталог: {args.lessons} уроков")
+    print(f"Построение и загрузка индекса: {build_time:.2f} сек\n")
+
+    for params in QUERIES:
+        if query.filter(**params) != linear_filter(lessons, **params):
+            raise RuntimeError(f"Результаты не совпадают для запроса {params}")
+
+    before = bench("Линейный проход", args.rounds, lambda params: linear_filter(lessons, **params))
+    after = bench("Инвертированные индексы", args.rounds, lambda params: query.filter(**params))
+
+    print(f"\nУскорение: x{before / after:.1f}")
+
+
+if __name__ == '__main__':
+    main()
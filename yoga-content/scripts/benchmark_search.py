@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк полнотекстового поиска: индекс lessons_search.idx против полного перебора
+Строит синтетический каталог, проверяет, что уроки со всеми словами запроса
+находятся так же, как при переборе, и сравнивает время ответа
+Использование: python benchmark_search.py --lessons 50000
+"""
+
+import math
+import random
+import argparse
+import tempfile
+import time
+from array import array
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from lesson_search import LessonSearch, lesson_terms, normalize, write_search_index
+from synthetic_catalog import synthetic_lesson
+
+
+QUERIES = [
+    "спина начинающий",
+    "растяжка утро баланс",
+    "поза голубя",
+    "дыхание расслабление вечер",
+    "снимает напряжение",
+    "шпагат",
+]
+
+
+def float32(value: float) -> float:
+    """Вес в том виде, в котором он хранится в индексе"""
+    return array('f', [value])[0]
+
+
+def linear_search(lessons_terms: List[Dict[str, float]], query: str, limit: int) -> List[Tuple[int, float]]:
+    """
+    Полный перебор: уроки, где нашлись все слова запроса, по убыванию очков
+    
+    Термины складываются в том же порядке, что и в LessonSearch (от редких
+    к частым), поэтому очки совпадают до последнего бита.
+    """
+    frequency: Dict[str, int] = {}
+    for terms in lessons_terms:
+        for term in terms:
+            frequency[term] = frequency.get(term, 0) + 1
+    found = sorted((term for term in dict.fromkeys(normalize(query)) if term in frequency),
+                   key=lambda term: frequency[term])
+    if not found:
+        return []
+    
+    scores = {}
+    for position, terms in enumerate(lessons_terms):
+        if all(term in terms for term in found):
+            scores[position] = 0.0
+            for term in found:
+                scores[position] += float32(terms[term]) * math.log(1 + len(lessons_terms) / frequency[term])
+    return sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:limit]
+
+
+def bench(name: str, rounds: int, run) -> float:
+    """Среднее время одного запроса в миллисекундах"""
+    started = time.perf_counter()
+    for _ in range(rounds):
+        for query in QUERIES:
+            run(query)
+    per_query = (time.perf_counter() - started) / (rounds * len(QUERIES)) * 1000
+    print(f"{name}: {per_query:.3f} мс/запрос")
+    return per_query
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Бенчмарк поиска уроков')
+    parser.add_argument('--lessons', type=int, default=50000, help='Количество синтетических уроков')
+    parser.add_argument('--rounds', type=int, default=5, help='Повторов каждого запроса')
+    parser.add_argument('--limit', type=int, default=20, help='Результатов на запрос')
+    args = parser.parse_args()
+    
+    rng = random.Random(42)
+    lessons = [synthetic_lesson(i, rng) for i in range(1, args.lessons + 1)]
+    lessons_terms = [lesson_terms(lesson) for lesson in lessons]
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        index_path = Path(tmp) / "lessons_search.idx"
+        started = time.perf_counter()
+        write_search_index(index_path, [lesson['id'] for lesson in lessons], lessons_terms)
+        search = LessonSearch(str(index_path))
+        build_time = time.perf_counter() - started
+        
+        print(f"📊 Синтетический каталог: {args.lessons} уроков")
+        print(f"Построение и загрузка индекса: {build_time:.2f} сек\n")
+        
+        for query in QUERIES:
+            expected = [(lessons[position]['id'], round(score, 3))
+                        for position, score in linear_search(lessons_terms, query, args.limit)]
+            if search.search(query, args.limit)[:len(expected)] != expected:
+                raise RuntimeError(f"Результаты не совпадают для запроса {query!r}")
+        
+        before = bench("Полный перебор", args.rounds, lambda query: linear_search(lessons_terms, query, args.limit))
+        after = bench("Индекс", args.rounds, lambda query: search.search(query, args.limit))
+        del search
+    
+    print(f"\nУскорение: x{before / after:.1f}")
+
+
+if __name__ == '__main__':
+    main()
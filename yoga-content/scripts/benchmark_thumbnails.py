@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк генерации превью: последовательный режим против пула задач
+Создаёт синтетические тестовые видео через ffmpeg и сравнивает время работы
+Использование: python benchmark_thumbnails.py --lessons 24 --jobs 8
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+from generate_thumbnails import ThumbnailGenerator
+from synthetic_catalog import create_test_video
+
+
+def create_synthetic_catalog(lessons_dir: Path, lessons_count: int, seconds: int):
+    """Создание каталога уроков с тестовыми видео"""
+    template_video = lessons_dir.parent / "template.mp4"
+    create_test_video(template_video, seconds)
+
+    for i in range(1, lessons_count + 1):
+        lesson_path = lessons_dir / f"{i:03d}_bench_lesson"
+        lesson_path.mkdir(parents=True, exist_ok=True)
+        shutil.copyfile(template_video, lesson_path / "video.mp4")
+        with open(lesson_path / "metadata.json", 'w', encoding='utf-8') as f:
+            json.dump({"id": f"{i:03d}", "duration": 15}, f)
+
+
+def clear_thumbnails(lessons_dir: Path):
+    """Удаление превью между прогонами"""
+    for thumbnail in lessons_dir.glob("*/thumbnail.jpg"):
+        thumbnail.unlink()
+
+
+def run_once(lessons_dir: Path, jobs: int) -> float:
+    """Один прогон генератора, возвращает время в секундах"""
+    clear_thumbnails(lessons_dir)
+    generator = ThumbnailGenerator(lessons_dir=str(lessons_dir), jobs=jobs)
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        generator.process_all_lessons()
+    elapsed = time.perf_counter() - started
+    if generator.failed_count:
+        raise RuntimeError(f"Ошибок при генерации: {generator.failed_count}")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Бенчмарк генерации превью')
+    parser.add_argument('--lessons', type=int, default=24, help='Количество тестовых уроков')
+    parser.add_argument('--seconds', type=int, default=40, help='Длительность тестового видео')
+    parser.add_argument('--jobs', type=int, default=os.cpu_count(), help='Число задач для параллельного прогона')
+    args = parser.parse_args()
+
+    if not ThumbnailGenerator('.').check_ffmpeg():
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        lessons_dir = Path(tmp) / "lessons"
+        print(f"🎬 Генерация {args.lessons} тестовых видео по {args.seconds} сек...")
+        create_synthetic_catalog(lessons_dir, args.lessons, args.seconds)
+
+        serial = run_once(lessons_dir, jobs=1)
+        parallel = run_once(lessons_dir, jobs=args.jobs)
+
+    print("\n" + "=" * 60)
+    print("📊 РЕЗУЛЬТАТЫ")
+    print("=" * 60)
+    print(f"\nУроков: {args.lessons}")
+    print(f"Последовательно (--jobs 1): {serial:.2f} сек")
+    print(f"Параллельно (--jobs {args.jobs}): {parallel:.2f} сек")
+    print(f"Ускорение: x{serial / parallel:.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Микро-бенчмарк валидации по JSON схеме на синтетическом каталоге
+Сравнивает jsonschema.validate на каждый документ со скомпилированным валидатором
+Использование: python benchmark_validation.py --lessons 10000 --schemas ../schemas
+"""
+
+import argparse
+import json
+import random
+import time
+from pathlib import Path
+from typing import Dict, List
+
+import jsonschema
+
+from synthetic_catalog import synthetic_lesson
+from validate_content import ContentValidator
+
+
+def bench(name: str, lessons: List[Dict], validate) -> float:
+    """Прогон одной стратегии, возвращает время на документ в микросекундах"""
+    started = time.perf_counter()
+    for lesson in lessons:
+        validate(lesson)
+    per_document = (time.perf_counter() - started) / len(lessons) * 1e6
+    print(f"{name}: {per_document:.1f} мкс/документ")
+    return per_document
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Бенчмарк валидации по JSON схеме')
+    parser.add_argument('--lessons', type=int, default=10000, help='Количество синтетических уроков')
+    parser.add_argument('--schemas', default=str(Path(__file__).parent.parent / 'schemas'),
+                        help='Папка со схемами')
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    lessons = [synthetic_lesson(i, rng) for i in range(args.lessons)]
+
+    validator = ContentValidator(content_dir='.', schemas_dir=args.schemas)
+    schema_path = Path(args.schemas) / "lesson.schema.json"
+
+    def validate_uncached(lesson: Dict):
+        # Прежнее поведение: чтение схемы с диска и jsonschema.validate на каждый урок
+        with open(schema_path, 'r', encoding='utf-8') as f:
+            schema = json.load(f)
+        jsonschema.validate(instance=lesson, schema=schema)
+
+    def validate_cached(lesson: Dict):
+        validator.validate_json_schema(lesson, 'lesson', lesson['id'])
+
+    print(f"📊 Синтетический каталог: {args.lessons} уроков\n")
+    validator.get_validator('lesson')
+    before = bench("Без кеша (load_schema + jsonschema.validate)", lessons, validate_uncached)
+    after = bench("Скомпилированный валидатор", lessons, validate_cached)
+
+    if validator.error_count:
+        first_error = next(validator.read_findings())
+        print(f"\n⚠️  Синтетические уроки не прошли валидацию: {first_error.message}")
+    print(f"\nУскорение: x{before / after:.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""
+Общий загрузчик каталога контента: уроки, программы и категории
+Папки сканируются один раз через os.scandir, JSON читается лениво и запоминается,
+поэтому импорт, генерация превью и валидация в одном процессе не разбирают каталог заново
+Здесь же write_if_changed - общая для скриптов запись файла только при изменении содержимого
+"""
+
+import os
+import json
+import hashlib
+import threading
+from pathlib import Path
+from typing import Dict, FrozenSet, List, Optional
+
+
+_NOT_LOADED = object()
+
+
+def _read_json(path: Path) -> Dict:
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def write_if_changed(path: Path, content: str) -> bool:
+    """
+    Запись файла, только если содержимое изменилось (сравнение по SHA-256)
+    
+    Неизменённый файл сохраняет mtime, поэтому кеши, завязанные на него,
+    остаются валидными.
+    """
+    data = content.encode('utf-8')
+    try:
+        if path.stat().st_size == len(data):
+            if hashlib.sha256(path.read_bytes()).digest() == hashlib.sha256(data).digest():
+                return False
+    except FileNotFoundError:
+        pass
+    
+    tmp_path = path.with_name(f".{path.name}.tmp")
+    tmp_path.write_bytes(data)
+    tmp_path.replace(path)
+    return True
+
+
+class LessonRecord:
+    """
+    Папка урока: список файлов и metadata.json
+    
+    Имена файлов берутся одним os.scandir папки, размер и mtime
+    запрашиваются только для нужных файлов, metadata.json читается при
+    первом обращении.
+    """
+    
+    __slots__ = ('path', 'folder', 'id', '_names', '_identities', '_metadata')
+    
+    METADATA_NAME = "metadata.json"
+    
+    def __init__(self, path: Path):
+        self.path = path
+        self.folder = path.name
+        self.id = path.name.split('_')[0]
+        self.invalidate()
+    
+    def invalidate(self):
+        """Сброс запомненного состояния (после записи файлов урока)"""
+        self._names: Optional[FrozenSet[str]] = None
+        self._identities: Dict[str, Optional[List[int]]] = {}
+        self._metadata = _NOT_LOADED
+    
+    @property
+    def metadata_path(self) -> Path:
+        return self.path / self.METADATA_NAME
+    
+    def names(self) -> FrozenSet[str]:
+        """Имена файлов в папке урока"""
+        if self._names is None:
+            try:
+                with os.scandir(self.path) as it:
+                    self._names = frozenset(entry.name for entry in it)
+            except FileNotFoundError:
+                self._names = frozenset()
+        return self._names
+    
+    def has_file(self, name: str) -> bool:
+        return name in self.names()
+    
+    def file_identity(self, name: str) -> Optional[List[int]]:
+        """Размер и mtime файла урока или None, если файла нет"""
+        if name not in self._identities:
+            identity = None
+            if self.has_file(name):
+                try:
+                    stat = os.stat(self.path / name)
+                    identity = [stat.st_size, stat.st_mtime_ns]
+                except FileNotFoundError:  # битая символическая ссылка
+                    pass
+            self._identities[name] = identity
+        return self._identities[name]
+    
+    def metadata(self) -> Optional[Dict]:
+        """Содержимое metadata.json или None, если файла нет"""
+        if self._metadata is _NOT_LOADED:
+            self._metadata = _read_json(self.metadata_path) if self.has_file(self.METADATA_NAME) else None
+        return self._metadata
+
+
+class JsonRecord:
+    """JSON файл каталога (программа или категория) с ленивым чтением"""
+    
+    __slots__ = ('path', 'id', '_data')
+    
+    def __init__(self, path: Path):
+        self.path = path
+        self.id = path.stem
+        self._data = _NOT_LOADED
+    
+    def data(self) -> Dict:
+        if self._data is _NOT_LOADED:
+            self._data = _read_json(self.path)
+        return self._data
+    
+    def identity(self) -> Optional[List[int]]:
+        """Размер и mtime файла или None, если файла нет"""
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return [stat.st_size, stat.st_mtime_ns]
+
+
+class ProgramRecord(JsonRecord):
+    """Программа (programs/<id>.json)"""
+    __slots__ = ()
+
+
+class CategoryRecord(JsonRecord):
+    """Категория (categories/<id>.json)"""
+    __slots__ = ()
+
+
+class Catalog:
+    """Каталог контента, общий для LessonImporter, ThumbnailGenerator и ContentValidator"""
+    
+    def __init__(self, lessons_dir: str, programs_dir: Optional[str] = None,
+                 categories_dir: Optional[str] = None):
+        self.lessons_dir = Path(lessons_dir)
+        self.programs_dir = Path(programs_dir) if programs_dir else None
+        self.categories_dir = Path(categories_dir) if categories_dir else None
+        self._lessons: Optional[Dict[str, LessonRecord]] = None
+        self._lessons_sorted = True
+        self._json: Dict[Path, list] = {}
+        # Каталог может использоваться из нескольких потоков (pipeline.py)
+        self._lock = threading.RLock()
+    
+    @classmethod
+    def for_content(cls, content_dir: str) -> 'Catalog':
+        """Каталог стандартной структуры content/ (lessons, programs, categories)"""
+        content_dir = Path(content_dir)
+        return cls(content_dir / "lessons", content_dir / "programs", content_dir / "categories")
+    
+    def lessons(self) -> List[LessonRecord]:
+        """Папки уроков в порядке имён (скрытые папки пропускаются)"""
+        with self._lock:
+            if self._lessons is None:
+                lessons = {}
+                try:
+                    with os.scandir(self.lessons_dir) as it:
+                        for entry in it:
+                            if entry.is_dir() and not entry.name.startswith('.'):
+                                lessons[entry.name] = LessonRecord(self.lessons_dir / entry.name)
+                except FileNotFoundError:
+                    pass
+                self._lessons = lessons
+                self._lessons_sorted = False
+            if not self._lessons_sorted:
+                self._lessons = dict(sorted(self._lessons.items()))
+                self._lessons_sorted = True
+            return list(self._lessons.values())
+    
+    def lesson(self, folder: str) -> Optional[LessonRecord]:
+        """Урок по имени папки"""
+        with self._lock:
+            if self._lessons is None:
+                self.lessons()
+            return self._lessons.get(folder)
+    
+    def invalidate(self, lesson_path: Path):
+        """
+        Отметка об изменении файлов урока
+        
+        Известный урок перечитывается при следующем обращении, новая
+        папка добавляется в список без повторного сканирования, удалённая -
+        убирается из него.
+        """
+        lesson_path = Path(lesson_path)
+        with self._lock:
+            if self._lessons is None:
+                return
+            record = self._lessons.get(lesson_path.name)
+            if record is not None and not lesson_path.is_dir():
+                del self._lessons[lesson_path.name]
+            elif record is not None:
+                record.invalidate()
+            elif lesson_path.is_dir():
+                self._lessons[lesson_path.name] = LessonRecord(lesson_path)
+                self._lessons_sorted = False
+    
+    def _json_records(self, directory: Optional[Path], record_class) -> list:
+        if directory is None:
+            return []
+        directory = Path(directory)
+        with self._lock:
+            return self._load_json_records(directory, record_class)
+    
+    def _load_json_records(self, directory: Path, record_class) -> list:
+        if directory not in self._json:
+            records = []
+            try:
+                with os.scandir(directory) as it:
+                    for entry in it:
+                        if entry.is_file() and entry.name.endswith('.json'):
+                            records.append(record_class(directory / entry.name))
+            except FileNotFoundError:
+                pass
+            self._json[directory] = sorted(records, key=lambda record: record.path.name)
+        return self._json[directory]
+    
+    def invalidate_records(self, directory: str):
+        """Отметка об изменении программ или категорий: папка будет просканирована заново"""
+        with self._lock:
+            self._json.pop(Path(directory), None)
+    
+    def programs(self, programs_dir: Optional[str] = None) -> List[ProgramRecord]:
+        """Программы из programs_dir (по умолчанию - папка программ каталога)"""
+        return self._json_records(programs_dir or self.programs_dir, ProgramRecord)
+    
+    def categories(self, categories_dir: Optional[str] = None) -> List[CategoryRecord]:
+        """Категории из categories_dir (по умолчанию - папка категорий каталога)"""
+        return self._json_records(categories_dir or self.categories_dir, CategoryRecord)
+    
+    def refresh(self):
+        """Полный сброс: следующее обращение заново просканирует папки"""
+        with self._lock:
+            self._lessons = None
+            self._json.clear()
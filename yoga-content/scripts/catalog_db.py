@@ -0,0 +1,385 @@
+#!/usr/bin/env python3
+"""
+Каталог контента в SQLite: уроки, асаны, теги, программы, расписания и категории
+База строится при генерации индекса (import_lessons.py --sqlite) одной транзакцией,
+сервисы открывают её без разбора lessons_index.json и выполняют запросы по индексам
+Использование: python catalog_db.py --db ./content/lessons/lessons_catalog.sqlite --category back_health --tag спина
+"""
+
+import os
+import json
+import sqlite3
+import hashlib
+import argparse
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+
+CATALOG_DB_NAME = "lessons_catalog.sqlite"
+# PRAGMA user_version: меняется при изменении структуры таблиц
+CATALOG_DB_VERSION = 1
+
+SCHEMA = """
+CREATE TABLE meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE categories (
+    id TEXT PRIMARY KEY,
+    name TEXT,
+    sort_order INTEGER,
+    data TEXT NOT NULL
+);
+CREATE TABLE lessons (
+    pk INTEGER PRIMARY KEY,
+    id TEXT NOT NULL,
+    title TEXT NOT NULL,
+    category TEXT,
+    level INTEGER,
+    duration INTEGER,
+    instructor TEXT,
+    intensity TEXT,
+    style TEXT,
+    video_url TEXT,
+    thumbnail_url TEXT,
+    data TEXT NOT NULL
+);
+CREATE TABLE poses (
+    pk INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    sanskrit_name TEXT
+);
+CREATE TABLE lesson_poses (
+    lesson INTEGER NOT NULL REFERENCES lessons(pk),
+    position INTEGER NOT NULL,
+    pose INTEGER NOT NULL REFERENCES poses(pk),
+    duration INTEGER,
+    PRIMARY KEY (lesson, position)
+) WITHOUT ROWID;
+CREATE TABLE tags (
+    pk INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+CREATE TABLE lesson_tags (
+    tag INTEGER NOT NULL REFERENCES tags(pk),
+    lesson INTEGER NOT NULL REFERENCES lessons(pk),
+    PRIMARY KEY (tag, lesson)
+) WITHOUT ROWID;
+CREATE TABLE programs (
+    id TEXT PRIMARY KEY,
+    title TEXT NOT NULL,
+    category TEXT,
+    level INTEGER,
+    duration_weeks INTEGER,
+    data TEXT NOT NULL
+);
+CREATE TABLE program_lessons (
+    program TEXT NOT NULL REFERENCES programs(id),
+    position INTEGER NOT NULL,
+    lesson_id TEXT NOT NULL,
+    PRIMARY KEY (program, position)
+) WITHOUT ROWID;
+CREATE TABLE schedule (
+    program TEXT NOT NULL REFERENCES programs(id),
+    position INTEGER NOT NULL,
+    day INTEGER NOT NULL,
+    lesson_id TEXT,
+    is_rest_day INTEGER NOT NULL DEFAULT 0,
+    note TEXT,
+    PRIMARY KEY (program, position)
+) WITHOUT ROWID;
+"""
+
+# Индексы создаются после вставки данных: так сборка быстрее
+INDEXES = """
+CREATE INDEX lessons_id ON lessons (id);
+CREATE INDEX lessons_category_level ON lessons (category, level, duration);
+CREATE INDEX lessons_level ON lessons (level, duration);
+CREATE INDEX lessons_duration ON lessons (duration);
+CREATE INDEX lesson_tags_lesson ON lesson_tags (lesson);
+CREATE INDEX schedule_lesson ON schedule (lesson_id);
+"""
+
+SUMMARY_COLUMNS = "id, title, category, level, duration, thumbnail_url"
+
+
+def _json(data) -> str:
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':'))
+
+
+def _execute_statements(conn: sqlite3.Connection, script: str):
+    """Выполнение SQL по одной команде (executescript завершил бы открытую транзакцию)"""
+    for statement in script.split(';'):
+        if statement.strip():
+            conn.execute(statement)
+
+
+def content_hash(lessons: List[Dict], programs: List[Dict], categories: List[Dict]) -> str:
+    """Хеш исходных данных: базу не нужно пересобирать, если он не изменился"""
+    digest = hashlib.sha256(str(CATALOG_DB_VERSION).encode())
+    for part in (lessons, programs, categories):
+        digest.update(_json(part).encode('utf-8'))
+    return digest.hexdigest()
+
+
+def stored_hash(db_path: Path) -> Optional[str]:
+    """Хеш данных, из которых собрана существующая база (None - базы нет или она другой версии)"""
+    if not db_path.exists():
+        return None
+    try:
+        with CatalogDB(db_path) as db:
+            return db.meta().get('content_hash')
+    except (sqlite3.DatabaseError, ValueError):
+        return None
+
+
+def write_catalog_db(db_path: Path, lessons: List[Dict], programs: List[Dict],
+                     categories: List[Dict]) -> bool:
+    """
+    Сборка базы каталога
+    
+    База пишется во временный файл одной транзакцией (журнал и fsync
+    отключены - файл всё равно заменяется целиком) и атомарно
+    подменяет прежнюю, поэтому сервисы никогда не видят недостроенную базу.
+    
+    Args:
+        db_path: Путь к базе
+        lessons: Полные данные уроков (как в metadata.json)
+        programs: Данные программ (programs/*.json)
+        categories: Описания категорий
+    
+    Returns:
+        False, если база уже собрана из тех же данных и не перезаписывалась
+    """
+    digest = content_hash(lessons, programs, categories)
+    if stored_hash(db_path) == digest:
+        return False
+    
+    tmp_path = db_path.with_name(f".{db_path.name}.tmp")
+    if tmp_path.exists():
+        tmp_path.unlink()
+    conn = sqlite3.connect(tmp_path, isolation_level=None)
+    try:
+        conn.execute("PRAGMA journal_mode = OFF")
+        conn.execute("PRAGMA synchronous = OFF")
+        conn.execute("BEGIN")
+        _execute_statements(conn, SCHEMA)
+        
+        conn.executemany(
+            "INSERT INTO categories VALUES (?, ?, ?, ?)",
+            ((category['id'], category.get('name'), category.get('order'), _json(category))
+             for category in categories)
+        )
+        
+        # Справочники асан и тегов: имя -> первичный ключ
+        poses: Dict[str, List] = {}
+        tags: Dict[str, int] = {}
+        lesson_rows, lesson_pose_rows, lesson_tag_rows = [], [], []
+        for pk, lesson in enumerate(lessons, start=1):
+            lesson_rows.append((
+                pk, lesson['id'], lesson.get('title', ''), lesson.get('category'), lesson.get('level'),
+                lesson.get('duration'), lesson.get('instructor'), lesson.get('intensity'),
+                lesson.get('style'), lesson.get('video_url'), lesson.get('thumbnail_url'), _json(lesson)
+            ))
+            for position, pose in enumerate(lesson.get('poses', [])):
+                entry = poses.setdefault(pose['name'], [len(poses) + 1, None])
+                entry[1] = entry[1] or pose.get('sanskrit_name')
+                lesson_pose_rows.append((pk, position, entry[0], pose.get('duration')))
+            for tag in dict.fromkeys(lesson.get('tags', [])):
+                lesson_tag_rows.append((tags.setdefault(tag, len(tags) + 1), pk))
+        
+        conn.executemany("INSERT INTO lessons VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", lesson_rows)
+        conn.executemany("INSERT INTO poses VALUES (?, ?, ?)",
+                         ((pk, name, sanskrit_name) for name, (pk, sanskrit_name) in poses.items()))
+        conn.executemany("INSERT INTO lesson_poses VALUES (?, ?, ?, ?)", lesson_pose_rows)
+        conn.executemany("INSERT INTO tags VALUES (?, ?)", ((pk, name) for name, pk in tags.items()))
+        conn.executemany("INSERT INTO lesson_tags VALUES (?, ?)", lesson_tag_rows)
+        
+        conn.executemany("INSERT INTO programs VALUES (?, ?, ?, ?, ?, ?)", (
+            (program['id'], program.get('title', ''), program.get('category'), program.get('level'),
+             program.get('duration_weeks'), _json(program))
+            for program in programs
+        ))
+        conn.executemany("INSERT INTO program_lessons VALUES (?, ?, ?)", (
+            (program['id'], position, lesson_id)
+            for program in programs for position, lesson_id in enumerate(program.get('lessons', []))
+        ))
+        conn.executemany("INSERT INTO schedule VALUES (?, ?, ?, ?, ?, ?)", (
+            (program['id'], position, item.get('day'), item.get('lesson_id'),
+             int(bool(item.get('is_rest_day'))), item.get('note'))
+            for program in programs for position, item in enumerate(program.get('schedule', []))
+        ))
+        
+        conn.executemany("INSERT INTO meta VALUES (?, ?)", [
+            ('content_hash', digest),
+            ('total_lessons', str(len(lessons))),
+            ('total_programs', str(len(programs))),
+        ])
+        _execute_statements(conn, INDEXES)
+        conn.execute(f"PRAGMA user_version = {CATALOG_DB_VERSION}")
+        conn.execute("COMMIT")
+        # Статистика для планировщика запросов
+        conn.execute("ANALYZE")
+    finally:
+        conn.close()
+    os.replace(tmp_path, db_path)
+    return True
+
+
+class CatalogDB:
+    """
+    Чтение каталога из SQLite
+    
+    База открывается только для чтения, поэтому её можно подменять
+    новой сборкой, пока сервис работает: открытое соединение продолжает
+    читать прежний файл.
+    """
+    
+    def __init__(self, db_path: str):
+        self.path = Path(db_path)
+        if not self.path.exists():
+            raise FileNotFoundError(f"База каталога не найдена: {db_path}")
+        self.conn = sqlite3.connect(f"{self.path.resolve().as_uri()}?mode=ro", uri=True,
+                                    check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        version = self.conn.execute("PRAGMA user_version").fetchone()[0]
+        if version != CATALOG_DB_VERSION:
+            self.conn.close()
+            raise ValueError(f"Неподдерживаемая версия базы каталога: {version}")
+    
+    def close(self):
+        self.conn.close()
+    
+    def __enter__(self) -> 'CatalogDB':
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+    
+    def meta(self) -> Dict[str, str]:
+        return dict(self.conn.execute("SELECT key, value FROM meta").fetchall())
+    
+    def lesson(self, lesson_id: str) -> Optional[Dict]:
+        """Полные данные урока (как в metadata.json)"""
+        row = self.conn.execute("SELECT data FROM lessons WHERE id = ? ORDER BY pk LIMIT 1",
+                                (lesson_id,)).fetchone()
+        return json.loads(row['data']) if row else None
+    
+    def find_lessons(self, category: Optional[str] = None, level: Optional[int] = None,
+                     min_duration: Optional[int] = None, max_duration: Optional[int] = None,
+                     tags: Iterable[str] = (), limit: Optional[int] = None,
+                     offset: int = 0) -> List[Dict]:
+        """
+        Облегчённые записи уроков, подходящих под все фильтры
+        
+        Теги объединяются по И: урок должен содержать каждый из них.
+        Порядок - как в lessons_index.json.
+        """
+        conditions, params = [], []
+        for column, operator, value in (('category', '=', category), ('level', '=', level),
+                                        ('duration', '>=', min_duration), ('duration', '<=', max_duration)):
+            if value is not None:
+                conditions.append(f"{column} {operator} ?")
+                params.append(value)
+        
+        tags = list(dict.fromkeys(tags))
+        if tags:
+            placeholders = ', '.join('?' * len(tags))
+            conditions.append(
+                f"pk IN (SELECT lesson_tags.lesson FROM lesson_tags JOIN tags ON tags.pk = lesson_tags.tag "
+                f"WHERE tags.name IN ({placeholders}) GROUP BY lesson_tags.lesson HAVING COUNT(*) = ?)"
+            )
+            params += tags + [len(tags)]
+        
+        query = f"SELECT {SUMMARY_COLUMNS} FROM lessons"
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY pk"
+        if limit is not None:
+            query += " LIMIT ? OFFSET ?"
+            params += [limit, offset]
+        return [dict(row) for row in self.conn.execute(query, params)]
+    
+    def lesson_poses(self, lesson_id: str) -> List[Dict]:
+        """Асаны урока по порядку"""
+        rows = self.conn.execute(
+            "SELECT poses.name, poses.sanskrit_name, lesson_poses.duration FROM lesson_poses "
+            "JOIN poses ON poses.pk = lesson_poses.pose "
+            "WHERE lesson_poses.lesson = (SELECT pk FROM lessons WHERE id = ? ORDER BY pk LIMIT 1) "
+            "ORDER BY lesson_poses.position",
+            (lesson_id,)
+        )
+        return [dict(row) for row in rows]
+    
+    def tags(self) -> Dict[str, int]:
+        """Теги и количество уроков с ними, по убыванию популярности"""
+        rows = self.conn.execute(
+            "SELECT tags.name, COUNT(*) AS lessons FROM lesson_tags JOIN tags ON tags.pk = lesson_tags.tag "
+            "GROUP BY tags.pk ORDER BY lessons DESC, tags.name"
+        )
+        return {row['name']: row['lessons'] for row in rows}
+    
+    def categories(self) -> List[Dict]:
+        """Категории в порядке поля order"""
+        rows = self.conn.execute("SELECT data FROM categories ORDER BY sort_order IS NULL, sort_order, id")
+        return [json.loads(row['data']) for row in rows]
+    
+    def programs(self) -> List[Dict]:
+        """Облегчённые записи программ"""
+        rows = self.conn.execute("SELECT id, title, category, level, duration_weeks FROM programs ORDER BY id")
+        return [dict(row) for row in rows]
+    
+    def program(self, program_id: str) -> Optional[Dict]:
+        """Программа с расписанием"""
+        row = self.conn.execute("SELECT data FROM programs WHERE id = ?", (program_id,)).fetchone()
+        return json.loads(row['data']) if row else None
+    
+    def schedule(self, program_id: str) -> List[Dict]:
+        """Расписание программы по дням"""
+        rows = self.conn.execute(
+            "SELECT day, lesson_id, is_rest_day, note FROM schedule WHERE program = ? ORDER BY position",
+            (program_id,)
+        )
+        return [dict(row, is_rest_day=bool(row['is_rest_day'])) for row in rows]
+    
+    def programs_with_lesson(self, lesson_id: str) -> List[str]:
+        """ID программ, в расписании которых есть урок"""
+        rows = self.conn.execute("SELECT DISTINCT program FROM schedule WHERE lesson_id = ? ORDER BY program",
+                                 (lesson_id,))
+        return [row['program'] for row in rows]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Запросы к базе каталога')
+    parser.add_argument('--db', default=f'./content/lessons/{CATALOG_DB_NAME}', help='Путь к базе')
+    parser.add_argument('--category', help='Категория')
+    parser.add_argument('--level', type=int, help='Уровень сложности')
+    parser.add_argument('--min-duration', type=int, help='Минимальная длительность (мин)')
+    parser.add_argument('--max-duration', type=int, help='Максимальная длительность (мин)')
+    parser.add_argument('--tag', action='append', default=[], help='Тег (можно несколько)')
+    parser.add_argument('--limit', type=int, help='Количество результатов')
+    
+    args = parser.parse_args()
+    
+    if not Path(args.db).exists():
+        print(f"❌ База не найдена: {args.db}")
+        return
+    
+    with CatalogDB(args.db) as db:
+        lessons = db.find_lessons(
+            category=args.category,
+            level=args.level,
+            min_duration=args.min_duration,
+            max_duration=args.max_duration,
+            tags=args.tag,
+            limit=args.limit
+        )
+    
+    print(f"🔎 Найдено уроков: {len(lessons)}")
+    for lesson in lessons:
+        print(f"  {lesson['id']}  {lesson['title']} ({lesson['category']}, уровень {lesson['level']}, "
+              f"{lesson['duration']} мин)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+Наблюдение за изменениями файлов контента (для pipeline.py --watch)
+На Linux используется inotify (через libc, без внешних зависимостей),
+в остальных случаях - периодический опрос размеров и mtime файлов
+"""
+
+import os
+import time
+import errno
+import select
+import struct
+import ctypes
+import ctypes.util
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+
+# Маски событий inotify (linux/inotify.h)
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = (IN_CLOSE_WRITE | IN_ATTRIB | IN_MOVED_FROM | IN_MOVED_TO
+              | IN_CREATE | IN_DELETE | IN_DELETE_SELF)
+
+EVENT_HEADER = struct.Struct('iIII')
+
+
+class WatcherUnavailable(Exception):
+    """inotify недоступен (не Linux, исчерпан лимит наблюдений)"""
+    pass
+
+
+class InotifyWatcher:
+    """
+    Наблюдение через inotify
+    
+    Корневые папки наблюдаются вместе с подпапками до глубины depth
+    (папки уроков - depth=1), новые подпапки добавляются на лету.
+    """
+    
+    def __init__(self, roots: Iterable[Path], depth: int = 1):
+        libc_name = ctypes.util.find_library('c')
+        if not libc_name or not hasattr(os, 'uname') or os.uname().sysname != 'Linux':
+            raise WatcherUnavailable("inotify доступен только в Linux")
+        self._libc = ctypes.CDLL(libc_name, use_errno=True)
+        self._fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self._fd < 0:
+            raise WatcherUnavailable(os.strerror(ctypes.get_errno()))
+        
+        self.depth = depth
+        self._dirs: Dict[int, Tuple[Path, int]] = {}
+        self._overflow = False
+        for root in roots:
+            self._watch_tree(Path(root), 0)
+    
+    def _watch(self, directory: Path, level: int):
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(directory), WATCH_MASK)
+        if wd < 0:
+            error = ctypes.get_errno()
+            if error == errno.ENOENT:
+                return
+            if error == errno.ENOSPC:
+                raise WatcherUnavailable("Исчерпан лимит inotify (fs.inotify.max_user_watches)")
+            raise WatcherUnavailable(os.strerror(error))
+        self._dirs[wd] = (directory, level)
+    
+    def _watch_tree(self, directory: Path, level: int):
+        if not directory.is_dir():
+            return
+        self._watch(directory, level)
+        if level < self.depth:
+            with os.scandir(directory) as it:
+                for entry in it:
+                    if entry.is_dir() and not entry.name.startswith('.'):
+                        self._watch_tree(Path(entry.path), level + 1)
+    
+    def _read(self, timeout: Optional[float]) -> Set[Path]:
+        """Пути из событий, пришедших за timeout секунд (None - ждать первое событие)"""
+        ready, _, _ = select.select([self._fd], [], [], timeout)
+        if not ready:
+            return set()
+        try:
+            data = os.read(self._fd, 1 << 16)
+        except BlockingIOError:
+            return set()
+        
+        paths = set()
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b'\0')
+            offset += length
+            
+            if mask & IN_Q_OVERFLOW:
+                self._overflow = True
+                continue
+            if mask & IN_IGNORED:
+                self._dirs.pop(wd, None)
+                continue
+            if wd not in self._dirs:
+                continue
+            directory, level = self._dirs[wd]
+            path = directory / os.fsdecode(name) if name else directory
+            paths.add(path)
+            if mask & IN_ISDIR and mask & (IN_CREATE | IN_MOVED_TO) and level < self.depth:
+                # Новая папка урока: наблюдаем и её (файлы, появившиеся до этого,
+                # учитываются через событие самой папки)
+                self._watch_tree(path, level + 1)
+        return paths
+    
+    def wait(self, debounce: float) -> Tuple[Set[Path], bool]:
+        """
+        Ожидание изменений
+        
+        После первого события собираются следующие, пока не наступит пауза
+        в debounce секунд (сохранение файла редактором - это несколько событий).
+        
+        Returns:
+            Изменённые пути и признак переполнения очереди (нужна полная пересборка)
+        """
+        paths = self._read(None)
+        while True:
+            more = self._read(debounce)
+            if not more:
+                break
+            paths |= more
+        overflow, self._overflow = self._overflow, False
+        return paths, overflow
+    
+    def close(self):
+        os.close(self._fd)
+
+
+class PollingWatcher:
+    """Наблюдение опросом: сравнение размеров и mtime файлов между проходами"""
+    
+    def __init__(self, roots: Iterable[Path], depth: int = 1, interval: float = 0.5):
+        self.roots = [Path(root) for root in roots]
+        self.depth = depth
+        self.interval = interval
+        self._snapshot = self.snapshot()
+    
+    def _scan(self, directory: Path, level: int, files: Dict[Path, Tuple[int, int]]):
+        try:
+            with os.scandir(directory) as it:
+                for entry in it:
+                    if entry.is_dir():
+                        if level < self.depth and not entry.name.startswith('.'):
+                            self._scan(Path(entry.path), level + 1, files)
+                    else:
+                        try:
+                            stat = entry.stat()
+                        except FileNotFoundError:
+                            continue
+                        files[Path(entry.path)] = (stat.st_size, stat.st_mtime_ns)
+        except FileNotFoundError:
+            pass
+    
+    def snapshot(self) -> Dict[Path, Tuple[int, int]]:
+        files: Dict[Path, Tuple[int, int]] = {}
+        for root in self.roots:
+            self._scan(root, 0, files)
+        return files
+    
+    def _changes(self) -> Set[Path]:
+        current = self.snapshot()
+        previous, self._snapshot = self._snapshot, current
+        changed = {path for path, identity in current.items() if previous.get(path) != identity}
+        changed |= previous.keys() - current.keys()
+        return changed
+    
+    def wait(self, debounce: float) -> Tuple[Set[Path], bool]:
+        """Ожидание изменений: опрос до первого изменения, затем до паузы в debounce секунд"""
+        while True:
+            time.sleep(self.interval)
+            paths = self._changes()
+            if paths:
+                break
+        while True:
+            time.sleep(debounce)
+            more = self._changes()
+            if not more:
+                break
+            paths |= more
+        return paths, False
+    
+    def close(self):
+        pass
+
+
+def create_watcher(roots: List[Path], depth: int = 1, poll_interval: float = 0.5,
+                   polling: bool = False):
+    """inotify, если доступен, иначе опрос"""
+    if not polling:
+        try:
+            return InotifyWatcher(roots, depth)
+        except (WatcherUnavailable, OSError, AttributeError) as e:
+            print(f"⚠️  inotify недоступен ({e}), используется опрос каждые {poll_interval} сек")
+    return PollingWatcher(roots, depth, poll_interval)
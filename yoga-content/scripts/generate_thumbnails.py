@@ -1,23 +1,112 @@
 #!/usr/bin/env python3
 """
 Скрипт для генерации превью (thumbnails) из видео уроков
-Использование: python generate_thumbnails.py --input ./content/lessons
+Использование: python generate_thumbnails.py --input ./content/lessons [--jobs 8] [--candidates 5] [--dry-run]
 """
 
 import os
+import hashlib
 import subprocess
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
 from pathlib import Path
+from typing import Dict, List, Optional
 import argparse
 import json
 
+from catalog import Catalog, LessonRecord, ProgramRecord, write_if_changed
+from instrumentation import Metrics, add_arguments, instrumented
+
+
+@dataclass
+class ThumbnailResult:
+    """Результат обработки одного урока"""
+    lesson_key: str
+    status: Optional[bool]  # True - создано, False - ошибка, None - пропущено
+    log: List[str] = field(default_factory=list)
+    elapsed: float = 0.0    # Время работы ffmpeg, сек
+    reason: Optional[str] = None   # Причина пересборки (None - превью актуально)
+    entry: Optional[Dict] = None   # Новая запись манифеста для урока
+
 
 class ThumbnailGenerator:
     """Генератор превью из видео"""
     
-    def __init__(self, lessons_dir: str):
+    # Масштабирование до 1280x720 с сохранением пропорций
+    SCALE_FILTER = 'scale=1280:720:force_original_aspect_ratio=decrease'
+    PAD_FILTER = 'pad=1280:720:(ow-iw)/2:(oh-ih)/2'
+    
+    # input - быстрый поиск до -i (декодирование от ближайшего ключевого кадра)
+    # output - точный поиск после -i (декодирование с начала файла)
+    SEEK_MODES = ('input', 'output')
+    
+    # Профиль превью по умолчанию: thumbnail.jpg (основное превью) и
+    # уменьшенные копии в JPEG и WebP для мобильных и веб-клиентов
+    DEFAULT_RENDITIONS = [
+        {"file": "thumbnail.jpg", "width": 1280, "format": "jpg"},
+        {"file": "thumbnail_640.jpg", "width": 640, "format": "jpg"},
+        {"file": "thumbnail_320.jpg", "width": 320, "format": "jpg"},
+        {"file": "thumbnail_1280.webp", "width": 1280, "format": "webp"},
+        {"file": "thumbnail_640.webp", "width": 640, "format": "webp"},
+        {"file": "thumbnail_320.webp", "width": 320, "format": "webp"}
+    ]
+    
+    # Кодеки ffmpeg по форматам (последний аргумент - качество)
+    RENDITION_CODECS = {
+        'jpg': ['-c:v', 'mjpeg', '-q:v'],
+        'webp': ['-c:v', 'libwebp', '-quality'],
+        'avif': ['-c:v', 'libaom-av1', '-still-picture', '1', '-crf']
+    }
+    DEFAULT_QUALITY = {'jpg': 2, 'webp': 80, 'avif': 32}
+    
+    # Манифест сборки хранится рядом с папкой уроков (content/)
+    MANIFEST_NAME = "thumbnails_manifest.json"
+    
+    # Коллаж превью программы: размер и сетка (колонки, строки) по числу уроков
+    PROGRAM_THUMBNAIL_SIZE = (1200, 630)
+    COLLAGE_GRIDS = {1: (1, 1), 2: (2, 1), 3: (3, 1), 4: (2, 2), 6: (3, 2)}
+    
+    def __init__(self, lessons_dir: str, jobs: Optional[int] = None,
+                 seek_mode: str = 'input', candidates: int = 1,
+                 default_timestamp: str = "00:00:05",
+                 force: bool = False, dry_run: bool = False,
+                 renditions: Optional[List[Dict]] = None,
+                 catalog: Optional[Catalog] = None,
+                 metrics: Optional[Metrics] = None):
+        if seek_mode not in self.SEEK_MODES:
+            raise ValueError(f"Неизвестный режим поиска: {seek_mode}")
+        
+        self.renditions = renditions or self.DEFAULT_RENDITIONS
+        for rendition in self.renditions:
+            if rendition.get('format') not in self.RENDITION_CODECS:
+                raise ValueError(f"Неизвестный формат превью: {rendition.get('format')}")
+        if not any(r['file'] == "thumbnail.jpg" for r in self.renditions):
+            raise ValueError("Профиль превью должен содержать thumbnail.jpg")
+        
         self.lessons_dir = Path(lessons_dir)
+        # Общий каталог уроков (может быть передан импортом или валидатором)
+        self.catalog = catalog or Catalog(self.lessons_dir)
+        # Замеры этапов (--metrics-out), по умолчанию выключены
+        self.metrics = metrics or Metrics(enabled=False)
+        # Количество параллельных процессов ffmpeg (по умолчанию = число ядер)
+        self.jobs = max(1, jobs or os.cpu_count() or 1)
+        self.seek_mode = seek_mode
+        # Количество кадров-кандидатов, из которых выбирается лучший
+        self.candidates = max(1, candidates)
+        self.default_timestamp = default_timestamp
+        # force - пересобрать всё, dry_run - только показать план пересборки
+        self.force = force
+        self.dry_run = dry_run
+        self.manifest_path = self.lessons_dir.parent / self.MANIFEST_NAME
+        self.manifest = self.load_manifest('lessons')
+        self.program_manifest = self.load_manifest('programs')
         self.success_count = 0
         self.failed_count = 0
+        self.planned_count = 0
+        self.extraction_time = 0.0
         
     def check_ffmpeg(self) -> bool:
         """Проверка наличия ffmpeg"""
@@ -34,111 +123,445 @@ class ThumbnailGenerator:
             print("  Windows: скачайте с https://ffmpeg.org/download.html")
             return False
     
-    def generate_thumbnail(self, video_path: Path, output_path: Path, 
-                          timestamp: str = "00:00:05") -> bool:
+    def run_renditions(self, input_args: List[str], prefilter: Optional[str],
+                       output_dir: Path, output_args: Optional[List[str]] = None,
+                       log: Optional[List[str]] = None) -> bool:
+        """
+        Создание всех размеров превью за один запуск ffmpeg
+        
+        Кадр декодируется один раз, затем фильтр split раздаёт его
+        на несколько цепочек scale, по одной на каждый размер/формат.
+        
+        Args:
+            input_args: Аргументы входа ffmpeg (включая -ss и -i)
+            prefilter: Фильтр до split (масштабирование кадра до 1280x720)
+            output_dir: Папка для сохранения превью
+            output_args: Дополнительные аргументы для каждого выхода
+            log: Буфер сообщений урока (если не указан - печать сразу)
+        """
+        count = len(self.renditions)
+        split = ''.join(f'[s{i}]' for i in range(count))
+        head = f'{prefilter},' if prefilter else ''
+        graph = [f'[0:v]{head}split={count}{split}']
+        for i, rendition in enumerate(self.renditions):
+            graph.append(f"[s{i}]scale={rendition['width']}:-2[r{i}]")
+        
+        cmd = ['ffmpeg', '-y', *input_args, '-filter_complex', ';'.join(graph)]
+        for i, rendition in enumerate(self.renditions):
+            cmd += ['-map', f'[r{i}]', *(output_args or []), '-frames:v', '1',
+                    *self.encoder_args(rendition), str(output_dir / rendition['file'])]
+        
+        try:
+            with self.metrics.timer('thumbnails.ffmpeg', output_dir.name):
+                subprocess.run(cmd, capture_output=True, text=True, check=True)
+            return True
+        except subprocess.CalledProcessError as e:
+            self._log(log, f"  ❌ Ошибка ffmpeg: {e.stderr}")
+            return False
+        except Exception as e:
+            self._log(log, f"  ❌ Ошибка: {e}")
+            return False
+    
+    def encoder_args(self, rendition: Dict) -> List[str]:
+        """Аргументы кодека для размера превью"""
+        image_format = rendition['format']
+        quality = rendition.get('quality', self.DEFAULT_QUALITY[image_format])
+        return [*self.RENDITION_CODECS[image_format], str(quality)]
+    
+    def generate_thumbnail(self, video_path: Path, output_dir: Path, 
+                          timestamp: str = "00:00:05",
+                          log: Optional[List[str]] = None) -> bool:
         """
         Генерация превью из видео
         
         Args:
             video_path: Путь к видео файлу
-            output_path: Путь для сохранения превью
+            output_dir: Папка для сохранения превью (все размеры из профиля)
             timestamp: Временная метка для кадра (по умолчанию 5 секунда)
+            log: Буфер сообщений урока (если не указан - печать сразу)
         """
-        try:
-            # Команда ffmpeg для извлечения кадра
-            cmd = [
-                'ffmpeg',
-                '-i', str(video_path),
-                '-ss', timestamp,  # Временная метка
-                '-vframes', '1',   # Один кадр
-                '-vf', 'scale=1280:720:force_original_aspect_ratio=decrease,pad=1280:720:(ow-iw)/2:(oh-ih)/2',  # Масштабирование
-                '-q:v', '2',       # Качество (2 = высокое)
-                '-y',              # Перезаписать если существует
-                str(output_path)
-            ]
-            
-            # Запуск ffmpeg
-            result = subprocess.run(
-                cmd,
-                capture_output=True,
-                text=True,
-                check=True
+        # Временная метка: до -i - быстрый поиск, на выходе - точный
+        if self.seek_mode == 'input':
+            return self.run_renditions(
+                ['-ss', timestamp, '-i', str(video_path)],
+                f'{self.SCALE_FILTER},{self.PAD_FILTER}', output_dir, log=log
             )
-            
-            return True
+        return self.run_renditions(
+            ['-i', str(video_path)],
+            f'{self.SCALE_FILTER},{self.PAD_FILTER}', output_dir,
+            output_args=['-ss', timestamp], log=log
+        )
+    
+    def generate_best_thumbnail(self, video_path: Path, output_dir: Path,
+                                timestamps: List[float],
+                                log: Optional[List[str]] = None) -> bool:
+        """
+        Извлечение нескольких кадров-кандидатов за один запуск ffmpeg
+        и создание превью из лучшего из них
+        
+        Каждый кандидат - отдельный вход с быстрым поиском (-ss до -i),
+        поэтому декодируется только короткий участок от ближайшего
+        ключевого кадра. Средняя яркость кадра (YAVG) считается фильтром
+        signalstats в том же проходе. Кандидаты сохраняются в PNG без потерь,
+        поэтому превью всех размеров строятся из лучшего кадра без
+        повторного декодирования видео.
+        
+        Args:
+            video_path: Путь к видео файлу
+            output_dir: Папка для сохранения превью (все размеры из профиля)
+            timestamps: Временные метки кандидатов в секундах
+            log: Буфер сообщений урока (если не указан - печать сразу)
+        """
+        try:
+            with tempfile.TemporaryDirectory() as tmp:
+                cmd = ['ffmpeg', '-y']
+                for timestamp in timestamps:
+                    cmd += ['-ss', f'{timestamp:.2f}', '-i', str(video_path.resolve())]
+                
+                filters = []
+                for i in range(len(timestamps)):
+                    filters.append(
+                        f'[{i}:v]{self.SCALE_FILTER},signalstats,'
+                        f'metadata=mode=print:key=lavfi.signalstats.YAVG:file=stats_{i}.txt,'
+                        f'{self.PAD_FILTER}[c{i}]'
+                    )
+                cmd += ['-filter_complex', ';'.join(filters)]
+                
+                for i in range(len(timestamps)):
+                    cmd += ['-map', f'[c{i}]', '-frames:v', '1', f'candidate_{i}.png']
+                
+                # Относительные имена файлов - чтобы не экранировать пути в фильтрах
+                with self.metrics.timer('thumbnails.candidates', output_dir.name):
+                    subprocess.run(cmd, capture_output=True, text=True, check=True, cwd=tmp)
+                
+                scored = []
+                for i, timestamp in enumerate(timestamps):
+                    candidate = Path(tmp) / f'candidate_{i}.png'
+                    if candidate.exists():
+                        score = self.score_candidate(candidate, Path(tmp) / f'stats_{i}.txt')
+                        scored.append((score, timestamp, candidate))
+                
+                if not scored:
+                    self._log(log, "  ❌ ffmpeg не извлёк ни одного кадра")
+                    return False
+                
+                score, timestamp, best = max(scored, key=lambda item: item[0])
+                self._log(log, f"  🖼  Выбран кадр {timestamp:.0f} сек из {len(scored)} кандидатов")
+                return self.run_renditions(['-i', str(best)], None, output_dir, log=log)
             
         except subprocess.CalledProcessError as e:
-            print(f"  ❌ Ошибка ffmpeg: {e.stderr}")
+            self._log(log, f"  ❌ Ошибка ffmpeg: {e.stderr}")
             return False
         except Exception as e:
-            print(f"  ❌ Ошибка: {e}")
+            self._log(log, f"  ❌ Ошибка: {e}")
             return False
     
-    def process_lesson(self, lesson_path: Path):
-        """Обработка одного урока"""
-        lesson_id = lesson_path.name.split('_')[0]
+    @staticmethod
+    def score_candidate(image_path: Path, stats_path: Path) -> float:
+        """
+        Дешёвая оценка качества кадра
+        
+        Резкость - размер сжатого кадра (чем больше
+        деталей, тем хуже сжатие). Яркость - штраф за тёмные и пересвеченные
+        кадры (затемнения, титры), 128 - идеальная средняя яркость.
+        """
+        sharpness = image_path.stat().st_size
+        
+        brightness = None
+        if stats_path.exists():
+            for line in stats_path.read_text().splitlines():
+                if line.startswith('lavfi.signalstats.YAVG='):
+                    brightness = float(line.split('=', 1)[1])
+        
+        if brightness is None:
+            return float(sharpness)
+        return sharpness * max(0.0, 1.0 - abs(brightness - 128) / 128)
+    
+    @staticmethod
+    def parse_timestamp(timestamp: str) -> float:
+        """Перевод временной метки (SS, MM:SS или HH:MM:SS) в секунды"""
+        seconds = 0.0
+        for part in timestamp.split(':'):
+            seconds = seconds * 60 + float(part)
+        return seconds
+    
+    def candidate_timestamps(self, duration: int) -> List[float]:
+        """
+        Временные метки кандидатов (в секундах)
+        
+        Кадры равномерно распределяются по первой четверти урока,
+        если длительность неизвестна - идут с шагом 2 сек от метки по умолчанию.
+        """
+        if duration > 2:
+            window = duration * 60 / 4
+            return [window * (i + 1) / (self.candidates + 1) for i in range(self.candidates)]
+        
+        start = self.parse_timestamp(self.default_timestamp)
+        return [start + 2 * i for i in range(self.candidates)]
+    
+    def load_manifest(self, section: str) -> Dict:
+        """Загрузка раздела манифеста сборки превью (lessons или programs)"""
+        if not self.manifest_path.exists():
+            return {}
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                return json.load(f).get(section, {})
+        except (json.JSONDecodeError, OSError):
+            print(f"⚠️  Манифест повреждён, будет создан заново: {self.manifest_path}")
+            return {}
+    
+    def save_manifest(self, lesson_keys: Optional[List[str]] = None,
+                      program_keys: Optional[List[str]] = None):
+        """
+        Атомарное сохранение манифеста
+        
+        Если передан список ключей, записи отсутствующих уроков/программ
+        отбрасываются, иначе раздел сохраняется как есть.
+        """
+        lessons = self.manifest
+        if lesson_keys is not None:
+            lessons = {key: lessons[key] for key in lesson_keys if key in lessons}
+        programs = self.program_manifest
+        if program_keys is not None:
+            programs = {key: programs[key] for key in program_keys if key in programs}
+        
+        tmp_path = self.manifest_path.with_suffix('.json.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({"lessons": lessons, "programs": programs}, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.manifest_path)
+    
+    @staticmethod
+    def file_sha256(path: Path) -> str:
+        """SHA-256 файла, читается блоками по 1 MB"""
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+    
+    def video_fingerprint(self, video_path: Path, previous: Optional[Dict]) -> Dict:
+        """
+        Отпечаток видео: размер, mtime и хеш
+        
+        Хеш пересчитывается только при изменении размера или mtime,
+        поэтому прогон без изменений не читает содержимое видео.
+        """
+        stat = video_path.stat()
+        fingerprint = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+        
+        old = (previous or {}).get('video', {})
+        if old.get('size') == stat.st_size and old.get('mtime_ns') == stat.st_mtime_ns:
+            fingerprint['sha256'] = old.get('sha256')
+        else:
+            with self.metrics.timer('thumbnails.hash', video_path.parent.name, stat.st_size):
+                fingerprint['sha256'] = self.file_sha256(video_path)
+        return fingerprint
+    
+    def render_params(self, lesson: LessonRecord) -> Dict:
+        """Параметры ffmpeg для урока (входят в ключ кеша)"""
+        # Получение длительности видео для выбора оптимального кадра
+        metadata = lesson.metadata()
+        timestamp = self.default_timestamp
+        duration = 0
+        
+        if metadata is not None:
+            duration = metadata.get('duration', 0)
+            # Берём кадр из середины первой минуты или 1/4 длительности
+            if duration > 2:
+                optimal_second = min(duration * 60 // 4, 30)
+                timestamp = f"00:00:{optimal_second:02d}"
+        
+        if self.candidates > 1:
+            timestamps = [round(t, 2) for t in self.candidate_timestamps(duration)]
+        else:
+            timestamps = [timestamp]
+        
+        return {
+            "seek_mode": self.seek_mode,
+            "timestamps": timestamps,
+            "filter": f"{self.SCALE_FILTER},{self.PAD_FILTER}",
+            "renditions": self.renditions
+        }
+    
+    def rebuild_reason(self, lesson: LessonRecord, previous: Optional[Dict],
+                       video: Dict, params: Dict) -> Optional[str]:
+        """Причина пересборки превью или None, если превью актуально"""
+        if self.force:
+            return "принудительная пересборка"
+        missing = [r['file'] for r in self.renditions if not lesson.has_file(r['file'])]
+        if missing:
+            return f"нет превью: {', '.join(missing)}"
+        if previous is None:
+            # Превью создано до появления манифеста - принимаем как есть
+            return None
+        if previous.get('video', {}).get('sha256') != video['sha256']:
+            return "видео изменилось"
+        if previous.get('params') != params:
+            return "изменились параметры ffmpeg"
+        return None
+    
+    def rendition_info(self, lesson_path: Path) -> List[Dict]:
+        """Пути и размеры созданных превью для metadata.json"""
+        info = []
+        for rendition in self.renditions:
+            path = lesson_path / rendition['file']
+            if path.exists():
+                info.append({
+                    "url": str(path.relative_to(self.lessons_dir.parent)),
+                    "width": rendition['width'],
+                    "height": rendition['width'] * 720 // 1280 // 2 * 2,
+                    "format": rendition['format'],
+                    "bytes": path.stat().st_size
+                })
+        return info
+    
+    def update_metadata(self, lesson: LessonRecord) -> bool:
+        """Запись списка превью в metadata.json (только если он изменился)"""
+        if lesson.metadata() is None:
+            return False
+        
+        thumbnails = self.rendition_info(lesson.path)
+        if lesson.metadata().get('thumbnails') == thumbnails:
+            return False
+        
+        # Запись через временный файл: параллельные читатели не видят недописанный JSON
+        metadata = dict(lesson.metadata(), thumbnails=thumbnails)
+        written = write_if_changed(lesson.metadata_path, json.dumps(metadata, ensure_ascii=False, indent=2))
+        lesson.invalidate()
+        return written
+    
+    @staticmethod
+    def _log(log: Optional[List[str]], message: str):
+        """Запись сообщения в буфер урока или сразу в консоль"""
+        if log is None:
+            print(message)
+        else:
+            log.append(message)
+    
+    def render_lesson(self, lesson: LessonRecord) -> ThumbnailResult:
+        """
+        Генерация превью одного урока без изменения счётчиков
+        
+        Безопасно вызывается из нескольких потоков: весь вывод урока
+        собирается в буфер и печатается целиком в record_result.
+        """
+        lesson_path = lesson.path
+        lesson_id = lesson.id
+        result = ThumbnailResult(lesson_key=lesson.folder, status=None)
+        log = result.log
         
         # Проверка наличия видео
         video_path = lesson_path / "video.mp4"
-        if not video_path.exists():
-            print(f"⚠️  Урок {lesson_id}: Видео не найдено, пропускаем")
-            self.failed_count += 1
-            return
+        if lesson.file_identity("video.mp4") is None:
+            log.append(f"⚠️  Урок {lesson_id}: Видео не найдено, пропускаем")
+            result.status = False
+            return result
         
-        # Путь для превью
-        thumbnail_path = lesson_path / "thumbnail.jpg"
+        # Сравнение входных данных с манифестом
+        previous = self.manifest.get(lesson.folder)
+        params = self.render_params(lesson)
+        video = self.video_fingerprint(video_path, previous)
+        result.reason = self.rebuild_reason(lesson, previous, video, params)
         
-        # Если превью уже существует
-        if thumbnail_path.exists():
-            print(f"⏭  Урок {lesson_id}: Превью уже существует, пропускаем")
-            return
+        if result.reason is None:
+            log.append(f"⏭  Урок {lesson_id}: Превью актуально, пропускаем")
+            # Обновляем mtime в записи, чтобы не пересчитывать хеш в следующий раз
+            result.entry = dict(previous or {"params": params,
+                                             "generated_at": None}, video=video)
+            if not self.dry_run and self.update_metadata(lesson):
+                log.append(f"  📝 Список превью обновлён в metadata.json")
+            return result
         
-        print(f"🎬 Урок {lesson_id}: Генерация превью...")
+        if self.dry_run:
+            log.append(f"🔁 Урок {lesson_id}: Будет пересобрано ({result.reason})")
+            return result
         
-        # Получение длительности видео для выбора оптимального кадра
-        metadata_path = lesson_path / "metadata.json"
-        timestamp = "00:00:05"  # По умолчанию 5 секунда
-        
-        if metadata_path.exists():
-            with open(metadata_path, 'r', encoding='utf-8') as f:
-                metadata = json.load(f)
-                duration = metadata.get('duration', 0)
-                # Берём кадр из середины первой минуты или 1/4 длительности
-                if duration > 2:
-                    optimal_second = min(duration * 60 // 4, 30)
-                    timestamp = f"00:00:{optimal_second:02d}"
+        log.append(f"🎬 Урок {lesson_id}: Генерация превью ({result.reason})...")
         
         # Генерация превью
-        if self.generate_thumbnail(video_path, thumbnail_path, timestamp):
-            print(f"  ✅ Превью создано: {thumbnail_path}")
-            self.success_count += 1
+        started = time.perf_counter()
+        if self.candidates > 1:
+            ok = self.generate_best_thumbnail(
+                video_path, lesson_path, params['timestamps'], log=log
+            )
         else:
-            print(f"  ❌ Не удалось создать превью")
+            ok = self.generate_thumbnail(video_path, lesson_path, params['timestamps'][0], log=log)
+        result.elapsed = time.perf_counter() - started
+        # В папке урока появились новые файлы превью
+        lesson.invalidate()
+        
+        if ok:
+            self.update_metadata(lesson)
+            total_bytes = sum(item['bytes'] for item in self.rendition_info(lesson_path))
+            self.metrics.record('thumbnails.lesson', result.elapsed, lesson.folder, total_bytes)
+            log.append(f"  ✅ Превью создано: {lesson_path / 'thumbnail.jpg'} "
+                       f"(+{len(self.renditions) - 1} размеров, {total_bytes / 1024:.0f} KB, "
+                       f"{result.elapsed:.2f} сек)")
+            result.status = True
+            result.entry = {
+                "video": video,
+                "params": params,
+                "generated_at": datetime.now().isoformat(timespec='seconds')
+            }
+        else:
+            self.metrics.record('thumbnails.lesson', result.elapsed, lesson.folder, failed=True)
+            log.append(f"  ❌ Не удалось создать превью")
+            result.status = False
+        return result
+    
+    def record_result(self, result: ThumbnailResult):
+        """Печать вывода урока и обновление счётчиков (только из главного потока)"""
+        for message in result.log:
+            print(message)
+        self.extraction_time += result.elapsed
+        if result.entry is not None:
+            self.manifest[result.lesson_key] = result.entry
+        if self.dry_run and result.reason is not None:
+            self.planned_count += 1
+        if result.status is True:
+            self.success_count += 1
+        elif result.status is False:
             self.failed_count += 1
     
+    def process_lesson(self, lesson: LessonRecord):
+        """Обработка одного урока"""
+        self.record_result(self.render_lesson(lesson))
+    
     def process_all_lessons(self):
         """Обработка всех уроков"""
         print("\n" + "=" * 60)
         print("🚀 ГЕНЕРАЦИЯ ПРЕВЬЮ ДЛЯ УРОКОВ")
         print("=" * 60 + "\n")
         
-        # Проверка ffmpeg
-        if not self.check_ffmpeg():
+        # Проверка ffmpeg (в режиме dry-run ffmpeg не запускается)
+        if not self.dry_run and not self.check_ffmpeg():
             return
         
         # Получение списка уроков
-        lesson_dirs = sorted([d for d in self.lessons_dir.iterdir() 
-                            if d.is_dir() and not d.name.startswith('.')])
+        lessons = self.catalog.lessons()
         
-        if not lesson_dirs:
+        if not lessons:
             print("❌ Уроки не найдены в папке:", self.lessons_dir)
             return
         
-        print(f"Найдено уроков: {len(lesson_dirs)}\n")
+        print(f"Найдено уроков: {len(lessons)}")
+        print(f"Параллельных задач: {self.jobs}")
+        print(f"Режим поиска кадра: {self.seek_mode}, кандидатов: {self.candidates}\n")
+        
+        if self.jobs == 1:
+            # Последовательная обработка
+            for lesson in lessons:
+                self.process_lesson(lesson)
+        else:
+            # Пул потоков: каждый поток ждёт свой процесс ffmpeg.
+            # map() отдаёт результаты в исходном порядке, поэтому вывод
+            # уроков не перемешивается, а счётчики меняет только главный поток.
+            with ThreadPoolExecutor(max_workers=self.jobs) as executor:
+                for result in executor.map(self.render_lesson, lessons):
+                    self.record_result(result)
         
-        # Обработка каждого урока
-        for lesson_dir in lesson_dirs:
-            self.process_lesson(lesson_dir)
+        if not self.dry_run:
+            self.save_manifest([lesson.folder for lesson in lessons])
         
         # Итоговая статистика
         print("\n" + "=" * 60)
@@ -147,12 +570,160 @@ class ThumbnailGenerator:
         print(f"\n✅ Успешно создано: {self.success_count}")
         print(f"❌ Ошибок: {self.failed_count}")
         print(f"📊 Всего обработано: {self.success_count + self.failed_count}")
+        if self.dry_run:
+            print(f"🔁 Будет пересобрано: {self.planned_count}")
+        if self.success_count:
+            print(f"⏱  Извлечение кадров: {self.extraction_time:.2f} сек "
+                  f"(в среднем {self.extraction_time / self.success_count:.2f} сек на урок)")
+    
+    def lesson_thumbnail_index(self) -> Dict[str, Path]:
+        """Превью уроков по ID (для коллажа берётся уменьшенная копия, если есть)"""
+        index = {}
+        for lesson in self.catalog.lessons():
+            for name in ("thumbnail_640.jpg", "thumbnail.jpg"):
+                if lesson.has_file(name):
+                    index[lesson.id] = lesson.path / name
+                    break
+        return index
+    
+    def generate_collage(self, tiles: List[Path], output_path: Path,
+                         template_image: Optional[Path] = None,
+                         log: Optional[List[str]] = None) -> bool:
+        """
+        Сборка коллажа из готовых превью уроков (видео не декодируется)
+        
+        Args:
+            tiles: Превью уроков (1, 2, 3, 4 или 6 штук)
+            output_path: Путь для сохранения коллажа
+            template_image: Изображение, накладываемое поверх коллажа (рамка, логотип)
+            log: Буфер сообщений программы (если не указан - печать сразу)
+        """
+        width, height = self.PROGRAM_THUMBNAIL_SIZE
+        columns, rows = self.COLLAGE_GRIDS[len(tiles)]
+        tile_w, tile_h = width // columns, height // rows
+        
+        cmd = ['ffmpeg', '-y']
+        for tile in tiles:
+            cmd += ['-i', str(tile)]
+        if template_image:
+            cmd += ['-i', str(template_image)]
+        
+        graph = []
+        for i in range(len(tiles)):
+            graph.append(
+                f'[{i}:v]scale={tile_w}:{tile_h}:force_original_aspect_ratio=increase,'
+                f'crop={tile_w}:{tile_h},setsar=1[t{i}]'
+            )
+        if len(tiles) > 1:
+            layout = '|'.join(
+                f'{(i % columns) * tile_w}_{(i // columns) * tile_h}' for i in range(len(tiles))
+            )
+            inputs = ''.join(f'[t{i}]' for i in range(len(tiles)))
+            graph.append(f'{inputs}xstack=inputs={len(tiles)}:layout={layout}[grid]')
+        else:
+            graph.append('[t0]null[grid]')
+        if template_image:
+            graph.append(f'[{len(tiles)}:v]scale={width}:{height}[tpl]')
+            graph.append('[grid][tpl]overlay=0:0[out]')
+        else:
+            graph.append('[grid]null[out]')
+        
+        cmd += ['-filter_complex', ';'.join(graph),
+                '-map', '[out]', '-frames:v', '1', '-q:v', '2', str(output_path)]
+        
+        try:
+            with self.metrics.timer('thumbnails.collage', output_path.parent.name):
+                subprocess.run(cmd, capture_output=True, text=True, check=True)
+            return True
+        except subprocess.CalledProcessError as e:
+            self._log(log, f"  ❌ Ошибка ffmpeg: {e.stderr}")
+            return False
+        except Exception as e:
+            self._log(log, f"  ❌ Ошибка: {e}")
+            return False
+    
+    def render_program(self, program: ProgramRecord, lesson_thumbnails: Dict[str, Path],
+                       template_image: Optional[Path] = None) -> ThumbnailResult:
+        """
+        Генерация превью одной программы без изменения общего состояния
+        
+        Коллаж пересобирается, только если изменился набор превью уроков
+        (по их хешам) или шаблон. Превью, созданное вручную до появления
+        манифеста, не перезаписывается без --force.
+        """
+        program_data = program.data()
+        
+        program_id = program_data['id']
+        program_name = program.id
+        result = ThumbnailResult(lesson_key=program_name, status=None)
+        log = result.log
+        
+        thumbnail_path = program.path.parent / program_name / "thumbnail.jpg"
+        
+        # Уроки программы с готовыми превью (в порядке программы)
+        lesson_ids = [lesson_id for lesson_id in program_data.get('lessons', [])
+                      if lesson_id in lesson_thumbnails]
+        missing = [lesson_id for lesson_id in program_data.get('lessons', [])
+                   if lesson_id not in lesson_thumbnails]
+        if missing:
+            log.append(f"⚠️  Программа {program_id}: Нет превью уроков {', '.join(missing)}")
+        
+        if not lesson_ids:
+            log.append(f"❌ Программа {program_id}: Нет ни одного превью урока для коллажа")
+            result.status = False
+            return result
+        
+        count = max(n for n in self.COLLAGE_GRIDS if n <= len(lesson_ids))
+        tiles = [lesson_thumbnails[lesson_id] for lesson_id in lesson_ids[:count]]
+        
+        # Ключ кеша - хеши входных превью и шаблона
+        inputs = {lesson_id: self.file_sha256(tile)
+                  for lesson_id, tile in zip(lesson_ids, tiles)}
+        if template_image:
+            inputs['template'] = self.file_sha256(template_image)
+        params = {"inputs": inputs, "size": list(self.PROGRAM_THUMBNAIL_SIZE)}
+        
+        previous = self.program_manifest.get(program_name)
+        if self.force:
+            result.reason = "принудительная пересборка"
+        elif not thumbnail_path.exists():
+            result.reason = "нет превью"
+        elif previous is None:
+            log.append(f"⏭  Программа {program_id}: Превью создано вручную, пропускаем")
+            return result
+        elif previous.get('params') != params:
+            result.reason = "изменились превью уроков"
+        else:
+            log.append(f"⏭  Программа {program_id}: Превью актуально, пропускаем")
+            return result
+        
+        if self.dry_run:
+            log.append(f"🔁 Программа {program_id}: Будет пересобрано ({result.reason})")
+            return result
+        
+        log.append(f"🎨 Программа {program_id}: Коллаж из {len(tiles)} превью ({result.reason})...")
+        thumbnail_path.parent.mkdir(exist_ok=True)
+        
+        if self.generate_collage(tiles, thumbnail_path, template_image, log=log):
+            log.append(f"  ✅ Превью создано: {thumbnail_path}")
+            result.status = True
+            result.entry = {
+                "params": params,
+                "generated_at": datetime.now().isoformat(timespec='seconds')
+            }
+        else:
+            log.append(f"  ❌ Не удалось создать превью")
+            result.status = False
+        return result
     
     def generate_program_thumbnails(self, programs_dir: Path, 
                                    template_image: Path = None):
         """
         Генерация превью для программ
         
+        Превью программы (1200x630) собирается из превью её уроков,
+        программы обрабатываются параллельно.
+        
         Args:
             programs_dir: Папка с программами
             template_image: Шаблон изображения (опционально)
@@ -165,28 +736,33 @@ class ThumbnailGenerator:
             print("⚠️  Папка программ не найдена")
             return
         
-        program_files = list(programs_dir.glob("*.json"))
+        if not self.dry_run and not self.check_ffmpeg():
+            return
         
-        for program_file in program_files:
-            with open(program_file, 'r', encoding='utf-8') as f:
-                program_data = json.load(f)
-            
-            program_id = program_data['id']
-            program_name = program_file.stem
-            
-            # Создание папки для программы
-            program_folder = programs_dir / program_name
-            program_folder.mkdir(exist_ok=True)
-            
-            thumbnail_path = program_folder / "thumbnail.jpg"
-            
-            if thumbnail_path.exists():
-                print(f"⏭  Программа {program_id}: Превью уже существует")
-            else:
-                print(f"⚠️  Программа {program_id}: Создайте превью вручную")
-                print(f"     Путь: {thumbnail_path}")
-                print(f"     Размер: 1200x630 px")
-                print(f"     Формат: JPG\n")
+        programs = self.catalog.programs(programs_dir)
+        lesson_thumbnails = self.lesson_thumbnail_index()
+        
+        created, failed = 0, 0
+        with ThreadPoolExecutor(max_workers=self.jobs) as executor:
+            results = executor.map(
+                lambda program: self.render_program(program, lesson_thumbnails, template_image),
+                programs
+            )
+            for result in results:
+                for message in result.log:
+                    print(message)
+                if result.entry is not None:
+                    self.program_manifest[result.lesson_key] = result.entry
+                if result.status is True:
+                    created += 1
+                elif result.status is False:
+                    failed += 1
+        
+        if not self.dry_run:
+            self.save_manifest(program_keys=[program.id for program in programs])
+        
+        print(f"\n✅ Превью программ создано: {created}")
+        print(f"❌ Ошибок: {failed}")
 
 
 def main():
@@ -202,21 +778,75 @@ def main():
         '--programs',
         help='Папка с программами (опционально)'
     )
+    parser.add_argument(
+        '--program-template',
+        help='Изображение, накладываемое поверх коллажа программы (опционально)'
+    )
     parser.add_argument(
         '--timestamp',
         default='00:00:05',
         help='Временная метка для кадра (по умолчанию 00:00:05)'
     )
+    parser.add_argument(
+        '--seek',
+        choices=ThumbnailGenerator.SEEK_MODES,
+        default='input',
+        help='Режим поиска кадра: input - быстрый (по умолчанию), output - точный'
+    )
+    parser.add_argument(
+        '--candidates',
+        type=int,
+        default=1,
+        help='Количество кадров-кандидатов для выбора лучшего превью (по умолчанию 1)'
+    )
+    parser.add_argument(
+        '--force',
+        action='store_true',
+        help='Пересоздать все превью, игнорируя манифест сборки'
+    )
+    parser.add_argument(
+        '--dry-run',
+        action='store_true',
+        help='Показать, какие превью будут пересобраны и почему, без запуска ffmpeg'
+    )
+    parser.add_argument(
+        '--renditions',
+        help='JSON файл с профилем размеров превью (по умолчанию 1280/640/320 в JPEG и WebP)'
+    )
+    parser.add_argument(
+        '--jobs',
+        type=int,
+        default=os.cpu_count(),
+        help='Количество параллельных процессов ffmpeg (по умолчанию число ядер CPU)'
+    )
+    add_arguments(parser)
     
     args = parser.parse_args()
     
-    # Генерация превью для уроков
-    generator = ThumbnailGenerator(lessons_dir=args.input)
-    generator.process_all_lessons()
+    renditions = None
+    if args.renditions:
+        with open(args.renditions, 'r', encoding='utf-8') as f:
+            renditions = json.load(f)
     
-    # Генерация превью для программ (если указано)
-    if args.programs:
-        generator.generate_program_thumbnails(Path(args.programs))
+    with instrumented(args, 'generate_thumbnails') as metrics:
+        # Генерация превью для уроков
+        generator = ThumbnailGenerator(
+            lessons_dir=args.input,
+            jobs=args.jobs,
+            seek_mode=args.seek,
+            candidates=args.candidates,
+            default_timestamp=args.timestamp,
+            force=args.force,
+            dry_run=args.dry_run,
+            renditions=renditions,
+            metrics=metrics
+        )
+        generator.process_all_lessons()
+        
+        # Генерация превью для программ (если указано)
+        if args.programs:
+            template = Path(args.program_template) if args.program_template else None
+            generator.generate_program_thumbnails(Path(args.programs), template)
 
 
 if __name__ == '__main__':
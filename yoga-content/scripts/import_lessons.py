@@ -6,129 +6,293 @@
 
 import os
 import json
+import errno
+import gzip
+import hashlib
 import shutil
 import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
-from typing import Dict, List
+from typing import Dict, List, Optional, Tuple
 import jsonschema
 
+from catalog import Catalog, ProgramRecord, write_if_changed
+from catalog_db import CATALOG_DB_NAME, write_catalog_db
+from instrumentation import Metrics, add_arguments, instrumented, timed
+from lesson_query import QUERY_INDEX_NAME, build_query_index, lesson_facets
+from lesson_search import SEARCH_INDEX_NAME, lesson_terms, write_search_index
+from lesson_similarity import SIMILAR_COUNT, SIMILARITY_INDEX_NAME, build_similarity_index, np
+from program_summary import PROGRAM_SUMMARY_NAME, build_program_summaries, lesson_stats
+from render_descriptions import DescriptionRenderer
+from translit import transliterate
+
+try:
+    import fcntl
+except ImportError:  # Windows: reflink недоступен, будет копирование
+    fcntl = None
+
+try:
+    import brotli
+except ImportError:  # pip install brotli - для .br версий каталога
+    brotli = None
+
 
 class LessonImporter:
     """Импортер уроков йоги"""
     
-    def __init__(self, source_dir: str, output_dir: str, schema_path: str):
+    # Способы переноса видео в каталог уроков
+    LINK_MODES = ('copy', 'hardlink', 'reflink', 'symlink', 'move')
+    
+    # ioctl FICLONE (Linux): copy-on-write клон файла на btrfs/XFS
+    FICLONE = 0x40049409
+    
+    COPY_CHUNK_SIZE = 8 * 1024 * 1024
+    
+    # Журнал пакетного импорта (JSON Lines: id урока и отпечаток входных данных)
+    JOURNAL_NAME = ".import_journal.jsonl"
+    
+    INDEX_NAME = "lessons_index.json"
+    # Кеш индекса: для каждой папки урока - размер и mtime metadata.json
+    # и уже сериализованный фрагмент индекса
+    INDEX_CACHE_NAME = ".lessons_index_cache.json"
+    INDEX_CACHE_VERSION = 4
+    
+    # Поля урока в облегчённом индексе каталога
+    SUMMARY_FIELDS = ('id', 'title', 'category', 'level', 'duration')
+    CATALOG_MANIFEST_NAME = "catalog.json"
+    CATALOG_PAGE_SIZE = 50
+    
+    def __init__(self, source_dir: str, output_dir: str, schema_path: str,
+                 link_mode: str = 'copy', templates_dir: Optional[str] = None,
+                 catalog: Optional[Catalog] = None, metrics: Optional[Metrics] = None):
+        if link_mode not in self.LINK_MODES:
+            raise ValueError(f"Неизвестный режим импорта видео: {link_mode}")
+        
         self.source_dir = Path(source_dir)
         self.output_dir = Path(output_dir)
         self.schema_path = Path(schema_path)
+        self.link_mode = link_mode
+        self.journal_path = self.output_dir / self.JOURNAL_NAME
+        # Общий каталог уроков: папки сканируются один раз за процесс
+        self.catalog = catalog or Catalog(self.output_dir)
+        # Замеры этапов (--metrics-out), по умолчанию выключены
+        self.metrics = metrics or Metrics(enabled=False)
+        # Шаблоны описаний компилируются один раз на весь импорт
+        self.renderer = DescriptionRenderer(templates_dir or Path(__file__).parent.parent / "templates")
+        # Буфер вывода текущего потока (при параллельном импорте)
+        self._local = threading.local()
         self.schema = self._load_schema()
+        # Схема проверяется один раз, валидатор переиспользуется для всех уроков
+        validator_class = jsonschema.validators.validator_for(self.schema)
+        validator_class.check_schema(self.schema)
+        self.validator = validator_class(self.schema)
         
     def _load_schema(self) -> Dict:
         """Загрузка JSON схемы для валидации"""
         with open(self.schema_path, 'r', encoding='utf-8') as f:
             return json.load(f)
     
+    def _log(self, message: str):
+        """
+        Вывод сообщения об импорте
+        
+        В рабочем потоке пакетного импорта сообщения копятся в буфере урока
+        и печатаются одним блоком, чтобы вывод разных уроков не перемешивался.
+        """
+        buffer = getattr(self._local, 'buffer', None)
+        if buffer is None:
+            print(message)
+        else:
+            buffer.append(message)
+    
     def validate_lesson(self, lesson_data: Dict) -> bool:
         """Валидация данных урока по схеме"""
-        try:
-            jsonschema.validate(instance=lesson_data, schema=self.schema)
-            return True
-        except jsonschema.exceptions.ValidationError as e:
-            print(f"❌ Ошибка валидации: {e.message}")
+        with self.metrics.timer('import.schema', lesson_data.get('id')):
+            error = jsonschema.exceptions.best_match(self.validator.iter_errors(lesson_data))
+        if error is not None:
+            self._log(f"❌ Ошибка валидации: {error.message}")
             return False
+        return True
+    
+    def lesson_folder_name(self, lesson_id: str, lesson_title: str) -> str:
+        """Имя папки урока: ID и транслитерированное название"""
+        return f"{lesson_id}_{self._transliterate(lesson_title)}"
     
     def create_lesson_folder(self, lesson_id: str, lesson_title: str) -> Path:
         """Создание папки для урока"""
-        # Транслитерация названия для папки
-        folder_name = f"{lesson_id}_{self._transliterate(lesson_title)}"
-        lesson_path = self.output_dir / folder_name
+        lesson_path = self.output_dir / self.lesson_folder_name(lesson_id, lesson_title)
         lesson_path.mkdir(parents=True, exist_ok=True)
         return lesson_path
     
     def _transliterate(self, text: str) -> str:
         """Простая транслитерация русского текста"""
-        translit_map = {
-            'а': 'a', 'б': 'b', 'в': 'v', 'г': 'g', 'д': 'd', 'е': 'e', 'ё': 'yo',
-            'ж': 'zh', 'з': 'z', 'и': 'i', 'й': 'y', 'к': 'k', 'л': 'l', 'м': 'm',
-            'н': 'n', 'о': 'o', 'п': 'p', 'р': 'r', 'с': 's', 'т': 't', 'у': 'u',
-            'ф': 'f', 'х': 'h', 'ц': 'ts', 'ч': 'ch', 'ш': 'sh', 'щ': 'sch',
-            'ъ': '', 'ы': 'y', 'ь': '', 'э': 'e', 'ю': 'yu', 'я': 'ya',
-            ' ': '_', '-': '_'
-        }
-        result = []
-        for char in text.lower():
-            result.append(translit_map.get(char, char))
-        return ''.join(result)[:50]  # Ограничение длины
+        return transliterate(text)[:50]  # Ограничение длины
+    
+    def video_up_to_date(self, source_video: Path, video_dest: Path) -> bool:
+        """Видео в уроке уже соответствует исходному (повторный импорт)"""
+        if not video_dest.exists():
+            return False
+        if video_dest.is_symlink():
+            return self.link_mode == 'symlink' and os.path.samefile(source_video, video_dest)
+        if self.link_mode == 'hardlink' and os.path.samefile(source_video, video_dest):
+            return True
+        
+        # copy/reflink/move сохраняют размер и mtime исходника; так же
+        # сверяется копия, сделанная вместо недоступной ссылки (transfer_video)
+        source_stat = source_video.stat()
+        dest_stat = video_dest.stat()
+        return (source_stat.st_size == dest_stat.st_size
+                and source_stat.st_mtime_ns == dest_stat.st_mtime_ns)
+    
+    def reflink(self, source_video: Path, video_dest: Path):
+        """Copy-on-write клон файла (без копирования данных)"""
+        if fcntl is None:
+            raise OSError(errno.ENOTSUP, "reflink не поддерживается")
+        with open(source_video, 'rb') as src, open(video_dest, 'wb') as dst:
+            fcntl.ioctl(dst.fileno(), self.FICLONE, src.fileno())
+        shutil.copystat(source_video, video_dest)
+    
+    def chunked_copy(self, source_video: Path, video_dest: Path):
+        """
+        Копирование блоками с проверкой контрольной суммы
+        
+        Хеш исходника считается во время копирования, затем копия
+        перечитывается и сверяется, чтобы не получить битое видео.
+        """
+        source_hash = hashlib.sha256()
+        with open(source_video, 'rb') as src, open(video_dest, 'wb') as dst:
+            while True:
+                chunk = src.read(self.COPY_CHUNK_SIZE)
+                if not chunk:
+                    break
+                source_hash.update(chunk)
+                dst.write(chunk)
+        
+        dest_hash = hashlib.sha256()
+        with open(video_dest, 'rb') as f:
+            for chunk in iter(lambda: f.read(self.COPY_CHUNK_SIZE), b''):
+                dest_hash.update(chunk)
+        
+        if dest_hash.digest() != source_hash.digest():
+            raise OSError(errno.EIO, f"Контрольная сумма копии не совпадает: {video_dest}")
+        shutil.copystat(source_video, video_dest)
+    
+    def transfer_video(self, source_video: Path, video_dest: Path) -> str:
+        """
+        Перенос видео выбранным способом
+        
+        Если файловая система не поддерживает hardlink/reflink/rename
+        (другой диск, FAT, сетевой ресурс), используется копирование.
+        
+        Returns:
+            Фактически использованный способ
+        """
+        mode = self.link_mode
+        try:
+            if mode == 'hardlink':
+                os.link(source_video, video_dest)
+                return mode
+            if mode == 'symlink':
+                os.symlink(source_video.resolve(), video_dest)
+                return mode
+            if mode == 'move':
+                os.rename(source_video, video_dest)
+                return mode
+            if mode == 'reflink':
+                self.reflink(source_video, video_dest)
+                return mode
+        except OSError as e:
+            if video_dest.exists() or video_dest.is_symlink():
+                video_dest.unlink()
+            self._log(f"  ⚠ {mode} недоступен ({e.strerror or e}), видео будет скопировано")
+        
+        self.chunked_copy(source_video, video_dest)
+        if mode == 'move':
+            source_video.unlink()
+            return 'move'
+        return 'copy'
     
     def copy_video(self, source_video: Path, lesson_path: Path) -> str:
-        """Копирование видео файла"""
+        """Импорт видео файла (копия, ссылка или перенос - см. link_mode)"""
         video_dest = lesson_path / "video.mp4"
-        if source_video.exists():
-            shutil.copy2(source_video, video_dest)
-            print(f"  ✓ Видео скопировано: {video_dest}")
-            return str(video_dest.relative_to(self.output_dir.parent))
-        else:
-            print(f"  ⚠ Видео не найдено: {source_video}")
+        video_url = str(video_dest.relative_to(self.output_dir.parent))
+        
+        if not source_video.exists():
+            self._log(f"  ⚠ Видео не найдено: {source_video}")
             return ""
+        
+        if self.video_up_to_date(source_video, video_dest):
+            self._log(f"  ✓ Видео не изменилось: {video_dest}")
+            return video_url
+        
+        # Запись во временный файл и атомарная замена: прерванный импорт
+        # не оставляет в уроке недописанное видео
+        tmp_dest = lesson_path / ".video.mp4.tmp"
+        if tmp_dest.exists() or tmp_dest.is_symlink():
+            tmp_dest.unlink()
+        try:
+            with self.metrics.timer('import.video', lesson_path.name, source_video.stat().st_size):
+                mode = self.transfer_video(source_video, tmp_dest)
+            os.replace(tmp_dest, video_dest)
+        finally:
+            if tmp_dest.exists() or tmp_dest.is_symlink():
+                tmp_dest.unlink()
+        
+        self._log(f"  ✓ Видео импортировано ({mode}): {video_dest}")
+        return video_url
+    
+    def resolve_urls(self, lesson_data: Dict, lesson_path: Path, video_path: Optional[Path]):
+        """Пути к видео и превью урока относительно папки контента"""
+        video_dest = lesson_path / "video.mp4"
+        if video_path and video_dest.exists():
+            # Видео импортировано (или исходник уже перенесён в урок при --link-mode move)
+            lesson_data['video_url'] = str(video_dest.relative_to(self.output_dir.parent))
+        lesson_data['thumbnail_url'] = str((lesson_path / "thumbnail.jpg").relative_to(self.output_dir.parent))
     
     def create_metadata(self, lesson_data: Dict, lesson_path: Path):
-        """Создание файла метаданных"""
+        """
+        Создание файла метаданных (не перезаписывается, если не изменился)
+        
+        Список превью (thumbnails) пишет generate_thumbnails.py, в конфигурации
+        его нет: он переносится из прежнего metadata.json, иначе импорт и
+        генерация превью перезаписывали бы файл при каждой сборке.
+        """
         metadata_path = lesson_path / "metadata.json"
-        with open(metadata_path, 'w', encoding='utf-8') as f:
-            json.dump(lesson_data, f, ensure_ascii=False, indent=2)
-        print(f"  ✓ Метаданные созданы: {metadata_path}")
+        if 'thumbnails' not in lesson_data:
+            try:
+                with open(metadata_path, 'r', encoding='utf-8') as f:
+                    thumbnails = json.load(f).get('thumbnails')
+            except (OSError, json.JSONDecodeError, AttributeError):
+                thumbnails = None
+            if thumbnails is not None:
+                lesson_data = dict(lesson_data, thumbnails=thumbnails)
+        content = json.dumps(lesson_data, ensure_ascii=False, indent=2)
+        if write_if_changed(metadata_path, content):
+            self._log(f"  ✓ Метаданные созданы: {metadata_path}")
+        else:
+            self._log(f"  ✓ Метаданные не изменились: {metadata_path}")
     
     def create_description(self, lesson_data: Dict, lesson_path: Path):
-        """Создание файла описания в Markdown"""
-        description_path = lesson_path / "description.md"
-        
-        content = f"""# {lesson_data['title']}
-
-## Описание
-{lesson_data['description']}
-
-## Информация об уроке
-- **Категория:** {lesson_data['category']}
-- **Уровень:** {lesson_data['level']}
-- **Длительность:** {lesson_data['duration']} минут
-- **Инструктор:** {lesson_data['instructor']}
-
-## Польза
-"""
-        for benefit in lesson_data.get('benefits', []):
-            content += f"- {benefit}\n"
-        
-        if lesson_data.get('poses'):
-            content += "\n## Асаны в уроке\n"
-            for pose in lesson_data['poses']:
-                content += f"- **{pose['name']}** ({pose['duration']} сек)"
-                if 'sanskrit_name' in pose:
-                    content += f" - *{pose['sanskrit_name']}*"
-                content += "\n"
-        
-        if lesson_data.get('contraindications'):
-            content += "\n## Противопоказания\n"
-            for contra in lesson_data['contraindications']:
-                content += f"- {contra}\n"
-        
-        if lesson_data.get('equipment'):
-            content += "\n## Необходимое оборудование\n"
-            for equip in lesson_data['equipment']:
-                content += f"- {equip}\n"
-        
-        with open(description_path, 'w', encoding='utf-8') as f:
-            f.write(content)
-        print(f"  ✓ Описание создано: {description_path}")
+        """Создание описания урока (Markdown и HTML) по шаблонам из templates/"""
+        with self.metrics.timer('import.description', lesson_path.name):
+            written = self.renderer.write_lesson(lesson_data, lesson_path)
+        if written:
+            for output_path in written:
+                self._log(f"  ✓ Описание создано: {output_path}")
+        else:
+            self._log(f"  ✓ Описание не изменилось: {lesson_path / 'description.md'}")
     
     def import_lesson(self, lesson_data: Dict, video_path: Path = None):
         """Импорт одного урока"""
         lesson_id = lesson_data['id']
         lesson_title = lesson_data['title']
         
-        print(f"\n📦 Импорт урока {lesson_id}: {lesson_title}")
+        self._log(f"\n📦 Импорт урока {lesson_id}: {lesson_title}")
         
         # Валидация
         if not self.validate_lesson(lesson_data):
-            print(f"  ❌ Урок {lesson_id} не прошёл валидацию")
+            self._log(f"  ❌ Урок {lesson_id} не прошёл валидацию")
             return False
         
         # Создание папки
@@ -136,66 +300,461 @@ class LessonImporter:
         
         # Копирование видео
         if video_path and video_path.exists():
-            video_url = self.copy_video(video_path, lesson_path)
-            lesson_data['video_url'] = video_url
+            self.copy_video(video_path, lesson_path)
         
         # Обновление путей
-        lesson_data['thumbnail_url'] = str((lesson_path / "thumbnail.jpg").relative_to(self.output_dir.parent))
+        self.resolve_urls(lesson_data, lesson_path, video_path)
         
         # Создание метаданных и описания
         self.create_metadata(lesson_data, lesson_path)
         self.create_description(lesson_data, lesson_path)
+        self.catalog.invalidate(lesson_path)
         
-        print(f"  ✅ Урок {lesson_id} успешно импортирован")
+        self._log(f"  ✅ Урок {lesson_id} успешно импортирован")
         return True
     
-    def batch_import(self, lessons_config: List[Dict]):
-        """Массовый импорт уроков"""
+    def lesson_fingerprint(self, lesson: Dict) -> str:
+        """
+        Отпечаток входных данных урока: конфигурация, размер и mtime
+        исходного видео, способ импорта
+        """
+        video_state = None
+        if 'source_video' in lesson:
+            video_path = self.source_dir / lesson['source_video']
+            if video_path.exists():
+                stat = video_path.stat()
+                video_state = [stat.st_size, stat.st_mtime_ns]
+        
+        payload = json.dumps(
+            {"lesson": lesson, "video": video_state, "link_mode": self.link_mode},
+            ensure_ascii=False, sort_keys=True
+        )
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+    
+    def load_journal(self) -> Dict[str, str]:
+        """Чтение журнала: id урока -> отпечаток последнего успешного импорта"""
+        completed = {}
+        if not self.journal_path.exists():
+            return completed
+        
+        with open(self.journal_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # Последняя строка могла не дописаться при аварийном завершении
+                    continue
+                completed[entry['id']] = entry['fingerprint']
+        return completed
+    
+    def compact_journal(self, completed: Dict[str, str]):
+        """Перезапись журнала без повторяющихся записей (атомарно)"""
+        tmp_path = self.journal_path.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for lesson_id, fingerprint in completed.items():
+                f.write(json.dumps({"id": lesson_id, "fingerprint": fingerprint}) + "\n")
+        os.replace(tmp_path, self.journal_path)
+    
+    def is_imported(self, lesson: Dict, fingerprint: str, completed: Dict[str, str]) -> bool:
+        """Урок уже импортирован с теми же входными данными"""
+        if completed.get(lesson.get('id')) != fingerprint:
+            return False
+        record = self.catalog.lesson(self.lesson_folder_name(lesson['id'], lesson['title']))
+        return record is not None and record.has_file("metadata.json")
+    
+    def import_buffered(self, lesson: Dict) -> Tuple[bool, List[str]]:
+        """Импорт урока в рабочем потоке, вывод собирается в буфер"""
+        self._local.buffer = []
+        try:
+            video_path = None
+            if 'source_video' in lesson:
+                video_path = self.source_dir / lesson['source_video']
+            with self.metrics.timer('import.lesson', lesson.get('id')):
+                ok = self.import_lesson(lesson, video_path)
+        except Exception as e:
+            self._log(f"  ❌ Ошибка при импорте урока {lesson.get('id', '?')}: {e}")
+            ok = False
+        finally:
+            log = self._local.buffer
+            self._local.buffer = None
+        return ok, log
+    
+    def batch_import(self, lessons_config: List[Dict], jobs: int = 1, restart: bool = False):
+        """
+        Массовый импорт уроков
+        
+        Уроки импортируются пулом из jobs потоков (копирование видео и запись
+        файлов - в основном ввод-вывод). Каждый успешно импортированный урок
+        сразу записывается в журнал, поэтому прерванный импорт продолжается
+        с места остановки: уроки с неизменённым отпечатком пропускаются.
+        Счётчики обновляются только в главном потоке.
+        
+        Args:
+            lessons_config: Конфигурация уроков
+            jobs: Количество потоков
+            restart: Игнорировать журнал и импортировать всё заново
+        """
         print(f"\n🚀 Начинаем импорт {len(lessons_config)} уроков\n")
         print("=" * 60)
         
         success_count = 0
         failed_count = 0
+        skipped_count = 0
+        
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        completed = {} if restart else self.load_journal()
         
+        pending: List[Tuple[Dict, str]] = []
         for lesson in lessons_config:
-            try:
-                video_path = None
-                if 'source_video' in lesson:
-                    video_path = self.source_dir / lesson['source_video']
+            fingerprint = self.lesson_fingerprint(lesson)
+            if self.is_imported(lesson, fingerprint, completed):
+                skipped_count += 1
+            else:
+                pending.append((lesson, fingerprint))
+        
+        journal = open(self.journal_path, 'w' if restart else 'a', encoding='utf-8')
+        executor = ThreadPoolExecutor(max_workers=max(1, jobs))
+        try:
+            futures = {
+                executor.submit(self.import_buffered, lesson): (lesson, fingerprint)
+                for lesson, fingerprint in pending
+            }
+            for future in as_completed(futures):
+                lesson, fingerprint = futures[future]
+                ok, log = future.result()
+                for message in log:
+                    print(message)
                 
-                if self.import_lesson(lesson, video_path):
+                if ok:
                     success_count += 1
+                    completed[lesson['id']] = fingerprint
+                    journal.write(json.dumps({"id": lesson['id'], "fingerprint": fingerprint}) + "\n")
+                    journal.flush()
                 else:
                     failed_count += 1
-            except Exception as e:
-                print(f"  ❌ Ошибка при импорте урока {lesson.get('id', '?')}: {e}")
-                failed_count += 1
+        finally:
+            # При прерывании (Ctrl+C) не ждём уроки, которые ещё не начаты
+            executor.shutdown(cancel_futures=True)
+            journal.close()
+        
+        self.compact_journal(completed)
         
         print("\n" + "=" * 60)
         print(f"\n✅ Успешно импортировано: {success_count}")
+        if skipped_count:
+            print(f"⏭  Пропущено (без изменений): {skipped_count}")
         print(f"❌ Ошибок: {failed_count}")
-        print(f"📊 Всего обработано: {success_count + failed_count}")
-    
-    def generate_index(self):
-        """Генерация индексного файла со всеми уроками"""
-        lessons = []
-        
-        for lesson_dir in sorted(self.output_dir.iterdir()):
-            if lesson_dir.is_dir():
-                metadata_path = lesson_dir / "metadata.json"
-                if metadata_path.exists():
-                    with open(metadata_path, 'r', encoding='utf-8') as f:
-                        lessons.append(json.load(f))
-        
-        index_path = self.output_dir / "lessons_index.json"
-        with open(index_path, 'w', encoding='utf-8') as f:
-            json.dump({
-                "total_lessons": len(lessons),
-                "lessons": lessons
-            }, f, ensure_ascii=False, indent=2)
+        print(f"📊 Всего обработано: {success_count + failed_count + skipped_count}")
+    
+    @staticmethod
+    def write_atomic(path: Path, content: str):
+        """Запись через временный файл и rename: читатели не видят недописанный файл"""
+        tmp_path = path.with_name(f".{path.name}.tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+    
+    def load_index_cache(self, compact: bool) -> Dict[str, Dict]:
+        """Загрузка кеша индекса (пустой, если сменился формат вывода)"""
+        cache_path = self.output_dir / self.INDEX_CACHE_NAME
+        if not cache_path.exists():
+            return {}
+        try:
+            with open(cache_path, 'r', encoding='utf-8') as f:
+                cache = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return {}
+        if cache.get('version') != self.INDEX_CACHE_VERSION or cache.get('compact') != compact:
+            return {}
+        return cache['entries']
+    
+    @staticmethod
+    def index_fragment(lesson: Dict, compact: bool) -> str:
+        """Сериализация урока в том виде, в котором он стоит в lessons_index.json"""
+        if compact:
+            return json.dumps(lesson, ensure_ascii=False, separators=(',', ':'))
+        text = json.dumps(lesson, ensure_ascii=False, indent=2)
+        return '\n'.join('    ' + line for line in text.split('\n'))
+    
+    @timed('index.lessons')
+    def generate_index(self, compact: bool = False):
+        """
+        Генерация индексного файла со всеми уроками
+        
+        Индекс обновляется инкрементально: metadata.json читается и
+        сериализуется заново только для новых и изменённых уроков (по размеру
+        и mtime), для остальных берётся готовый фрагмент из кеша. Если ничего
+        не изменилось, индекс не перезаписывается.
+        
+        Args:
+            compact: Компактный JSON без отступов
+        
+        Returns:
+            Записи уроков из кеша индекса: облегчённые записи для каталога
+            (summary), поля фильтров (facets) и веса терминов поиска (search)
+        """
+        index_path = self.output_dir / self.INDEX_NAME
+        cached_entries = self.load_index_cache(compact)
+        entries = {}
+        parsed_count = 0
+        
+        for record in self.catalog.lessons():
+            identity = record.file_identity("metadata.json")
+            if identity is None:
+                continue
+            size, mtime_ns = identity
+        
+            cached = cached_entries.get(record.folder)
+            if cached is not None and cached['size'] == size and cached['mtime_ns'] == mtime_ns:
+                entries[record.folder] = cached
+                continue
+            
+            lesson = record.metadata()
+            entries[record.folder] = {
+                "size": size,
+                "mtime_ns": mtime_ns,
+                "fragment": self.index_fragment(lesson, compact),
+                "summary": self.lesson_summary(lesson),
+                "facets": lesson_facets(lesson),
+                "search": lesson_terms(lesson)
+            }
+            parsed_count += 1
+        
+        unchanged = (parsed_count == 0 and list(entries) == list(cached_entries)
+                     and index_path.exists())
+        if unchanged:
+            print(f"\n📋 Индексный файл актуален: {index_path}")
+            print(f"   Всего уроков в индексе: {len(entries)}")
+            return list(entries.values())
+        
+        fragments = [entry['fragment'] for entry in entries.values()]
+        if compact:
+            content = f'{{"total_lessons":{len(fragments)},"lessons":[{",".join(fragments)}]}}'
+        elif fragments:
+            content = (f'{{\n  "total_lessons": {len(fragments)},\n  "lessons": [\n'
+                       + ',\n'.join(fragments) + '\n  ]\n}')
+        else:
+            content = '{\n  "total_lessons": 0,\n  "lessons": []\n}'
+        self.write_atomic(index_path, content)
+        
+        self.write_atomic(
+            self.output_dir / self.INDEX_CACHE_NAME,
+            json.dumps({"version": self.INDEX_CACHE_VERSION, "compact": compact, "entries": entries},
+                       ensure_ascii=False)
+        )
         
         print(f"\n📋 Индексный файл создан: {index_path}")
-        print(f"   Всего уроков в индексе: {len(lessons)}")
+        print(f"   Всего уроков в индексе: {len(entries)} (прочитано metadata.json: {parsed_count})")
+        return list(entries.values())
+    
+    @timed('index.query')
+    def generate_query_index(self, entries: List[Dict]):
+        """Инвертированные индексы для фильтров приложения (см. lesson_query.py)"""
+        index = build_query_index([entry['facets'] for entry in entries])
+        index_path = self.output_dir / QUERY_INDEX_NAME
+        self.write_atomic(index_path, json.dumps(index, ensure_ascii=False, separators=(',', ':')))
+        print(f"\n🔎 Индекс фильтров создан: {index_path}")
+    
+    @timed('index.search')
+    def generate_search_index(self, entries: List[Dict]):
+        """Полнотекстовый индекс для поиска уроков (см. lesson_search.py)"""
+        index_path = self.output_dir / SEARCH_INDEX_NAME
+        write_search_index(index_path, [entry['facets']['id'] for entry in entries],
+                           [entry['search'] for entry in entries])
+        print(f"🔎 Поисковый индекс создан: {index_path}")
+    
+    def program_records(self, programs_dir: Path) -> List[Tuple[ProgramRecord, Dict]]:
+        """Программы из programs/*.json; повреждённые файлы и повторные ID пропускаются"""
+        programs = {}
+        for record in self.catalog.programs(programs_dir):
+            try:
+                program = record.data()
+            except (json.JSONDecodeError, UnicodeDecodeError) as e:
+                print(f"⚠️  Программа пропущена ({record.path.name}): {e}")
+                continue
+            if not isinstance(program, dict) or 'id' not in program:
+                print(f"⚠️  Программа пропущена ({record.path.name}): нет id")
+            elif program['id'] in programs:
+                print(f"⚠️  Программа пропущена ({record.path.name}): повторный id {program['id']}")
+            else:
+                programs[program['id']] = (record, program)
+        return list(programs.values())
+    
+    def load_programs(self, programs_dir: Path) -> List[Dict]:
+        return [program for _, program in self.program_records(programs_dir)]
+    
+    @timed('index.programs')
+    def generate_program_summaries(self, entries: List[Dict], programs_dir: Path):
+        """Сводки программ: минуты, дни занятий и отдыха, сложность по неделям (см. program_summary.py)"""
+        programs = [(record.path.name, record.identity(), program)
+                    for record, program in self.program_records(programs_dir)]
+        summaries, recomputed = build_program_summaries(
+            self.output_dir, programs, lesson_stats(entry['facets'] for entry in entries)
+        )
+        print(f"📅 Сводки программ: {self.output_dir / PROGRAM_SUMMARY_NAME} "
+              f"(программ: {len(summaries)}, пересчитано: {recomputed})")
+    
+    @timed('index.sqlite')
+    def generate_sqlite(self, entries: List[Dict], categories_dir: Path, programs_dir: Path):
+        """База каталога в SQLite (см. catalog_db.py): альтернатива разбору lessons_index.json"""
+        db_path = self.output_dir / CATALOG_DB_NAME
+        lessons = [json.loads(entry['fragment']) for entry in entries]
+        written = write_catalog_db(db_path, lessons, self.load_programs(programs_dir),
+                                   self.load_categories(categories_dir))
+        if written:
+            print(f"🗄  База каталога создана: {db_path}")
+        else:
+            print(f"🗄  База каталога не изменилась: {db_path}")
+    
+    @timed('index.similar')
+    def generate_similarity_index(self, entries: List[Dict], k: int = SIMILAR_COUNT):
+        """Похожие уроки для рекомендаций (см. lesson_similarity.py); без numpy пропускается"""
+        if np is None:
+            print("⚠️  numpy не установлен: индекс похожих уроков не создан (pip install numpy)")
+            return
+        index_path = self.output_dir / SIMILARITY_INDEX_NAME
+        computed, full = build_similarity_index(self.output_dir, [entry['facets'] for entry in entries], k)
+        if computed == 0:
+            print(f"🔗 Индекс похожих уроков актуален: {index_path}")
+        else:
+            print(f"🔗 Индекс похожих уроков {'создан' if full else 'обновлён'}: {index_path} "
+                  f"(пересчитано уроков: {computed})")
+    
+    def lesson_summary(self, lesson: Dict) -> Dict:
+        """Облегчённая запись урока: только поля для списков в приложении"""
+        summary = {key: lesson.get(key) for key in self.SUMMARY_FIELDS}
+        summary['thumbnail'] = lesson.get('thumbnail_url')
+        return summary
+    
+    def load_categories(self, categories_dir: Path) -> List[Dict]:
+        """Категории из categories/*.json в порядке поля order"""
+        categories = []
+        for record in self.catalog.categories(categories_dir):
+            category = dict(record.data())
+            category.setdefault('id', record.id)
+            categories.append(category)
+        return sorted(categories, key=lambda c: c.get('order', len(categories)))
+    
+    def write_catalog_file(self, catalog_dir: Path, name: str, data) -> Tuple[str, List[str]]:
+        """
+        Запись файла каталога с хешем содержимого в имени и сжатыми копиями
+        
+        Имя меняется только при изменении содержимого, поэтому файлы можно
+        кешировать на CDN навсегда; уже существующий файл не перезаписывается.
+        
+        Returns:
+            Имя файла относительно каталога и список всех записанных вариантов
+        """
+        payload = json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        digest = hashlib.sha256(payload).hexdigest()[:12]
+        filename = f"{name}.{digest}.json"
+        
+        variants = [(filename, lambda: payload), (filename + ".gz", lambda: gzip.compress(payload, 9, mtime=0))]
+        if brotli is not None:
+            variants.append((filename + ".br", lambda: brotli.compress(payload, quality=11)))
+        
+        for variant, encode in variants:
+            path = catalog_dir / variant
+            if not path.exists():
+                path.parent.mkdir(parents=True, exist_ok=True)
+                tmp_path = path.with_name(f".{path.name}.tmp")
+                tmp_path.write_bytes(encode())
+                os.replace(tmp_path, path)
+        
+        return filename, [variant for variant, _ in variants]
+    
+    @timed('index.catalog')
+    def generate_catalog(self, summaries: List[Dict], categories_dir: Path,
+                         catalog_dir: Optional[Path] = None, page_size: int = CATALOG_PAGE_SIZE):
+        """
+        Каталог для приложения: облегчённый индекс, шарды по категориям и страницы
+        
+        Вместо полного lessons_index.json приложение скачивает манифест
+        catalog.json (короткое кеширование), а по нему - неизменяемые файлы
+        с хешем в имени (.json, .json.gz и .json.br при установленном brotli).
+        Файлы предыдущей сборки сохраняются, более старые удаляются. Удаляются
+        только файлы, перечисленные в манифесте (files и retained), поэтому
+        посторонние файлы в папке каталога не трогаются.
+        
+        Args:
+            summaries: Облегчённые записи уроков (summary из generate_index)
+            categories_dir: Папка с описаниями категорий
+            catalog_dir: Папка каталога (по умолчанию content/catalog)
+            page_size: Количество уроков на странице
+        """
+        catalog_dir = Path(catalog_dir) if catalog_dir else self.output_dir.parent / "catalog"
+        catalog_dir.mkdir(parents=True, exist_ok=True)
+        manifest_path = catalog_dir / self.CATALOG_MANIFEST_NAME
+        
+        previous_files = set()
+        previous_retained = set()
+        if manifest_path.exists():
+            with open(manifest_path, 'r', encoding='utf-8') as f:
+                previous = json.load(f)
+            previous_files = set(previous.get('files', []))
+            previous_retained = set(previous.get('retained', []))
+        
+        files: List[str] = []
+        
+        def write(name, data) -> str:
+            filename, variants = self.write_catalog_file(catalog_dir, name, data)
+            files.extend(variants)
+            return filename
+        
+        manifest = {
+            "total_lessons": len(summaries),
+            "page_size": page_size,
+            "encodings": ["gzip", "br"] if brotli is not None else ["gzip"],
+            "summary": write("summary", {"total_lessons": len(summaries), "lessons": summaries})
+        }
+        
+        # Шарды категорий: описание из categories/ и уроки по полю category
+        by_category: Dict[str, List[Dict]] = {}
+        for summary in summaries:
+            by_category.setdefault(summary['category'], []).append(summary)
+        
+        categories = self.load_categories(categories_dir)
+        known = {category['id'] for category in categories}
+        categories += [{"id": category_id} for category_id in sorted(by_category) if category_id not in known]
+        
+        manifest['categories'] = []
+        for category in categories:
+            lessons = by_category.get(category['id'], [])
+            info = {key: value for key, value in category.items() if key != 'lessons_count'}
+            manifest['categories'].append({
+                "id": category['id'],
+                "total_lessons": len(lessons),
+                "file": write(f"categories/{category['id']}",
+                              {"category": info, "total_lessons": len(lessons), "lessons": lessons})
+            })
+        
+        # Страницы фиксированного размера для постраничной загрузки
+        pages_count = max(1, -(-len(summaries) // page_size))
+        manifest['pages'] = [
+            write(f"pages/{number:04d}", {
+                "page": number,
+                "pages": pages_count,
+                "lessons": summaries[(number - 1) * page_size:number * page_size]
+            })
+            for number in range(1, pages_count + 1)
+        ]
+        
+        manifest['files'] = files
+        # Файлы предыдущей сборки, которые ещё нужны клиентам со старым манифестом
+        manifest['retained'] = sorted(previous_files - set(files))
+        self.write_atomic(manifest_path, json.dumps(manifest, ensure_ascii=False, indent=2))
+        
+        # Удаление файлов позапрошлой сборки, которые больше не записываются
+        removed = 0
+        for name in sorted(previous_retained - previous_files - set(files)):
+            path = catalog_dir / name
+            if path.is_file():
+                path.unlink()
+                removed += 1
+        
+        print(f"\n🗂  Каталог обновлён: {manifest_path}")
+        print(f"   Категорий: {len(manifest['categories'])}, страниц: {pages_count}, "
+              f"сжатие: {', '.join(manifest['encodings'])}, удалено устаревших файлов: {removed}")
 
 
 def main():
@@ -203,25 +762,58 @@ def main():
     parser.add_argument('--source', required=True, help='Папка с исходными видео')
     parser.add_argument('--output', default='./content/lessons', help='Папка для импорта')
     parser.add_argument('--schema', default='./schemas/lesson.schema.json', help='Путь к JSON схеме')
+    parser.add_argument('--templates', default='./templates', help='Папка с шаблонами описаний')
     parser.add_argument('--config', help='JSON файл с конфигурацией уроков')
+    parser.add_argument('--link-mode', choices=LessonImporter.LINK_MODES, default='copy',
+                        help='Способ импорта видео: copy (по умолчанию), hardlink, reflink '
+                             '(copy-on-write), symlink или move; при неподдержке - копирование')
+    parser.add_argument('--jobs', type=int, default=1,
+                        help='Количество потоков для пакетного импорта (по умолчанию 1)')
+    parser.add_argument('--restart', action='store_true',
+                        help='Игнорировать журнал импорта и импортировать все уроки заново')
+    parser.add_argument('--compact-index', action='store_true',
+                        help='Записать lessons_index.json без отступов (меньше размер)')
+    parser.add_argument('--categories', default='./categories', help='Папка с описаниями категорий')
+    parser.add_argument('--catalog', help='Папка каталога для приложения (по умолчанию <output>/../catalog)')
+    parser.add_argument('--page-size', type=int, default=LessonImporter.CATALOG_PAGE_SIZE,
+                        help=f'Уроков на странице каталога (по умолчанию {LessonImporter.CATALOG_PAGE_SIZE})')
+    parser.add_argument('--similar', type=int, default=SIMILAR_COUNT,
+                        help=f'Похожих уроков в индексе рекомендаций (по умолчанию {SIMILAR_COUNT}, 0 - не строить)')
+    parser.add_argument('--sqlite', action='store_true',
+                        help=f'Дополнительно собрать базу каталога {CATALOG_DB_NAME} (см. catalog_db.py)')
+    parser.add_argument('--programs', default='./programs', help='Папка с программами (сводки программ, --sqlite)')
+    add_arguments(parser)
     
     args = parser.parse_args()
     
-    # Создание импортера
-    importer = LessonImporter(
-        source_dir=args.source,
-        output_dir=args.output,
-        schema_path=args.schema
-    )
-    
-    # Если указан конфиг - массовый импорт
-    if args.config:
-        with open(args.config, 'r', encoding='utf-8') as f:
-            lessons_config = json.load(f)
-        importer.batch_import(lessons_config)
-    
-    # Генерация индекса
-    importer.generate_index()
+    with instrumented(args, 'import_lessons') as metrics:
+        # Создание импортера
+        importer = LessonImporter(
+            source_dir=args.source,
+            output_dir=args.output,
+            schema_path=args.schema,
+            link_mode=args.link_mode,
+            templates_dir=args.templates,
+            metrics=metrics
+        )
+        
+        # Если указан конфиг - массовый импорт
+        if args.config:
+            with open(args.config, 'r', encoding='utf-8') as f:
+                lessons_config = json.load(f)
+            importer.batch_import(lessons_config, jobs=args.jobs, restart=args.restart)
+        
+        # Генерация индекса и каталога для приложения
+        entries = importer.generate_index(compact=args.compact_index)
+        importer.generate_query_index(entries)
+        importer.generate_search_index(entries)
+        if args.similar:
+            importer.generate_similarity_index(entries, args.similar)
+        importer.generate_catalog([entry['summary'] for entry in entries], Path(args.categories),
+                                  args.catalog, args.page_size)
+        importer.generate_program_summaries(entries, Path(args.programs))
+        if args.sqlite:
+            importer.generate_sqlite(entries, Path(args.categories), Path(args.programs))
 
 
 if __name__ == '__main__':
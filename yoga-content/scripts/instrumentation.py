@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""
+Замеры времени этапов сборки контента и профилирование
+Таймеры этапов и отдельных уроков, --metrics-out (JSON или текстовый файл Prometheus)
+и --profile (cProfile, файл pstats) для import_lessons.py, generate_thumbnails.py,
+validate_content.py и pipeline.py
+"""
+
+import json
+import math
+import time
+import cProfile
+import functools
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, List, Optional, TextIO, Tuple
+
+
+# Сколько самых медленных уроков/программ этапа попадает в сводку
+SLOWEST_COUNT = 5
+PROMETHEUS_PREFIX = "yoga_content"
+QUANTILES = (0.5, 0.95)
+
+
+def percentile(values: List[float], q: float) -> float:
+    """Перцентиль по ближайшему рангу (values отсортированы)"""
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, max(0, math.ceil(q * len(values)) - 1))]
+
+
+class Span:
+    """Один замер: к нему можно добавить объём обработанных данных"""
+    
+    __slots__ = ('metrics', 'stage', 'entity', 'bytes', 'started')
+    
+    def __init__(self, metrics: 'Metrics', stage: str, entity: Optional[str], size: int):
+        self.metrics = metrics
+        self.stage = stage
+        self.entity = entity
+        self.bytes = size
+    
+    def __enter__(self) -> 'Span':
+        self.started = time.perf_counter()
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.metrics.record(self.stage, time.perf_counter() - self.started,
+                            self.entity, self.bytes, failed=exc_type is not None)
+        return False
+
+
+class NullSpan:
+    """Замер при выключенных метриках: ничего не записывает"""
+    
+    __slots__ = ('bytes',)
+    
+    def __enter__(self) -> 'NullSpan':
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+class Metrics:
+    """
+    Таймеры этапов сборки
+    
+    Этап - строка вида "import.video" или "validate.schema", сущность -
+    урок или программа. Для каждого этапа хранятся все замеры, поэтому
+    сводка содержит p50/p95 и самые медленные сущности. Запись
+    потокобезопасна (этапы выполняются в пулах потоков).
+    """
+    
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self.started = time.perf_counter()
+        self._samples: Dict[str, List[Tuple[float, Optional[str]]]] = {}
+        self._bytes: Dict[str, int] = {}
+        self._errors: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._null = NullSpan()
+    
+    def timer(self, stage: str, entity: Optional[str] = None, size: int = 0):
+        """
+        Замер блока кода
+            
+            with metrics.timer('import.video', lesson_id) as span:
+                ...
+                span.bytes = video_size
+        """
+        if not self.enabled:
+            return self._null
+        return Span(self, stage, entity, size)
+    
+    def record(self, stage: str, seconds: float, entity: Optional[str] = None,
+               size: int = 0, failed: bool = False):
+        """Готовый замер (например, время задачи pipeline.py)"""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._samples.setdefault(stage, []).append((seconds, entity))
+            if size:
+                self._bytes[stage] = self._bytes.get(stage, 0) + size
+            if failed:
+                self._errors[stage] = self._errors.get(stage, 0) + 1
+    
+    def summary(self) -> Dict:
+        """Сводка: количество, сумма, p50/p95, максимум, байты и самые медленные сущности"""
+        with self._lock:
+            samples = {stage: list(values) for stage, values in self._samples.items()}
+            processed = dict(self._bytes)
+            errors = dict(self._errors)
+        
+        stages = {}
+        for stage in sorted(samples):
+            values = samples[stage]
+            durations = sorted(seconds for seconds, _ in values)
+            slowest = sorted((item for item in values if item[1] is not None), key=lambda item: -item[0])
+            stages[stage] = {
+                "count": len(values),
+                "errors": errors.get(stage, 0),
+                "total_seconds": round(sum(durations), 6),
+                "p50_seconds": round(percentile(durations, 0.5), 6),
+                "p95_seconds": round(percentile(durations, 0.95), 6),
+                "max_seconds": round(durations[-1], 6),
+                "bytes": processed.get(stage, 0),
+                "slowest": [{"entity": entity, "seconds": round(seconds, 6)}
+                            for seconds, entity in slowest[:SLOWEST_COUNT]]
+            }
+        return {"wall_seconds": round(time.perf_counter() - self.started, 6), "stages": stages}
+    
+    @staticmethod
+    def prometheus_text(summary: Dict, script: str) -> str:
+        """Текстовый формат Prometheus (для node_exporter textfile collector)"""
+        name = f"{PROMETHEUS_PREFIX}_stage_seconds"
+        lines = [f"# HELP {name} Время этапов сборки контента",
+                 f"# TYPE {name} summary"]
+        for stage, data in summary['stages'].items():
+            labels = f'script="{script}",stage="{stage}"'
+            for q in QUANTILES:
+                lines.append(f'{name}{{{labels},quantile="{q}"}} {data[f"p{round(q * 100)}_seconds"]}')
+            lines.append(f"{name}_sum{{{labels}}} {data['total_seconds']}")
+            lines.append(f"{name}_count{{{labels}}} {data['count']}")
+        
+        for metric, key, help_text in (("bytes_total", "bytes", "Обработано байт"),
+                                       ("errors_total", "errors", "Замеров, завершившихся ошибкой")):
+            name = f"{PROMETHEUS_PREFIX}_stage_{metric}"
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+            for stage, data in summary['stages'].items():
+                lines.append(f'{name}{{script="{script}",stage="{stage}"}} {data[key]}')
+        
+        name = f"{PROMETHEUS_PREFIX}_run_seconds"
+        lines += [f"# HELP {name} Общее время запуска скрипта", f"# TYPE {name} gauge",
+                  f'{name}{{script="{script}"}} {summary["wall_seconds"]}']
+        return '\n'.join(lines) + '\n'
+    
+    def write(self, path: Path, script: str):
+        """
+        Запись сводки: *.prom - текстовый файл Prometheus, иначе JSON
+        
+        Файл заменяется атомарно, поэтому textfile collector не прочитает
+        недописанный файл.
+        """
+        path = Path(path)
+        summary = self.summary()
+        if path.suffix == '.prom':
+            content = self.prometheus_text(summary, script)
+        else:
+            content = json.dumps(dict(script=script, **summary), ensure_ascii=False, indent=2)
+        tmp_path = path.with_name(f".{path.name}.tmp")
+        tmp_path.write_text(content, encoding='utf-8')
+        tmp_path.replace(path)
+    
+    def print_summary(self, stream: Optional[TextIO] = None):
+        """Таблица этапов по убыванию суммарного времени"""
+        summary = self.summary()
+        print("\n" + "=" * 60, file=stream)
+        print("⏱  ВРЕМЯ ПО ЭТАПАМ", file=stream)
+        print("=" * 60, file=stream)
+        print(f"{'этап':<28}{'кол-во':>8}{'всего, с':>10}{'p50, мс':>10}{'p95, мс':>10}{'MB':>8}", file=stream)
+        ranked = sorted(summary['stages'].items(), key=lambda item: -item[1]['total_seconds'])
+        for stage, data in ranked:
+            print(f"{stage:<28}{data['count']:>8}{data['total_seconds']:>10.2f}"
+                  f"{data['p50_seconds'] * 1000:>10.1f}{data['p95_seconds'] * 1000:>10.1f}"
+                  f"{data['bytes'] / (1024 * 1024):>8.1f}", file=stream)
+        print(f"\nОбщее время: {summary['wall_seconds']:.2f} сек", file=stream)
+
+
+def timed(stage: str):
+    """Декоратор метода: замер всего вызова через self.metrics"""
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            with self.metrics.timer(stage):
+                return method(self, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def add_arguments(parser):
+    """Общие параметры --profile и --metrics-out"""
+    parser.add_argument('--profile', metavar='PATH',
+                        help='Запустить под cProfile и сохранить статистику (pstats) в файл; '
+                             'профилируется главный поток, для полной картины используйте --jobs 1')
+    parser.add_argument('--metrics-out', metavar='PATH',
+                        help='Записать время этапов (количество, p50/p95, байты): '
+                             '*.prom - текстовый файл Prometheus, иначе JSON')
+
+
+@contextmanager
+def instrumented(args, script: str, stream: Optional[TextIO] = None):
+    """
+    Запуск скрипта с замерами
+    
+    Метрики включаются параметром --metrics-out, профилирование - --profile.
+    Результаты записываются и при выходе по ошибке или Ctrl+C.
+    
+    Args:
+        args: Разобранные аргументы (см. add_arguments)
+        script: Имя скрипта (метка в Prometheus)
+        stream: Куда печатать сводку (по умолчанию stdout)
+    """
+    metrics = Metrics(enabled=bool(args.metrics_out))
+    profiler = cProfile.Profile() if args.profile else None
+    if profiler is not None:
+        profiler.enable()
+    try:
+        yield metrics
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            profiler.dump_stats(args.profile)
+            print(f"\n🔬 Профиль сохранён: {args.profile} (python -m pstats {args.profile})",
+                  file=stream)
+        if metrics.enabled:
+            metrics.print_summary(stream)
+            metrics.write(Path(args.metrics_out), script)
+            print(f"📈 Метрики сохранены: {args.metrics_out}", file=stream)
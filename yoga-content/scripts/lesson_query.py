@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Фильтрация уроков по предрассчитанным инвертированным индексам
+Индекс строится при импорте (import_lessons.py) в lessons_query_index.json
+Использование: python lesson_query.py --index ./content/lessons/lessons_query_index.json --category back_health --tag спина
+"""
+
+import json
+import argparse
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set
+
+
+QUERY_INDEX_NAME = "lessons_query_index.json"
+QUERY_INDEX_VERSION = 1
+
+# Ширина корзины длительности в минутах
+DURATION_BUCKET = 5
+
+# Поля-списки урока, по которым строятся индексы "значение -> уроки"
+LIST_FACETS = ('tags', 'equipment', 'focus_areas')
+
+
+def lesson_facets(lesson: Dict) -> Dict:
+    """Поля урока, участвующие в фильтрах"""
+    facets = {
+        'id': lesson['id'],
+        'category': lesson.get('category'),
+        'level': lesson.get('level'),
+        'duration': lesson.get('duration'),
+    }
+    for facet in LIST_FACETS:
+        facets[facet] = lesson.get(facet, [])
+    return facets
+
+
+def build_query_index(records: List[Dict]) -> Dict:
+    """
+    Построение индексов по записям lesson_facets
+    
+    Уроки кодируются позицией в списке ids, списки позиций отсортированы.
+    Индексы: категория+уровень, корзина длительности, тег, оборудование,
+    область фокуса.
+    """
+    indexes: Dict[str, Dict[str, List[int]]] = {
+        'category_level': {},
+        'duration': {}
+    }
+    for facet in LIST_FACETS:
+        indexes[facet] = {}
+    
+    for position, record in enumerate(records):
+        indexes['category_level'].setdefault(f"{record['category']}:{record['level']}", []).append(position)
+        if record['duration'] is not None:
+            bucket = record['duration'] // DURATION_BUCKET * DURATION_BUCKET
+            indexes['duration'].setdefault(str(bucket), []).append(position)
+        for facet in LIST_FACETS:
+            for value in set(record[facet]):
+                indexes[facet].setdefault(value, []).append(position)
+    
+    return {
+        "version": QUERY_INDEX_VERSION,
+        "duration_bucket": DURATION_BUCKET,
+        "ids": [record['id'] for record in records],
+        "durations": [record['duration'] for record in records],
+        "indexes": indexes
+    }
+
+
+class LessonQuery:
+    """Конъюнктивные фильтры уроков через пересечение множеств"""
+    
+    def __init__(self, index: Dict):
+        if index.get('version') != QUERY_INDEX_VERSION:
+            raise ValueError(f"Неподдерживаемая версия индекса: {index.get('version')}")
+        
+        self.ids: List[str] = index['ids']
+        self.durations: List[Optional[int]] = index['durations']
+        self.duration_bucket: int = index['duration_bucket']
+        self.indexes: Dict[str, Dict[str, Set[int]]] = {
+            name: {key: set(positions) for key, positions in postings.items()}
+            for name, postings in index['indexes'].items()
+        }
+        self.all_positions = set(range(len(self.ids)))
+    
+    @classmethod
+    def load(cls, index_path: str) -> 'LessonQuery':
+        """Загрузка индекса из файла"""
+        with open(index_path, 'r', encoding='utf-8') as f:
+            return cls(json.load(f))
+    
+    def category_level(self, category: Optional[str], level: Optional[int]) -> Set[int]:
+        """Уроки категории и/или уровня (объединение ключей категория:уровень)"""
+        result = set()
+        for key, positions in self.indexes['category_level'].items():
+            key_category, key_level = key.rsplit(':', 1)
+            if category is not None and key_category != category:
+                continue
+            if level is not None and key_level != str(level):
+                continue
+            result |= positions
+        return result
+    
+    def duration_range(self, min_duration: Optional[int], max_duration: Optional[int]) -> Set[int]:
+        """
+        Уроки с длительностью в диапазоне (включительно)
+        
+        Корзины целиком внутри диапазона берутся как есть, в граничных
+        корзинах длительность сверяется поштучно.
+        """
+        low = min_duration if min_duration is not None else 0
+        high = max_duration if max_duration is not None else float('inf')
+        
+        result = set()
+        for key, positions in self.indexes['duration'].items():
+            bucket_low = int(key)
+            bucket_high = bucket_low + self.duration_bucket - 1
+            if bucket_high < low or bucket_low > high:
+                continue
+            if low <= bucket_low and bucket_high <= high:
+                result |= positions
+            else:
+                result.update(p for p in positions if low <= self.durations[p] <= high)
+        return result
+    
+    def filter(self, category: Optional[str] = None, level: Optional[int] = None,
+               min_duration: Optional[int] = None, max_duration: Optional[int] = None,
+               tags: Iterable[str] = (), equipment: Iterable[str] = (),
+               focus_areas: Iterable[str] = ()) -> List[str]:
+        """
+        ID уроков, подходящих под все условия
+        
+        Списочные условия (tags, equipment, focus_areas) требуют наличия
+        всех указанных значений. Пересечение начинается с самого маленького
+        множества.
+        """
+        candidates: List[Set[int]] = []
+        
+        if category is not None or level is not None:
+            candidates.append(self.category_level(category, level))
+        if min_duration is not None or max_duration is not None:
+            candidates.append(self.duration_range(min_duration, max_duration))
+        for facet, values in (('tags', tags), ('equipment', equipment), ('focus_areas', focus_areas)):
+            for value in values:
+                candidates.append(self.indexes[facet].get(value, set()))
+        
+        if not candidates:
+            result = self.all_positions
+        else:
+            candidates.sort(key=len)
+            result = candidates[0]
+            for positions in candidates[1:]:
+                if not result:
+                    break
+                result = result & positions
+        
+        return [self.ids[position] for position in sorted(result)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Фильтрация уроков по индексу')
+    parser.add_argument('--index', default=f'./content/lessons/{QUERY_INDEX_NAME}', help='Путь к индексу')
+    parser.add_argument('--category', help='Категория')
+    parser.add_argument('--level', type=int, help='Уровень сложности')
+    parser.add_argument('--min-duration', type=int, help='Минимальная длительность (мин)')
+    parser.add_argument('--max-duration', type=int, help='Максимальная длительность (мин)')
+    parser.add_argument('--tag', action='append', default=[], help='Тег (можно несколько)')
+    parser.add_argument('--equipment', action='append', default=[], help='Оборудование (можно несколько)')
+    parser.add_argument('--focus', action='append', default=[], help='Область фокуса (можно несколько)')
+    
+    args = parser.parse_args()
+    
+    if not Path(args.index).exists():
+        print(f"❌ Индекс не найден: {args.index}")
+        return
+    
+    query = LessonQuery.load(args.index)
+    lesson_ids = query.filter(
+        category=args.category,
+        level=args.level,
+        min_duration=args.min_duration,
+        max_duration=args.max_duration,
+        tags=args.tag,
+        equipment=args.equipment,
+        focus_areas=args.focus
+    )
+    
+    print(f"🔎 Найдено уроков: {len(lesson_ids)}")
+    for lesson_id in lesson_ids:
+        print(f"  {lesson_id}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,370 @@
+#!/usr/bin/env python3
+"""
+Полнотекстовый поиск по урокам
+Индекс строится при импорте (import_lessons.py) в lessons_search.idx и читается через mmap
+Использование: python lesson_search.py --index ./content/lessons/lessons_search.idx "боль в спине"
+"""
+
+import re
+import sys
+import math
+import mmap
+import struct
+import heapq
+import argparse
+from array import array
+from bisect import bisect_left
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from translit import transliterate
+
+
+SEARCH_INDEX_NAME = "lessons_search.idx"
+SEARCH_INDEX_MAGIC = b'YSIX'
+SEARCH_INDEX_VERSION = 2
+
+# magic, версия, уроков, терминов, длина блока id, длина блока терминов, записей в постингах
+HEADER = struct.Struct('<4sIIIIII')
+
+# Вес совпадения по полю урока
+FIELD_WEIGHTS = {
+    'title': 3.0,
+    'tags': 2.5,
+    'poses': 2.0,
+    'benefits': 1.0,
+    'description': 1.0,
+}
+
+# Окончания (в транслитерации), отбрасываемые при стемминге, - от длинных к коротким
+SUFFIXES = sorted({
+    'yami', 'ami', 'iyah', 'yah', 'ah', 'ov', 'ev', 'ey', 'iy', 'yy', 'oy', 'aya', 'yaya',
+    'oe', 'ee', 'ie', 'ye', 'ogo', 'ego', 'omu', 'emu', 'ymi', 'imi', 'uyu', 'yuyu', 'iya',
+    'ya', 'yu', 'om', 'em', 'a', 'y', 'i', 'u', 'e', 'o'
+}, key=len, reverse=True)
+
+MIN_STEM_LENGTH = 3
+
+STOP_WORDS = {'i', 'v', 'na', 'dlya', 's', 'so', 'po', 'ot', 'do', 'ne', 'k', 'iz', 'pri',
+              'ili', 'eto', 'kak', 'za', 'pod', 'nad', 'ob', 'o', 'u', 'vo'}
+
+TOKEN_RE = re.compile(r'[0-9a-zа-я]+')
+
+# Сколько лучших постингов термина учитывается для уроков, где нашлась только
+# часть слов запроса. Постинги хранятся по убыванию веса, поэтому для частых слов
+# ("спина") этот хвост выдачи собирается из самых релевантных уроков
+MAX_POSTINGS_PER_TERM = 256
+
+
+def stem(token: str) -> str:
+    """Простой стемминг: отбрасывание одного окончания с сохранением основы"""
+    for suffix in SUFFIXES:
+        if token.endswith(suffix) and len(token) - len(suffix) >= MIN_STEM_LENGTH:
+            return token[:-len(suffix)]
+    return token
+
+
+def normalize(text: str) -> List[str]:
+    """
+    Нормализация текста в термины индекса
+    
+    Нижний регистр, ё -> е, транслитерация (та же таблица, что и для папок
+    уроков), стемминг. Русский запрос и запрос латиницей ("спина" и "spina")
+    дают одинаковые термины.
+    """
+    terms = []
+    for token in TOKEN_RE.findall(text.lower().replace('ё', 'е')):
+        term = _token_term(token)
+        if term is not None:
+            terms.append(term)
+    return terms
+
+
+@lru_cache(maxsize=65536)
+def _token_term(token: str) -> Optional[str]:
+    """Термин для одного слова (словарь небольшой, поэтому результат кешируется)"""
+    token = transliterate(token)
+    if token in STOP_WORDS or len(token) < 2:
+        return None
+    return stem(token)
+
+
+def lesson_terms(lesson: Dict) -> Dict[str, float]:
+    """Веса терминов урока с учётом поля, в котором встретилось слово"""
+    fields = {
+        'title': [lesson.get('title', '')],
+        'description': [lesson.get('description', '')],
+        'tags': lesson.get('tags', []),
+        'benefits': lesson.get('benefits', []),
+        'poses': [f"{pose.get('name', '')} {pose.get('sanskrit_name', '')}" for pose in lesson.get('poses', [])],
+    }
+    
+    weights: Dict[str, float] = {}
+    for field, texts in fields.items():
+        for text in texts:
+            for term in normalize(text):
+                weights[term] = weights.get(term, 0.0) + FIELD_WEIGHTS[field]
+    return weights
+
+
+def _padded(data: bytes) -> bytes:
+    """Выравнивание блока по 4 байта (для memoryview.cast)"""
+    return data + b'\0' * (-len(data) % 4)
+
+
+def write_search_index(index_path: Path, lesson_ids: List[str], lessons_terms: List[Dict[str, float]]):
+    """
+    Запись индекса в бинарный файл
+    
+    Блоки: смещения и id уроков, отсортированный словарь терминов,
+    постинги (номер урока и вес, по убыванию веса) и прямой индекс (номера
+    терминов урока по возрастанию и их веса - для точного подсчёта очков
+    урока без прохода по постингам). Все массивы - uint32/float32
+    little-endian, поэтому файл читается через mmap без разбора.
+    """
+    postings: Dict[str, List[Tuple[int, float]]] = {}
+    for position, terms in enumerate(lessons_terms):
+        for term, weight in terms.items():
+            postings.setdefault(term, []).append((position, weight))
+    term_numbers = {term: number for number, term in enumerate(sorted(postings))}
+    
+    ids_blob = bytearray()
+    id_offsets = array('I', [0])
+    for lesson_id in lesson_ids:
+        ids_blob += lesson_id.encode('utf-8')
+        id_offsets.append(len(ids_blob))
+    
+    terms_blob = bytearray()
+    term_offsets = array('I', [0])
+    posting_offsets = array('I', [0])
+    posting_docs = array('I')
+    posting_weights = array('f')
+    for term in sorted(postings):
+        terms_blob += term.encode('utf-8')
+        term_offsets.append(len(terms_blob))
+        for position, weight in sorted(postings[term], key=lambda posting: (-posting[1], posting[0])):
+            posting_docs.append(position)
+            posting_weights.append(weight)
+        posting_offsets.append(len(posting_docs))
+    
+    forward_offsets = array('I', [0])
+    forward_terms = array('I')
+    forward_weights = array('f')
+    for terms in lessons_terms:
+        for number, weight in sorted((term_numbers[term], weight) for term, weight in terms.items()):
+            forward_terms.append(number)
+            forward_weights.append(weight)
+        forward_offsets.append(len(forward_terms))
+    
+    blocks = (id_offsets, term_offsets, posting_offsets, posting_docs, posting_weights,
+              forward_offsets, forward_terms, forward_weights)
+    if sys.byteorder != 'little':
+        for block in blocks:
+            block.byteswap()
+    
+    header = HEADER.pack(SEARCH_INDEX_MAGIC, SEARCH_INDEX_VERSION, len(lesson_ids), len(postings),
+                         len(ids_blob), len(terms_blob), len(posting_docs))
+    tmp_path = index_path.with_name(f".{index_path.name}.tmp")
+    with open(tmp_path, 'wb') as f:
+        f.write(header)
+        f.write(id_offsets.tobytes())
+        f.write(_padded(bytes(ids_blob)))
+        f.write(term_offsets.tobytes())
+        f.write(_padded(bytes(terms_blob)))
+        f.write(posting_offsets.tobytes())
+        f.write(posting_docs.tobytes())
+        f.write(posting_weights.tobytes())
+        f.write(forward_offsets.tobytes())
+        f.write(forward_terms.tobytes())
+        f.write(forward_weights.tobytes())
+    tmp_path.replace(index_path)
+
+
+class _Terms:
+    """Отсортированный словарь терминов поверх mmap (для bisect)"""
+    
+    def __init__(self, blob: memoryview, offsets: memoryview):
+        self.blob = blob
+        self.offsets = offsets
+    
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+    
+    def __getitem__(self, i: int) -> bytes:
+        return self.blob[self.offsets[i]:self.offsets[i + 1]].tobytes()
+
+
+class LessonSearch:
+    """Ранжированный поиск по индексу lessons_search.idx"""
+    
+    def __init__(self, index_path: str):
+        if sys.byteorder != 'little':
+            raise RuntimeError("Индекс поиска читается только на little-endian платформах")
+        
+        with open(index_path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        data = memoryview(self._mmap)
+        
+        magic, version, docs, terms, ids_len, terms_len, postings = HEADER.unpack_from(data)
+        if magic != SEARCH_INDEX_MAGIC or version != SEARCH_INDEX_VERSION:
+            raise ValueError(f"Неподдерживаемый формат индекса: {index_path}")
+        
+        offset = HEADER.size
+        
+        def take(length: int) -> memoryview:
+            nonlocal offset
+            block = data[offset:offset + length]
+            offset += length + (-length % 4)
+            return block
+        
+        self.docs_count = docs
+        self._id_offsets = take(4 * (docs + 1)).cast('I')
+        self._ids = take(ids_len)
+        term_offsets = take(4 * (terms + 1)).cast('I')
+        self._terms = _Terms(take(terms_len), term_offsets)
+        self._posting_offsets = take(4 * (terms + 1)).cast('I')
+        self._posting_docs = take(4 * postings).cast('I')
+        self._posting_weights = take(4 * postings).cast('f')
+        self._forward_offsets = take(4 * (docs + 1)).cast('I')
+        self._forward_terms = take(4 * postings).cast('I')
+        self._forward_weights = take(4 * postings).cast('f')
+    
+    def lesson_id(self, position: int) -> str:
+        return self._ids[self._id_offsets[position]:self._id_offsets[position + 1]].tobytes().decode('utf-8')
+    
+    def find_term(self, term: str) -> int:
+        """Номер термина в словаре или -1"""
+        key = term.encode('utf-8')
+        i = bisect_left(self._terms, key)
+        if i < len(self._terms) and self._terms[i] == key:
+            return i
+        return -1
+    
+    def postings(self, i: int, limit: Optional[int] = None) -> Tuple[memoryview, memoryview]:
+        """Номера уроков и веса термина i (по убыванию веса), не больше limit"""
+        start, end = self._posting_offsets[i], self._posting_offsets[i + 1]
+        if limit is not None:
+            end = min(end, start + limit)
+        return self._posting_docs[start:end], self._posting_weights[start:end]
+    
+    def top_full_matches(self, found: List[Tuple[int, int, float]], limit: int) -> List[Tuple[int, float]]:
+        """
+        limit лучших уроков со всеми терминами (алгоритм порога Фейгина)
+        
+        Постинги всех терминов читаются параллельно от больших весов к меньшим,
+        очки каждого нового урока считаются по прямому индексу. Урок, ещё не
+        встреченный ни в одном списке, наберёт не больше порога - суммы весов
+        на текущей глубине, а при равных очках его номер не меньше номеров на
+        текущей глубине (равные веса хранятся по возрастанию номера). Поэтому
+        чтение останавливается, как только худший из limit найденных уроков
+        лучше этой границы, или когда закончился один из списков: все уроки
+        со всеми терминами к этому моменту уже встречены.
+        
+        Returns:
+            Список (номер урока, очки) по убыванию очков, при равенстве - по номеру
+        """
+        lists = [self.postings(i) for i, _, _ in found]
+        shortest = min(len(docs) for docs, _ in lists)
+        offsets, forward_terms, forward_weights = self._forward_offsets, self._forward_terms, self._forward_weights
+        best: List[Tuple[float, int]] = []  # куча (очки, -номер): на вершине худший
+        seen = set()
+        for depth in range(shortest):
+            for docs, _ in lists:
+                doc = docs[depth]
+                if doc in seen:
+                    continue
+                seen.add(doc)
+                
+                # Очки урока по прямому индексу (None - нет одного из терминов)
+                start, end = offsets[doc], offsets[doc + 1]
+                score = 0.0
+                for i, _, idf in found:
+                    j = bisect_left(forward_terms, i, start, end)
+                    if j == end or forward_terms[j] != i:
+                        score = None
+                        break
+                    score += forward_weights[j] * idf
+                if score is None:
+                    continue
+                
+                if len(best) < limit:
+                    heapq.heappush(best, (score, -doc))
+                elif (score, -doc) > best[0]:
+                    heapq.heapreplace(best, (score, -doc))
+            
+            if len(best) == limit and depth + 1 < shortest:
+                threshold = 0.0
+                for (docs, weights), (_, _, idf) in zip(lists, found):
+                    threshold += weights[depth + 1] * idf
+                bound_doc = max(docs[depth + 1] for docs, _ in lists)
+                if best[0] > (threshold, -bound_doc):
+                    break
+        return [(-doc, score) for score, doc in sorted(best, reverse=True)]
+    
+    def search(self, query: str, limit: int = 10) -> List[Tuple[str, float]]:
+        """
+        Поиск уроков по запросу
+        
+        Очки урока - сумма весов совпавших терминов, умноженных на IDF.
+        Уроки, где нашлись все слова запроса, идут выше остальных, и лучшие из
+        них находятся точно (см. top_full_matches): обычно хватает начала
+        списков постингов, поэтому запрос не зависит от размера каталога.
+        Только если таких уроков меньше limit, результат дополняется уроками
+        с частью слов по MAX_POSTINGS_PER_TERM лучшим постингам каждого термина.
+        
+        Returns:
+            Список (id урока, очки) по убыванию релевантности
+        """
+        if limit <= 0:
+            return []
+        found = []
+        for term in dict.fromkeys(normalize(query)):
+            i = self.find_term(term)
+            if i >= 0:
+                count = self._posting_offsets[i + 1] - self._posting_offsets[i]
+                found.append((i, count, math.log(1 + self.docs_count / count)))
+        if not found:
+            return []
+        found.sort(key=lambda item: item[1])
+        
+        ranked = self.top_full_matches(found, limit)
+        
+        if len(ranked) < limit and len(found) > 1:
+            # Все уроки со всеми словами уже в ranked; остальные - с частью слов
+            full = {doc for doc, _ in ranked}
+            scores: Dict[int, float] = {}
+            matched: Dict[int, int] = {}
+            for i, _, idf in found:
+                for doc, weight in zip(*self.postings(i, MAX_POSTINGS_PER_TERM)):
+                    if doc not in full:
+                        scores[doc] = scores.get(doc, 0.0) + weight * idf
+                        matched[doc] = matched.get(doc, 0) + 1
+            tail = heapq.nsmallest(limit - len(ranked), scores, key=lambda doc: (-matched[doc], -scores[doc], doc))
+            ranked += [(doc, scores[doc]) for doc in tail]
+        
+        return [(self.lesson_id(doc), round(score, 3)) for doc, score in ranked]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Поиск уроков')
+    parser.add_argument('query', help='Поисковый запрос')
+    parser.add_argument('--index', default=f'./content/lessons/{SEARCH_INDEX_NAME}', help='Путь к индексу')
+    parser.add_argument('--limit', type=int, default=10, help='Количество результатов')
+    
+    args = parser.parse_args()
+    
+    if not Path(args.index).exists():
+        print(f"❌ Индекс не найден: {args.index}")
+        return
+    
+    search = LessonSearch(args.index)
+    results = search.search(args.query, args.limit)
+    
+    print(f"🔎 Найдено уроков: {len(results)}")
+    for lesson_id, score in results:
+        print(f"  {lesson_id}  ({score})")
+
+
+if __name__ == '__main__':
+    main()
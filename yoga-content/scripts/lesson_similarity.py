@@ -0,0 +1,342 @@
+#!/usr/bin/env python3
+"""
+Похожие уроки и рекомендации "что практиковать дальше"
+Индекс ближайших соседей строится при генерации индекса (import_lessons.py) в lessons_similar.json
+по тегам, областям фокуса, оборудованию, категории, уровню и длительности (нужен numpy)
+Использование: python lesson_similarity.py --index ./content/lessons/lessons_similar.json 001 --next
+"""
+
+import os
+import json
+import hashlib
+import argparse
+from collections import defaultdict, deque
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # pip install numpy - для индекса похожих уроков
+    np = None
+
+from catalog import write_if_changed
+
+
+SIMILARITY_INDEX_NAME = "lessons_similar.json"
+# Кеш: отпечатки признаков уроков и таблица соседей прошлой сборки
+SIMILARITY_CACHE_NAME = ".lessons_similar_cache.npz"
+SIMILARITY_INDEX_VERSION = 1
+SIMILAR_COUNT = 10
+
+# Вклад групп признаков в сходство (каждая группа нормируется отдельно)
+FEATURE_WEIGHTS = {
+    'tags': 1.0,
+    'focus_areas': 0.8,
+    'category': 0.8,
+    'level': 0.6,
+    'duration': 0.5,
+    'equipment': 0.4,
+}
+LIST_FEATURES = ('tags', 'focus_areas', 'equipment')
+LEVELS = (1, 2, 3)
+# Длительность кодируется близостью к узлам сетки (минуты): 20 и 25 минут похожи, 10 и 60 - нет
+DURATION_GRID = tuple(range(0, 130, 10))
+DURATION_SCALE = 10.0
+# Ограничение на размер блока матрицы сходства (элементов float32)
+BLOCK_ELEMENTS = 1 << 24
+# Столбцов в группе при отборе кандидатов в соседи
+GROUP_SIZE = 64
+
+
+def feature_fingerprint(facets: Dict) -> str:
+    """Отпечаток признаков урока: другие поля на сходство не влияют"""
+    features = [facets['id'], facets.get('category'), facets.get('level'), facets.get('duration')]
+    features += [sorted(map(str, facets.get(name) or [])) for name in LIST_FEATURES]
+    return hashlib.sha1(repr(features).encode('utf-8')).hexdigest()[:16]
+
+
+def _feature_values(lesson: Dict, name: str) -> Set[str]:
+    values = lesson.get(name) or [] if name in LIST_FEATURES else [lesson.get(name)]
+    return {str(value) for value in values if value is not None}
+
+
+def encode_lessons(facets: List[Dict]) -> 'np.ndarray':
+    """
+    Векторы признаков уроков (float32, единичной длины)
+    
+    Теги, области фокуса, оборудование и категория - по столбцу на значение,
+    уровень и длительность - близость к соседним уровням и узлам сетки.
+    Каждая группа нормируется и умножается на свой вес, поэтому вектор урока
+    зависит только от его полей: добавление уроков с новыми тегами не меняет
+    сходство уже существующих.
+    """
+    blocks = []
+    for name in ('category',) + LIST_FEATURES:
+        values = [_feature_values(lesson, name) for lesson in facets]
+        vocabulary = {value: column for column, value in enumerate(sorted(set().union(*values)))}
+        rows = [row for row, lesson_values in enumerate(values) for _ in lesson_values]
+        columns = [vocabulary[value] for lesson_values in values for value in lesson_values]
+        block = np.zeros((len(facets), len(vocabulary)), dtype=np.float32)
+        block[rows, columns] = 1.0
+        blocks.append((name, block))
+    
+    levels = np.array([lesson.get('level') if isinstance(lesson.get('level'), int) else -10
+                       for lesson in facets], dtype=np.float32)
+    blocks.append(('level', np.maximum(0.0, 1.0 - 0.5 * np.abs(levels[:, None] - np.array(LEVELS)))))
+    
+    durations = np.array([lesson.get('duration') if isinstance(lesson.get('duration'), int) else -1000
+                          for lesson in facets], dtype=np.float32)
+    closeness = np.exp(-((durations[:, None] - np.array(DURATION_GRID)) / DURATION_SCALE) ** 2)
+    # Хвосты гауссианы обнуляются: денормализованные float32 в десятки раз замедляют умножение матриц
+    closeness[closeness < 1e-3] = 0.0
+    blocks.append(('duration', closeness))
+    
+    weighted = []
+    for name, block in blocks:
+        norms = np.linalg.norm(block, axis=1, keepdims=True)
+        weighted.append(np.divide(block, norms, out=np.zeros_like(block), where=norms > 0)
+                        * FEATURE_WEIGHTS[name])
+    vectors = np.hstack(weighted).astype(np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return np.divide(vectors, norms, out=np.zeros_like(vectors), where=norms > 0)
+
+
+def _select_top(candidates: 'np.ndarray', scores: 'np.ndarray', k: int) -> Tuple['np.ndarray', 'np.ndarray']:
+    """k лучших кандидатов в каждой строке: по убыванию сходства, при равенстве - по позиции"""
+    if scores.shape[1] > k:
+        best = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        candidates = np.take_along_axis(candidates, best, axis=1)
+        scores = np.take_along_axis(scores, best, axis=1)
+    order = np.lexsort((candidates, -scores), axis=1)
+    return np.take_along_axis(candidates, order, axis=1), np.take_along_axis(scores, order, axis=1)
+
+
+def nearest_neighbors(vectors: 'np.ndarray', rows: 'np.ndarray', k: int) -> Tuple['np.ndarray', 'np.ndarray']:
+    """
+    k ближайших соседей для уроков rows среди всех уроков
+    
+    Сходство считается умножением матриц блоками строк, чтобы матрица
+    блока помещалась в память при любом размере каталога. Столбцы
+    делятся на группы по GROUP_SIZE: k лучших соседей лежат не больше чем
+    в k группах с наибольшими максимумами, поэтому точный отбор идёт
+    среди k * GROUP_SIZE кандидатов, а не по всей строке.
+    """
+    count = len(vectors)
+    neighbors = np.empty((len(rows), k), dtype=np.int32)
+    scores = np.empty((len(rows), k), dtype=np.float32)
+    if k == 0:
+        return neighbors, scores
+    
+    groups = -(-count // GROUP_SIZE)
+    padded = np.zeros((groups * GROUP_SIZE, vectors.shape[1]), dtype=np.float32)
+    padded[:count] = vectors
+    offsets = np.arange(GROUP_SIZE, dtype=np.int32)
+    block = max(1, BLOCK_ELEMENTS // len(padded))
+    for start in range(0, len(rows), block):
+        block_rows = rows[start:start + block]
+        columns = np.arange(len(block_rows))
+        # Матрица блока хранится транспонированной (урок-кандидат x урок блока):
+        # максимум по группе - поэлементный максимум строк, а не свёртка коротких отрезков
+        similarity = padded @ vectors[block_rows].T
+        similarity[count:] = -np.inf
+        similarity[block_rows, columns] = -np.inf
+        if groups > k:
+            maxima = similarity.reshape(groups, GROUP_SIZE, len(block_rows)).max(axis=1)
+            best_groups = np.argpartition(-maxima, k - 1, axis=0)[:k].T.astype(np.int32)
+            candidates = (best_groups[:, :, None] * GROUP_SIZE + offsets).reshape(len(block_rows), -1)
+        else:
+            candidates = np.broadcast_to(np.arange(len(padded), dtype=np.int32), (len(block_rows), len(padded)))
+        candidate_scores = similarity[candidates, columns[:, None]]
+        neighbors[start:start + block], scores[start:start + block] = _select_top(candidates, candidate_scores, k)
+    return neighbors, scores
+
+
+def merge_neighbors(vectors: 'np.ndarray', rows: 'np.ndarray', neighbors: 'np.ndarray', scores: 'np.ndarray',
+                    added: 'np.ndarray', k: int) -> Tuple['np.ndarray', 'np.ndarray']:
+    """Обновление соседей уроков rows с учётом добавленных уроков added (без пересчёта со всем каталогом)"""
+    merged_neighbors = np.empty((len(rows), k), dtype=np.int32)
+    merged_scores = np.empty((len(rows), k), dtype=np.float32)
+    block = max(1, BLOCK_ELEMENTS // max(len(added), 1))
+    for start in range(0, len(rows), block):
+        block_rows = rows[start:start + block]
+        similarity = vectors[block_rows] @ vectors[added].T
+        candidates = np.hstack([neighbors[start:start + block],
+                                np.broadcast_to(added.astype(np.int32), similarity.shape)])
+        merged_neighbors[start:start + block], merged_scores[start:start + block] = _select_top(
+            candidates, np.hstack([scores[start:start + block], similarity]), k
+        )
+    return merged_neighbors, merged_scores
+
+
+def load_cache(cache_path: Path, k: int) -> Optional[Dict]:
+    """Таблица соседей прошлой сборки (None, если кеша нет или изменились параметры)"""
+    try:
+        with np.load(cache_path) as data:
+            cache = {name: data[name] for name in data.files}
+    except (OSError, ValueError, KeyError):
+        return None
+    if int(cache.get('version', -1)) != SIMILARITY_INDEX_VERSION or int(cache.get('k', -1)) != k:
+        return None
+    return cache
+
+
+def previous_positions(fingerprints: List[str], cached: List[str]) -> Optional['np.ndarray']:
+    """
+    Новая позиция каждого урока прошлой сборки
+    
+    Returns:
+        None, если какой-то урок удалён или изменился (нужна полная пересборка)
+    """
+    positions: Dict[str, deque] = defaultdict(deque)
+    for position, fingerprint in enumerate(fingerprints):
+        positions[fingerprint].append(position)
+    mapping = np.empty(len(cached), dtype=np.int32)
+    for old_position, fingerprint in enumerate(cached):
+        if not positions[fingerprint]:
+            return None
+        mapping[old_position] = positions[fingerprint].popleft()
+    return mapping
+
+
+def build_similarity_index(output_dir: Path, facets: List[Dict], k: int = SIMILAR_COUNT) -> Tuple[int, bool]:
+    """
+    Индекс похожих уроков с инкрементальным обновлением
+    
+    Если с прошлой сборки уроки только добавлялись, соседи считаются для
+    новых уроков, а соседи остальных дополняются новыми уроками - это
+    O(n * добавленные) вместо O(n^2). При удалении или изменении признаков
+    урока таблица пересчитывается целиком. Если признаки не менялись,
+    файлы не перезаписываются.
+    
+    Args:
+        output_dir: Папка для lessons_similar.json (рядом с индексом уроков)
+        facets: Поля уроков в порядке индекса (lesson_facets)
+        k: Соседей на урок
+    
+    Returns:
+        Количество уроков, для которых соседи посчитаны заново, и признак полной пересборки
+    """
+    index_path = output_dir / SIMILARITY_INDEX_NAME
+    cache_path = output_dir / SIMILARITY_CACHE_NAME
+    fingerprints = [feature_fingerprint(lesson) for lesson in facets]
+    count = len(facets)
+    width = min(k, max(count - 1, 0))
+    
+    cache = load_cache(cache_path, k)
+    mapping = None
+    if cache is not None:
+        mapping = previous_positions(fingerprints, cache['fingerprints'].tolist())
+    
+    if mapping is not None and len(mapping) == count and index_path.exists():
+        # Признаки не изменились: соседи прошлой сборки актуальны
+        if np.array_equal(mapping, np.arange(count)):
+            return 0, False
+    
+    vectors = encode_lessons(facets)
+    if mapping is None:
+        neighbors, scores = nearest_neighbors(vectors, np.arange(count), width)
+        computed, full = count, True
+    else:
+        added = np.setdiff1d(np.arange(count), mapping).astype(np.int32)
+        neighbors = np.empty((count, width), dtype=np.int32)
+        scores = np.empty((count, width), dtype=np.float32)
+        # Номера соседей прошлой сборки переводятся в новые позиции
+        old_neighbors = mapping[cache['neighbors']]
+        if len(added):
+            neighbors[mapping], scores[mapping] = merge_neighbors(vectors, mapping, old_neighbors,
+                                                                  cache['scores'], added, width)
+            neighbors[added], scores[added] = nearest_neighbors(vectors, added, width)
+        else:
+            neighbors[mapping], scores[mapping] = old_neighbors, cache['scores']
+        computed, full = len(added), False
+    
+    write_if_changed(index_path, json.dumps({
+        "version": SIMILARITY_INDEX_VERSION,
+        "k": width,
+        "ids": [lesson['id'] for lesson in facets],
+        "levels": [lesson.get('level') for lesson in facets],
+        "neighbors": neighbors.tolist(),
+        "scores": np.round(scores.astype(np.float64), 4).tolist()
+    }, ensure_ascii=False, separators=(',', ':')))
+    
+    tmp_path = cache_path.with_name(f".{cache_path.name}.tmp")
+    with open(tmp_path, 'wb') as f:
+        np.savez(f, version=SIMILARITY_INDEX_VERSION, k=k, fingerprints=np.array(fingerprints),
+                 neighbors=neighbors, scores=scores)
+    os.replace(tmp_path, cache_path)
+    return computed, full
+
+
+class LessonSimilarity:
+    """Поиск по готовому индексу похожих уроков"""
+    
+    def __init__(self, index: Dict):
+        if index.get('version') != SIMILARITY_INDEX_VERSION:
+            raise ValueError(f"Неподдерживаемая версия индекса: {index.get('version')}")
+        self.ids: List[str] = index['ids']
+        self.levels: List[Optional[int]] = index['levels']
+        self.neighbors: List[List[int]] = index['neighbors']
+        self.scores: List[List[float]] = index['scores']
+        # При повторных ID - первый урок, как в индексе уроков
+        self.positions: Dict[str, int] = {}
+        for position, lesson_id in enumerate(self.ids):
+            self.positions.setdefault(lesson_id, position)
+    
+    @classmethod
+    def load(cls, index_path: str) -> 'LessonSimilarity':
+        with open(index_path, 'r', encoding='utf-8') as f:
+            return cls(json.load(f))
+    
+    def similar(self, lesson_id: str, limit: Optional[int] = None) -> List[Tuple[str, float]]:
+        """Похожие уроки по убыванию сходства: [(id, сходство), ...]"""
+        position = self.positions.get(lesson_id)
+        if position is None:
+            return []
+        pairs = [(self.ids[neighbor], score)
+                 for neighbor, score in zip(self.neighbors[position], self.scores[position])]
+        return pairs[:limit] if limit is not None else pairs
+    
+    def next_lessons(self, lesson_id: str, limit: Optional[int] = None) -> List[Tuple[str, float]]:
+        """
+        Что практиковать дальше: похожие уроки того же уровня или на один выше
+        
+        Сначала уроки следующего уровня, затем того же, внутри - по сходству.
+        """
+        position = self.positions.get(lesson_id)
+        if position is None:
+            return []
+        level = self.levels[position]
+        candidates = [(neighbor, score)
+                      for neighbor, score in zip(self.neighbors[position], self.scores[position])
+                      if level is None or self.levels[neighbor] in (level, level + 1)]
+        candidates.sort(key=lambda item: (self.levels[item[0]] != (level or 0) + 1, -item[1]))
+        pairs = [(self.ids[neighbor], score) for neighbor, score in candidates]
+        return pairs[:limit] if limit is not None else pairs
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Похожие уроки')
+    parser.add_argument('--index', default=f'./content/lessons/{SIMILARITY_INDEX_NAME}', help='Путь к индексу')
+    parser.add_argument('--next', action='store_true', help='Что практиковать дальше (тот же уровень или выше)')
+    parser.add_argument('--limit', type=int, default=5, help='Количество результатов')
+    parser.add_argument('lesson', help='ID урока')
+    
+    args = parser.parse_args()
+    
+    if not Path(args.index).exists():
+        print(f"❌ Индекс не найден: {args.index}")
+        return
+    
+    similarity = LessonSimilarity.load(args.index)
+    if args.lesson not in similarity.positions:
+        print(f"❌ Урок не найден: {args.lesson}")
+        return
+    
+    lessons = (similarity.next_lessons if args.next else similarity.similar)(args.lesson, args.limit)
+    print(f"{'➡️  Дальше' if args.next else '🔗 Похожие'} для урока {args.lesson}: {len(lessons)}")
+    for lesson_id, score in lessons:
+        print(f"  {lesson_id}  {score:.3f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,801 @@
+#!/usr/bin/env python3
+"""
+Единая сборка контента: импорт, метаданные, описания, превью, валидация и индексы
+Задачи уроков и программ образуют граф зависимостей, независимые задачи выполняются
+параллельно, актуальные задачи пропускаются по отпечаткам входных данных
+Использование: python pipeline.py --content ./content --source /path/to/videos --config ./config/lessons_config.json --jobs 8
+"""
+
+import os
+import sys
+import json
+import time
+import hashlib
+import argparse
+from collections import defaultdict
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from catalog import Catalog, ProgramRecord
+from content_watch import create_watcher
+from generate_thumbnails import ThumbnailGenerator, ThumbnailResult
+from import_lessons import LessonImporter
+from instrumentation import Metrics, add_arguments, instrumented
+from lesson_similarity import SIMILAR_COUNT
+from validate_content import ContentValidator, ValidationAborted
+
+
+PIPELINE_STATE_NAME = ".pipeline_state.json"
+PIPELINE_STATE_VERSION = 1
+
+# Порядок этапов в итоговой таблице
+STAGES = ('import', 'metadata', 'description', 'thumbnail', 'validate',
+          'program_thumbnail', 'program_validate', 'index')
+
+
+@dataclass
+class Task:
+    """
+    Задача графа сборки
+    
+    run выполняется в рабочем потоке и пишет сообщения в переданный буфер,
+    finish применяет результат в главном потоке и возвращает успех задачи.
+    """
+    key: str
+    stage: str
+    run: Callable[[List[str]], object]
+    deps: List[str] = field(default_factory=list)
+    # Входные данные для отпечатка (None - задача выполняется всегда)
+    inputs: Optional[Callable[[], object]] = None
+    # Результаты задачи на месте (без них актуальная задача всё равно выполняется)
+    outputs: Optional[Callable[[], bool]] = None
+    finish: Optional[Callable[[object], bool]] = None
+    # Выполнять, даже если зависимость завершилась с ошибкой (проверки)
+    always: bool = False
+    # pending, done, skipped, failed или blocked
+    status: str = 'pending'
+    fingerprint: Optional[str] = None
+    # Время выполнения в рабочем потоке (без ожидания в очереди завершения)
+    started: float = 0.0
+    ended: float = 0.0
+    # Время finish в главном потоке
+    finish_time: float = 0.0
+    log: List[str] = field(default_factory=list)
+    
+    @property
+    def elapsed(self) -> float:
+        return self.ended - self.started
+
+
+class TaskGraph:
+    """Граф задач: параллельное выполнение в топологическом порядке с пропуском актуальных задач"""
+    
+    def __init__(self, jobs: int, state_path: Path, force: bool = False,
+                 metrics: Optional[Metrics] = None):
+        self.jobs = max(1, jobs)
+        self.state_path = state_path
+        self.force = force
+        self.metrics = metrics or Metrics(enabled=False)
+        self.tasks: Dict[str, Task] = {}
+        self.state = self.load_state()
+        self.started = 0.0
+        self.elapsed = 0.0
+    
+    def add(self, task: Task) -> Task:
+        """
+        Добавление задачи
+        
+        Зависимости должны быть добавлены раньше, поэтому граф не может
+        содержать циклов.
+        """
+        if task.key in self.tasks:
+            raise ValueError(f"Задача {task.key} уже добавлена")
+        for dep in task.deps:
+            if dep not in self.tasks:
+                raise ValueError(f"Задача {task.key}: неизвестная зависимость {dep}")
+        self.tasks[task.key] = task
+        return task
+    
+    def load_state(self) -> Dict[str, str]:
+        """Отпечатки задач прошлой сборки"""
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return {}
+        if state.get('version') != PIPELINE_STATE_VERSION:
+            return {}
+        return state['tasks']
+    
+    def save_state(self, prune: bool = True):
+        """
+        Сохранение отпечатков успешных задач (задачи с ошибкой повторятся в следующий раз)
+        
+        Args:
+            prune: Удалить отпечатки задач, которых нет в графе (полная сборка);
+                   при частичной сборке (--watch) они сохраняются
+        """
+        tasks = {} if prune else dict(self.state)
+        for key, task in self.tasks.items():
+            if task.fingerprint is not None and task.status in ('done', 'skipped'):
+                tasks[key] = task.fingerprint
+            else:
+                tasks.pop(key, None)
+        tmp_path = self.state_path.with_name(f".{self.state_path.name}.tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({"version": PIPELINE_STATE_VERSION, "tasks": tasks}, f, ensure_ascii=False)
+        os.replace(tmp_path, self.state_path)
+    
+    def fingerprint(self, task: Task) -> Optional[str]:
+        """Отпечаток задачи: её входные данные и отпечатки зависимостей"""
+        if task.inputs is None:
+            return None
+        payload = json.dumps(
+            {"inputs": task.inputs(), "deps": [self.tasks[dep].fingerprint for dep in task.deps]},
+            ensure_ascii=False, sort_keys=True, default=str
+        )
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+    
+    def now(self) -> float:
+        return time.perf_counter() - self.started
+    
+    def execute(self, task: Task):
+        """Выполнение задачи в рабочем потоке"""
+        task.started = self.now()
+        try:
+            task.fingerprint = self.fingerprint(task)
+            if (not self.force and task.fingerprint is not None
+                    and self.state.get(task.key) == task.fingerprint
+                    and (task.outputs is None or task.outputs())):
+                task.status = 'skipped'
+                return None
+            return task.run(task.log)
+        except Exception as e:
+            task.log.append(f"  ❌ {task.key}: {e}")
+            task.status = 'failed'
+            return None
+        finally:
+            task.ended = self.now()
+    
+    def complete(self, task: Task, value):
+        """Применение результата задачи (только из главного потока)"""
+        for message in task.log:
+            print(message)
+        if task.status == 'pending':
+            finish_started = time.perf_counter()
+            ok = task.finish(value) if task.finish is not None else value is not False
+            task.finish_time = time.perf_counter() - finish_started
+            task.status = 'done' if ok else 'failed'
+        if task.status != 'skipped':
+            self.metrics.record(f"pipeline.{task.stage}", task.elapsed + task.finish_time, task.key,
+                                failed=task.status == 'failed')
+    
+    def run(self):
+        """
+        Выполнение графа
+        
+        Задача отправляется в пул, как только завершились все её зависимости.
+        Если зависимость завершилась с ошибкой, задача не выполняется
+        (кроме задач с always=True).
+        """
+        self.started = time.perf_counter()
+        remaining = {key: len(task.deps) for key, task in self.tasks.items()}
+        dependents: Dict[str, List[str]] = defaultdict(list)
+        for task in self.tasks.values():
+            for dep in task.deps:
+                dependents[dep].append(task.key)
+        
+        executor = ThreadPoolExecutor(max_workers=self.jobs)
+        running = {}
+        
+        def release(task: Task):
+            for key in dependents[task.key]:
+                remaining[key] -= 1
+                if remaining[key] == 0:
+                    schedule(self.tasks[key])
+        
+        def schedule(task: Task):
+            failed = any(self.tasks[dep].status in ('failed', 'blocked') for dep in task.deps)
+            if failed and not task.always:
+                task.status = 'blocked'
+                task.started = task.ended = self.now()
+                release(task)
+            else:
+                running[executor.submit(self.execute, task)] = task
+        
+        try:
+            for key, count in remaining.items():
+                if count == 0:
+                    schedule(self.tasks[key])
+            while running:
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    task = running.pop(future)
+                    self.complete(task, future.result())
+                    release(task)
+        finally:
+            # При прерывании (Ctrl+C, --fail-fast) не ждём задачи, которые ещё не начаты
+            executor.shutdown(cancel_futures=True)
+            self.elapsed = time.perf_counter() - self.started
+    
+    def critical_path(self) -> List[Task]:
+        """
+        Критический путь фактического выполнения
+        
+        Цепочка от задачи, завершившейся последней, через зависимость,
+        завершившуюся позже остальных.
+        """
+        finished = [task for task in self.tasks.values() if task.status != 'pending']
+        if not finished:
+            return []
+        path = [max(finished, key=lambda task: task.ended)]
+        while path[-1].deps:
+            path.append(max((self.tasks[dep] for dep in path[-1].deps), key=lambda task: task.ended))
+        return list(reversed(path))
+    
+    def print_summary(self):
+        """Таблица по этапам и критический путь"""
+        stages: Dict[str, Dict[str, float]] = {}
+        for task in self.tasks.values():
+            stats = stages.setdefault(task.stage, defaultdict(float))
+            stats[task.status] += 1
+            stats['time'] += task.elapsed
+            stats['finish'] += task.finish_time
+        
+        print("\n" + "=" * 60)
+        print("📊 ИТОГИ СБОРКИ")
+        print("=" * 60)
+        print(f"\n{'Этап':<18} {'выполнено':>9} {'пропущено':>9} {'ошибок':>7} {'не запущено':>11} {'время':>9} {'применение':>10}")
+        for stage in sorted(stages, key=lambda name: STAGES.index(name) if name in STAGES else len(STAGES)):
+            stats = stages[stage]
+            print(f"{stage:<18} {stats['done']:>9.0f} {stats['skipped']:>9.0f} {stats['failed']:>7.0f} "
+                  f"{stats['blocked']:>11.0f} {stats['time']:>8.2f}с {stats['finish']:>9.2f}с")
+        
+        total = sum(task.elapsed for task in self.tasks.values())
+        finish = sum(task.finish_time for task in self.tasks.values())
+        parallelism = total / self.elapsed if self.elapsed else 0.0
+        print(f"\n⏱  Время сборки: {self.elapsed:.2f} сек "
+              f"(сумма задач {total:.2f} сек, параллелизм x{parallelism:.1f}, потоков: {self.jobs}; "
+              f"применение результатов в главном потоке {finish:.2f} сек)")
+        
+        path = self.critical_path()
+        if path:
+            print(f"🧭 Критический путь: {path[-1].ended:.2f} сек")
+            for task in path:
+                note = "" if task.status == 'done' else f" ({task.status})"
+                print(f"   {task.started:>7.2f} -> {task.ended:>6.2f} сек  {task.key}{note}")
+
+
+class ContentPipeline:
+    """Построение графа задач сборки контента из импортера, генератора превью и валидатора"""
+    
+    def __init__(self, content_dir: str, schemas_dir: str,
+                 programs_dir: str, categories_dir: str,
+                 templates_dir: str, source_dir: Optional[str] = None,
+                 lessons_config: Optional[List[Dict]] = None,
+                 link_mode: str = 'copy', jobs: Optional[int] = None,
+                 force: bool = False, use_cache: bool = True,
+                 program_template: Optional[str] = None,
+                 catalog_dir: Optional[str] = None,
+                 compact_index: bool = False,
+                 page_size: int = LessonImporter.CATALOG_PAGE_SIZE,
+                 similar: int = SIMILAR_COUNT,
+                 sqlite: bool = False,
+                 fail_fast: bool = False,
+                 metrics: Optional[Metrics] = None):
+        self.content_dir = Path(content_dir)
+        self.lessons_dir = self.content_dir / "lessons"
+        self.lessons_dir.mkdir(parents=True, exist_ok=True)
+        self.schemas_dir = Path(schemas_dir)
+        self.categories_dir = Path(categories_dir)
+        self.templates_dir = Path(templates_dir)
+        self.lessons_config = lessons_config or []
+        self.program_template = Path(program_template) if program_template else None
+        self.catalog_dir = catalog_dir
+        self.compact_index = compact_index
+        self.page_size = page_size
+        self.similar = similar
+        self.sqlite = sqlite
+        self.jobs = max(1, jobs or os.cpu_count() or 1)
+        self.force = force
+        self.use_cache = use_cache
+        self.fail_fast = fail_fast
+        self.with_thumbnails: Optional[bool] = None
+        # Файлы, записанные последней сборкой в --watch (события от них пропускаются)
+        self.settled: Dict[Path, Optional[Tuple[int, int]]] = {}
+        # Замеры этапов (--metrics-out), общие для всех скриптов сборки
+        self.metrics = metrics or Metrics(enabled=False)
+        
+        # Один каталог на все этапы: папки сканируются один раз за сборку
+        self.catalog = Catalog(self.lessons_dir, programs_dir, categories_dir)
+        self.importer = LessonImporter(
+            source_dir=source_dir or '.',
+            output_dir=str(self.lessons_dir),
+            schema_path=str(self.schemas_dir / "lesson.schema.json"),
+            link_mode=link_mode,
+            templates_dir=str(self.templates_dir),
+            catalog=self.catalog,
+            metrics=self.metrics
+        )
+        self.generator = ThumbnailGenerator(str(self.lessons_dir), jobs=self.jobs,
+                                            catalog=self.catalog, metrics=self.metrics)
+        self.new_run()
+        self.templates_hash = self.files_hash(self.templates_dir / name
+                                              for name in self.importer.renderer.OUTPUTS.values())
+    
+    def new_run(self):
+        """Новый валидатор и граф задач (на каждую сборку в режиме --watch)"""
+        self.validator = ContentValidator(str(self.content_dir), str(self.schemas_dir),
+                                          use_cache=self.use_cache, fail_fast=self.fail_fast,
+                                          catalog=self.catalog, metrics=self.metrics)
+        self.graph = TaskGraph(self.jobs, self.content_dir / PIPELINE_STATE_NAME, self.force,
+                               metrics=self.metrics)
+    
+    @staticmethod
+    def files_hash(paths) -> str:
+        """SHA-256 содержимого нескольких файлов"""
+        digest = hashlib.sha256()
+        for path in paths:
+            digest.update(Path(path).read_bytes())
+        return digest.hexdigest()
+    
+    def importer_step(self, log: List[str], step: Callable[[], bool]) -> bool:
+        """Выполнение шага импортера с выводом в буфер задачи"""
+        self.importer._local.buffer = log
+        try:
+            return step()
+        finally:
+            self.importer._local.buffer = None
+    
+    def source_video(self, lesson_data: Dict) -> Optional[Path]:
+        if 'source_video' not in lesson_data:
+            return None
+        return self.importer.source_dir / lesson_data['source_video']
+    
+    def resolved_lesson(self, lesson_data: Dict, lesson_path: Path) -> Dict:
+        """Данные урока из конфигурации с путями к видео и превью"""
+        lesson = dict(lesson_data)
+        self.importer.resolve_urls(lesson, lesson_path, self.source_video(lesson_data))
+        return lesson
+    
+    def add_import_tasks(self, lesson_data: Dict) -> str:
+        """
+        Задачи урока из конфигурации: импорт видео -> metadata.json -> описание
+        
+        Returns:
+            Ключ последней задачи цепочки
+        """
+        folder = self.importer.lesson_folder_name(lesson_data['id'], lesson_data['title'])
+        lesson_path = self.lessons_dir / folder
+        video_path = self.source_video(lesson_data)
+        
+        def import_video(log):
+            def step():
+                self.importer._log(f"\n📦 Импорт урока {lesson_data['id']}: {lesson_data['title']}")
+                if not self.importer.validate_lesson(lesson_data):
+                    self.importer._log(f"  ❌ Урок {lesson_data['id']} не прошёл валидацию")
+                    return False
+                self.importer.create_lesson_folder(lesson_data['id'], lesson_data['title'])
+                if video_path and video_path.exists():
+                    self.importer.copy_video(video_path, lesson_path)
+                self.catalog.invalidate(lesson_path)
+                return True
+            return self.importer_step(log, step)
+        
+        def write_metadata(log):
+            lesson = self.resolved_lesson(lesson_data, lesson_path)
+            self.importer_step(log, lambda: self.importer.create_metadata(lesson, lesson_path))
+            self.catalog.invalidate(lesson_path)
+            return True
+        
+        def write_description(log):
+            lesson = self.resolved_lesson(lesson_data, lesson_path)
+            self.importer_step(log, lambda: self.importer.create_description(lesson, lesson_path))
+            self.catalog.invalidate(lesson_path)
+            return True
+        
+        import_key = self.graph.add(Task(
+            key=f"import:{folder}", stage='import', run=import_video,
+            inputs=lambda: {"lesson": self.importer.lesson_fingerprint(lesson_data),
+                            "schema": self.validator.schema_hash('lesson')},
+            outputs=lambda: (lesson_path / "video.mp4").exists() if video_path else lesson_path.is_dir()
+        )).key
+        metadata_key = self.graph.add(Task(
+            key=f"metadata:{folder}", stage='metadata', run=write_metadata, deps=[import_key],
+            inputs=lambda: {"lesson": lesson_data, "video": (lesson_path / "video.mp4").exists()},
+            outputs=lambda: (lesson_path / "metadata.json").exists()
+        )).key
+        return self.graph.add(Task(
+            key=f"description:{folder}", stage='description', run=write_description, deps=[metadata_key],
+            inputs=lambda: {"lesson": lesson_data, "templates": self.templates_hash},
+            outputs=lambda: all((lesson_path / name).exists() for name in self.importer.renderer.OUTPUTS)
+        )).key
+    
+    def thumbnail_inputs(self, folder: str) -> Optional[Dict]:
+        """Входные данные превью урока: видео (размер, mtime) и параметры ffmpeg"""
+        lesson = self.catalog.lesson(folder)
+        if lesson is None:
+            return None
+        return {"video": lesson.file_identity("video.mp4"), "params": self.generator.render_params(lesson)}
+    
+    def thumbnails_exist(self, folder: str) -> bool:
+        lesson = self.catalog.lesson(folder)
+        return lesson is not None and all(lesson.has_file(r['file']) for r in self.generator.renditions)
+    
+    def render_thumbnail(self, folder: str, log: List[str]):
+        lesson = self.catalog.lesson(folder)
+        if lesson is None:
+            log.append(f"⚠️  Папка урока {folder} не найдена")
+            return False
+        return self.generator.render_lesson(lesson)
+    
+    def finish_thumbnail(self, result) -> bool:
+        if not isinstance(result, ThumbnailResult):
+            return False
+        self.generator.record_result(result)
+        return result.status is not False
+    
+    def check_lesson(self, folder: str, log: List[str]):
+        lesson = self.catalog.lesson(folder)
+        return self.validator.check_lesson(lesson) if lesson is not None else None
+    
+    def finish_check(self, check) -> bool:
+        if check is not None:
+            self.validator.apply_check(check)
+        return True
+    
+    def finish_program_check(self, program: ProgramRecord) -> bool:
+        self.validator.validate_program(program)
+        return True
+    
+    def render_program_thumbnail(self, program: ProgramRecord, log: List[str]) -> ThumbnailResult:
+        return self.generator.render_program(program, self.generator.lesson_thumbnail_index(),
+                                             self.program_template)
+    
+    def finish_program_thumbnail(self, result: ThumbnailResult) -> bool:
+        for message in result.log:
+            print(message)
+        if result.entry is not None:
+            self.generator.program_manifest[result.lesson_key] = result.entry
+        return result.status is not False
+    
+    def program_thumbnail_inputs(self, program: ProgramRecord) -> Dict:
+        template = None
+        if self.program_template:
+            stat = self.program_template.stat()
+            template = [stat.st_size, stat.st_mtime_ns]
+        return {"program": program.identity(), "template": template}
+    
+    def build_index(self, _) -> bool:
+        """
+        lessons_index.json, индексы фильтров, поиска и похожих уроков, каталог
+        для приложения, сводки программ и (с --sqlite) база каталога
+        
+        Выполняется в главном потоке (finish), чтобы вывод не смешивался с выводом задач.
+        """
+        entries = self.importer.generate_index(compact=self.compact_index)
+        self.importer.generate_query_index(entries)
+        self.importer.generate_search_index(entries)
+        if self.similar:
+            self.importer.generate_similarity_index(entries, self.similar)
+        self.importer.generate_catalog([entry['summary'] for entry in entries], self.categories_dir,
+                                       self.catalog_dir, self.page_size)
+        self.importer.generate_program_summaries(entries, self.catalog.programs_dir)
+        if self.sqlite:
+            self.importer.generate_sqlite(entries, self.categories_dir, self.catalog.programs_dir)
+        return True
+    
+    def plan(self, folders: Optional[Set[str]] = None,
+             programs: Optional[Set[str]] = None) -> TaskGraph:
+        """
+        Построение графа задач
+        
+        Урок: import -> metadata -> description -> thumbnail -> validate
+        (первые три этапа - только для уроков из конфигурации).
+        Программа: превью (после превью её уроков) -> проверка (после
+        проверки её уроков). Индексы строятся после превью всех уроков.
+        
+        Args:
+            folders: Только эти папки уроков (None - все)
+            programs: Только эти файлы программ и программы, ссылающиеся
+                      на уроки из folders (None - все)
+        """
+        lesson_tails: Dict[str, str] = {}
+        folders_by_id: Dict[str, str] = {}
+        for lesson_data in self.lessons_config:
+            folder = self.importer.lesson_folder_name(lesson_data['id'], lesson_data['title'])
+            if folders is None or folder in folders:
+                lesson_tails[folder] = self.add_import_tasks(lesson_data)
+            folders_by_id[lesson_data['id']] = folder
+        for lesson in self.catalog.lessons():
+            if folders is None or lesson.folder in folders:
+                lesson_tails.setdefault(lesson.folder, None)
+            folders_by_id.setdefault(lesson.id, lesson.folder)
+        # ID изменённых уроков, включая удалённые, - их программы проверяются заново
+        changed_ids = {folder.split('_')[0] for folder in folders or ()}
+        
+        if self.with_thumbnails is None:
+            self.with_thumbnails = self.generator.check_ffmpeg()
+        with_thumbnails = self.with_thumbnails
+        thumbnail_keys: Dict[str, str] = {}
+        validate_keys: Dict[str, str] = {}
+        for folder, tail in sorted(lesson_tails.items()):
+            deps = [tail] if tail else []
+            if with_thumbnails:
+                thumbnail_keys[folder] = self.graph.add(Task(
+                    key=f"thumbnail:{folder}", stage='thumbnail', deps=deps,
+                    run=lambda log, folder=folder: self.render_thumbnail(folder, log),
+                    finish=self.finish_thumbnail,
+                    inputs=lambda folder=folder: self.thumbnail_inputs(folder),
+                    outputs=lambda folder=folder: self.thumbnails_exist(folder)
+                )).key
+                deps = [thumbnail_keys[folder]]
+            validate_keys[folder] = self.graph.add(Task(
+                key=f"validate:{folder}", stage='validate', deps=deps, always=True,
+                run=lambda log, folder=folder: self.check_lesson(folder, log),
+                finish=self.finish_check
+            )).key
+        
+        for program in self.catalog.programs():
+            try:
+                references = self.validator.program_references(program.data())
+                lesson_ids = set(references['lessons']) | set(references['schedule_lessons'])
+            except (OSError, ValueError, TypeError, KeyError):
+                lesson_ids = set()  # ошибку покажет проверка программы
+            if programs is not None and program.path.name not in programs and not lesson_ids & changed_ids:
+                continue
+            program_folders = [folders_by_id[lesson_id] for lesson_id in sorted(lesson_ids)
+                               if lesson_id in folders_by_id]
+            
+            deps = [validate_keys[folder] for folder in program_folders if folder in validate_keys]
+            if with_thumbnails:
+                deps.append(self.graph.add(Task(
+                    key=f"program_thumbnail:{program.id}", stage='program_thumbnail',
+                    deps=[thumbnail_keys[folder] for folder in program_folders if folder in thumbnail_keys],
+                    always=True,
+                    run=lambda log, program=program: self.render_program_thumbnail(program, log),
+                    finish=self.finish_program_thumbnail,
+                    inputs=lambda program=program: self.program_thumbnail_inputs(program),
+                    outputs=lambda program=program: (program.path.parent / program.id / "thumbnail.jpg").exists()
+                )).key)
+            self.graph.add(Task(
+                key=f"program_validate:{program.id}", stage='program_validate', deps=deps, always=True,
+                run=lambda log, program=program: program,
+                finish=self.finish_program_check
+            ))
+        
+        index_deps = list(thumbnail_keys.values()) if with_thumbnails else [
+            tail for tail in lesson_tails.values() if tail
+        ]
+        self.graph.add(Task(key="index", stage='index', deps=index_deps, always=True,
+                            run=lambda log: None, finish=self.build_index))
+        return self.graph
+    
+    def run(self) -> bool:
+        """
+        Полная сборка
+        
+        Returns:
+            True, если все задачи успешны и валидация без ошибок
+        """
+        print("\n" + "=" * 60)
+        print("🚀 СБОРКА КОНТЕНТА")
+        print("=" * 60)
+        
+        self.plan()
+        print(f"\nЗадач: {len(self.graph.tasks)}, потоков: {self.jobs}")
+        
+        self.validator.start_run()
+        aborted = False
+        try:
+            self.graph.run()
+            self.validator.validate_categories()
+        except ValidationAborted as e:
+            aborted = True
+            print(f"\n⛔ Сборка остановлена на первой ошибке: {e}")
+        
+        lesson_keys = [lesson.folder for lesson in self.catalog.lessons()]
+        program_keys = [program.id for program in self.catalog.programs()]
+        self.generator.save_manifest(lesson_keys, program_keys)
+        if not aborted:
+            self.graph.save_state()
+        
+        valid = self.validator.finish_run(aborted)
+        self.graph.print_summary()
+        
+        failed = sum(1 for task in self.graph.tasks.values() if task.status in ('failed', 'blocked'))
+        return valid and not failed and not aborted
+    
+    @staticmethod
+    def file_identity(path: Path) -> Optional[Tuple[int, int]]:
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+        return stat.st_size, stat.st_mtime_ns
+    
+    def affected(self, paths: Iterable[Path]) -> Tuple[Set[str], Set[str], bool]:
+        """
+        Что затронуто изменёнными путями
+        
+        Returns:
+            Папки уроков, файлы программ и признак изменения категорий
+        """
+        folders: Set[str] = set()
+        programs: Set[str] = set()
+        categories = False
+        for path in paths:
+            if path in self.settled and self.settled[path] == self.file_identity(path):
+                continue  # файл записан самой сборкой и с тех пор не менялся
+            if path.parent == self.catalog.programs_dir:
+                programs.update([path.name] if path.suffix == '.json' else [])
+            elif path.parent == self.categories_dir:
+                categories = categories or path.suffix == '.json'
+            elif self.lessons_dir in path.parents:
+                parts = path.relative_to(self.lessons_dir).parts
+                if parts[0].startswith('.') or (len(parts) > 1 and parts[1].startswith('.')):
+                    continue  # временные файлы и служебные папки
+                if len(parts) > 1 or path.is_dir() or self.catalog.lesson(parts[0]) is not None:
+                    folders.add(parts[0])
+        return folders, programs, categories
+    
+    def settle(self, folders: Iterable[str]):
+        """Запоминание файлов уроков после сборки (их события будут пропущены)"""
+        for folder in folders:
+            try:
+                with os.scandir(self.lessons_dir / folder) as it:
+                    for entry in it:
+                        path = Path(entry.path)
+                        self.settled[path] = self.file_identity(path)
+            except FileNotFoundError:
+                pass
+    
+    def rebuild(self, folders: Set[str], programs: Set[str], categories: bool):
+        """
+        Частичная сборка: только задачи затронутых уроков и программ
+        
+        Неизменённые уроки берутся из кеша валидации и из кеша индекса,
+        отпечатки остальных задач сохраняются.
+        """
+        started = time.perf_counter()
+        for folder in folders:
+            self.catalog.invalidate(self.lessons_dir / folder)
+        if programs:
+            self.catalog.invalidate_records(self.catalog.programs_dir)
+        if categories:
+            self.catalog.invalidate_records(self.categories_dir)
+        
+        self.new_run()
+        present = {folder for folder in folders if self.catalog.lesson(folder) is not None}
+        self.validator.seed_from_cache(present | programs)
+        self.plan(folders, programs)
+        self.graph.run()
+        if categories:
+            self.validator.validate_categories()
+        
+        self.generator.save_manifest()
+        self.graph.save_state(prune=False)
+        self.validator.finish_run(report=False)
+        self.settle(present)
+        
+        statuses = [task.status for task in self.graph.tasks.values()]
+        print(f"\n⚡ Обновлено за {(time.perf_counter() - started) * 1000:.0f} мс: "
+              f"уроков {len(folders)}, программ {len(programs)}, категории {'да' if categories else 'нет'}; "
+              f"задач выполнено {statuses.count('done')}, пропущено {statuses.count('skipped')}, "
+              f"ошибок {statuses.count('failed') + statuses.count('blocked')}, "
+              f"замечаний валидации {self.validator.error_count + self.validator.warning_count}")
+    
+    def watch(self, debounce: float = 0.2, poll_interval: float = 0.5, polling: bool = False):
+        """
+        Наблюдение за content/lessons, программами и категориями
+        
+        События собираются до паузы в debounce секунд, после чего
+        пересобираются только затронутые уроки и программы. При переполнении
+        очереди событий выполняется полная сборка.
+        """
+        self.force = False
+        roots = [self.lessons_dir, self.catalog.programs_dir, self.categories_dir]
+        watcher = create_watcher(roots, depth=1, poll_interval=poll_interval, polling=polling)
+        print(f"\n👀 Наблюдение за изменениями ({type(watcher).__name__}): "
+              f"{', '.join(str(root) for root in roots)}")
+        print("   Остановка: Ctrl+C")
+        try:
+            while True:
+                paths, overflow = watcher.wait(debounce)
+                if overflow:
+                    print("\n⚠️  Очередь событий переполнена, полная сборка")
+                    self.catalog.refresh()
+                    self.new_run()
+                    self.run()
+                    continue
+                folders, programs, categories = self.affected(paths)
+                if folders or programs or categories:
+                    self.rebuild(folders, programs, categories)
+        except KeyboardInterrupt:
+            print("\n👋 Наблюдение остановлено")
+        finally:
+            watcher.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Сборка контента йога-приложения')
+    parser.add_argument('--content', default='./content', help='Папка с контентом')
+    parser.add_argument('--schemas', default='./schemas', help='Папка со схемами')
+    parser.add_argument('--programs', default='./programs', help='Папка с программами')
+    parser.add_argument('--categories', default='./categories', help='Папка с описаниями категорий')
+    parser.add_argument('--templates', default='./templates', help='Папка с шаблонами описаний')
+    parser.add_argument('--source', help='Папка с исходными видео (для импорта)')
+    parser.add_argument('--config', help='JSON файл с конфигурацией уроков (для импорта)')
+    parser.add_argument('--link-mode', choices=LessonImporter.LINK_MODES, default='copy',
+                        help='Способ импорта видео (см. import_lessons.py)')
+    parser.add_argument('--jobs', type=int, default=os.cpu_count(),
+                        help='Количество параллельных задач (по умолчанию = число ядер)')
+    parser.add_argument('--force', action='store_true',
+                        help='Выполнить все задачи, игнорируя отпечатки прошлой сборки')
+    parser.add_argument('--no-cache', action='store_true', help='Отключить кеш валидации')
+    parser.add_argument('--fail-fast', action='store_true',
+                        help='Остановить сборку на первой ошибке валидации')
+    parser.add_argument('--program-template', help='Изображение поверх коллажа программы')
+    parser.add_argument('--catalog', help='Папка каталога для приложения (по умолчанию <content>/catalog)')
+    parser.add_argument('--compact-index', action='store_true', help='lessons_index.json без отступов')
+    parser.add_argument('--page-size', type=int, default=LessonImporter.CATALOG_PAGE_SIZE,
+                        help=f'Уроков на странице каталога (по умолчанию {LessonImporter.CATALOG_PAGE_SIZE})')
+    parser.add_argument('--similar', type=int, default=SIMILAR_COUNT,
+                        help=f'Похожих уроков в индексе рекомендаций (по умолчанию {SIMILAR_COUNT}, 0 - не строить)')
+    parser.add_argument('--sqlite', action='store_true',
+                        help='Дополнительно собрать базу каталога в SQLite (см. catalog_db.py)')
+    parser.add_argument('--watch', action='store_true',
+                        help='После сборки следить за изменениями и пересобирать затронутое')
+    parser.add_argument('--debounce', type=float, default=0.2,
+                        help='Пауза в событиях перед пересборкой, сек (по умолчанию 0.2)')
+    parser.add_argument('--poll', action='store_true',
+                        help='Опрос файлов вместо inotify')
+    parser.add_argument('--poll-interval', type=float, default=0.5,
+                        help='Интервал опроса, сек (по умолчанию 0.5)')
+    add_arguments(parser)
+    
+    args = parser.parse_args()
+    if args.watch and args.no_cache:
+        parser.error("--watch использует кеш валидации и несовместим с --no-cache")
+    if args.watch and args.fail_fast:
+        parser.error("--watch продолжает работу после ошибок и несовместим с --fail-fast")
+    
+    lessons_config = None
+    if args.config:
+        with open(args.config, 'r', encoding='utf-8') as f:
+            lessons_config = json.load(f)
+    
+    # В режиме --watch метрики и профиль записываются после остановки (Ctrl+C)
+    with instrumented(args, 'pipeline') as metrics:
+        pipeline = ContentPipeline(
+            content_dir=args.content,
+            schemas_dir=args.schemas,
+            programs_dir=args.programs,
+            categories_dir=args.categories,
+            templates_dir=args.templates,
+            source_dir=args.source,
+            lessons_config=lessons_config,
+            link_mode=args.link_mode,
+            jobs=args.jobs,
+            force=args.force,
+            use_cache=not args.no_cache,
+            program_template=args.program_template,
+            catalog_dir=args.catalog,
+            compact_index=args.compact_index,
+            page_size=args.page_size,
+            similar=args.similar,
+            sqlite=args.sqlite,
+            fail_fast=args.fail_fast,
+            metrics=metrics
+        )
+        
+        ok = pipeline.run()
+        if args.watch:
+            pipeline.watch(args.debounce, args.poll_interval, args.poll)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
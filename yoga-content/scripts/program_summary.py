@@ -0,0 +1,338 @@
+#!/usr/bin/env python3
+"""
+Сводки программ: нагрузка по неделям, дни занятий и отдыха, кривая сложности
+Расписание каждой программы сопоставляется с длительностью и уровнем уроков один раз
+при генерации индекса (import_lessons.py, pipeline.py), приложение читает готовый файл
+Использование: python program_summary.py --summaries ./content/lessons/program_summaries.json prog_001
+"""
+
+import json
+import argparse
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # pip install numpy - векторный расчёт сводок (без него - циклом)
+    np = None
+
+from catalog import write_if_changed
+
+
+PROGRAM_SUMMARY_NAME = "program_summaries.json"
+# Кеш сводок: для каждого файла программы - размер и mtime, длительность
+# и уровень уроков из расписания и готовая сводка
+PROGRAM_SUMMARY_CACHE_NAME = ".program_summaries_cache.json"
+PROGRAM_SUMMARY_VERSION = 1
+DAYS_PER_WEEK = 7
+
+
+def lesson_stats(facets: Iterable[Dict]) -> Dict[str, List]:
+    """Длительность и уровень уроков по ID (при повторных ID - первый урок, как в индексе)"""
+    stats = {}
+    for lesson in facets:
+        stats.setdefault(lesson['id'], [lesson.get('duration'), lesson.get('level')])
+    return stats
+
+
+def scheduled_lessons(program: Dict) -> List[str]:
+    """ID уроков в днях занятий (дни отдыха не учитываются)"""
+    return [item['lesson_id'] for item in program.get('schedule', [])
+            if not item.get('is_rest_day') and isinstance(item.get('lesson_id'), str)]
+
+
+def _level_stats(level_sum: float, level_count: int, max_level: Optional[int]) -> Dict:
+    return {
+        "average_level": round(level_sum / level_count, 2) if level_count else None,
+        "max_level": max_level
+    }
+
+
+def flatten_schedules(programs: List[Dict],
+                      lessons: Dict[str, List]) -> Tuple[Dict[str, List], List[int], List[set], List[int]]:
+    """
+    Дни занятий всех программ в виде столбцов
+    
+    Расписания разворачиваются в общий поток записей (программа, день,
+    минуты, уровень) - соединение с длительностью и уровнем уроков.
+    Дни без записи в расписании и дни с is_rest_day считаются отдыхом.
+    
+    Returns:
+        Столбцы записей, а для каждой программы - количество недель,
+        ненайденные уроки и количество уроков в расписании
+    """
+    columns: Dict[str, List] = {'program': [], 'day': [], 'minutes': [], 'level': [], 'rated': []}
+    add_program, add_day, add_minutes, add_level, add_rated = (column.append for column in columns.values())
+    weeks_count = []
+    missing = []
+    lessons_count = []
+    for position, program in enumerate(programs):
+        last_day = 0
+        program_missing = set()
+        program_lessons = set()
+        for item in program.get('schedule', []):
+            if item.get('is_rest_day'):
+                continue
+            lesson_id = item.get('lesson_id')
+            if isinstance(lesson_id, str):
+                program_lessons.add(lesson_id)
+            day = item.get('day')
+            if not isinstance(day, int) or day < 1:
+                continue
+            if day > last_day:
+                last_day = day
+            
+            stats = lessons.get(lesson_id) if isinstance(lesson_id, str) else None
+            if stats is None:
+                program_missing.add(str(lesson_id))
+                stats = (None, None)
+            duration, level = stats
+            rated = isinstance(level, int)
+            add_program(position)
+            add_day(day)
+            add_minutes(duration or 0)
+            add_level(level if rated else 0)
+            add_rated(rated)
+        
+        duration_weeks = program.get('duration_weeks')
+        if not isinstance(duration_weeks, int):
+            duration_weeks = 0
+        weeks_count.append(max(duration_weeks, -(-last_day // DAYS_PER_WEEK)))
+        missing.append(program_missing)
+        lessons_count.append(len(program_lessons))
+    return columns, weeks_count, missing, lessons_count
+
+
+def aggregate_weeks(columns: Dict[str, List], weeks_count: List[int]) -> Dict[str, List]:
+    """
+    Суммы по неделям всех программ одним векторным проходом (numpy)
+    
+    Неделя программы - ячейка в общем массиве (смещение программы + номер
+    недели), суммы по ячейкам считаются через bincount. Без numpy - тот же
+    расчёт циклом (aggregate_weeks_python).
+    
+    Returns:
+        Для каждой ячейки: минуты, дни занятий, сумма и количество уровней, максимальный уровень
+    """
+    if np is None:
+        return aggregate_weeks_python(columns, weeks_count)
+    
+    offsets = np.concatenate(([0], np.cumsum(weeks_count, dtype=np.int64)))
+    cells = int(offsets[-1])
+    program = np.asarray(columns['program'], dtype=np.int64)
+    day = np.asarray(columns['day'], dtype=np.int64)
+    cell = offsets[program] + (day - 1) // DAYS_PER_WEEK
+    
+    minutes = np.bincount(cell, weights=np.asarray(columns['minutes'], dtype=np.float64), minlength=cells)
+    
+    # День с несколькими уроками - один день занятий
+    first = np.unique(program * (int(day.max(initial=0)) + 1) + day, return_index=True)[1]
+    active_days = np.bincount(cell[first], minlength=cells)
+    
+    rated = np.asarray(columns['rated'], dtype=bool)
+    rated_cell = cell[rated]
+    levels = np.asarray(columns['level'], dtype=np.int64)[rated]
+    level_sum = np.bincount(rated_cell, weights=levels, minlength=cells)
+    level_count = np.bincount(rated_cell, minlength=cells)
+    max_level = np.full(cells, np.iinfo(np.int64).min)
+    np.maximum.at(max_level, rated_cell, levels)
+    
+    return {
+        "minutes": [int(value) if value.is_integer() else value for value in minutes.tolist()],
+        "active_days": active_days.tolist(),
+        "level_sum": level_sum.tolist(),
+        "level_count": level_count.tolist(),
+        "max_level": [level if count else None for level, count in zip(max_level.tolist(), level_count.tolist())]
+    }
+
+
+def aggregate_weeks_python(columns: Dict[str, List], weeks_count: List[int]) -> Dict[str, List]:
+    """Суммы по неделям без numpy (результат как у aggregate_weeks)"""
+    offsets = [0]
+    for count in weeks_count:
+        offsets.append(offsets[-1] + count)
+    cells = offsets[-1]
+    totals: Dict[str, List] = {
+        "minutes": [0] * cells,
+        "active_days": [0] * cells,
+        "level_sum": [0] * cells,
+        "level_count": [0] * cells,
+        "max_level": [None] * cells
+    }
+    days = set()
+    for program, day, minutes, level, rated in zip(columns['program'], columns['day'], columns['minutes'],
+                                                   columns['level'], columns['rated']):
+        cell = offsets[program] + (day - 1) // DAYS_PER_WEEK
+        totals['minutes'][cell] += minutes
+        if (program, day) not in days:
+            days.add((program, day))
+            totals['active_days'][cell] += 1
+        if rated:
+            totals['level_sum'][cell] += level
+            totals['level_count'][cell] += 1
+            current = totals['max_level'][cell]
+            totals['max_level'][cell] = level if current is None else max(current, level)
+    return totals
+
+
+def summarize_programs(programs: List[Dict], lessons: Dict[str, List]) -> List[Dict]:
+    """
+    Сводки программ за один проход по расписаниям всех программ
+    
+    Расписания всех программ разворачиваются в общие столбцы
+    (flatten_schedules), суммы по неделям считаются векторно
+    (aggregate_weeks), а сводки программ собираются из недельных сумм.
+    
+    Args:
+        programs: Данные программ (programs/*.json)
+        lessons: Длительность и уровень уроков (см. lesson_stats)
+    
+    Returns:
+        Сводки в порядке programs
+    """
+    columns, weeks_count, missing, lessons_count = flatten_schedules(programs, lessons)
+    totals = aggregate_weeks(columns, weeks_count)
+    minutes, active_days, level_sum, level_count, max_level = (
+        totals['minutes'], totals['active_days'], totals['level_sum'], totals['level_count'], totals['max_level']
+    )
+    average_level = [round(total / count, 2) if count else None for total, count in zip(level_sum, level_count)]
+    
+    summaries = []
+    start = 0
+    for position, program in enumerate(programs):
+        weeks_total = weeks_count[position]
+        end = start + weeks_total
+        weeks = [{
+            "week": cell - start + 1,
+            "minutes": minutes[cell],
+            "active_days": active_days[cell],
+            "rest_days": DAYS_PER_WEEK - active_days[cell],
+            "average_level": average_level[cell],
+            "max_level": max_level[cell]
+        } for cell in range(start, end)]
+        
+        program_active_days = sum(active_days[start:end])
+        program_max_level = [level for level in max_level[start:end] if level is not None]
+        summaries.append({
+            "id": program.get('id'),
+            "title": program.get('title'),
+            "category": program.get('category'),
+            "level": program.get('level'),
+            "duration_weeks": weeks_total,
+            "total_days": weeks_total * DAYS_PER_WEEK,
+            "active_days": program_active_days,
+            "rest_days": weeks_total * DAYS_PER_WEEK - program_active_days,
+            "total_minutes": sum(minutes[start:end]),
+            "lessons_count": lessons_count[position],
+            **_level_stats(sum(level_sum[start:end]), sum(level_count[start:end]),
+                           max(program_max_level) if program_max_level else None),
+            "difficulty_curve": average_level[start:end],
+            "missing_lessons": sorted(missing[position]),
+            "weeks": weeks
+        })
+        start = end
+    return summaries
+
+
+def load_cache(cache_path: Path) -> Dict[str, Dict]:
+    """Кеш сводок (пустой, если файла нет или сменился формат)"""
+    try:
+        with open(cache_path, 'r', encoding='utf-8') as f:
+            cache = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return {}
+    if cache.get('version') != PROGRAM_SUMMARY_VERSION:
+        return {}
+    return cache['programs']
+
+
+def build_program_summaries(output_dir: Path, programs: List[Tuple[str, Optional[List[int]], Dict]],
+                            lessons: Dict[str, List]) -> Tuple[List[Dict], int]:
+    """
+    Сводки программ с инкрементальным обновлением
+    
+    Сводка пересчитывается, только если изменился файл программы или
+    длительность/уровень одного из уроков её расписания; остальные
+    берутся из кеша. Файл сводок перезаписывается, только если изменилось
+    содержимое.
+    
+    Args:
+        output_dir: Папка для program_summaries.json (рядом с индексом уроков)
+        programs: Имя файла, размер и mtime файла и данные каждой программы
+        lessons: Длительность и уровень уроков (см. lesson_stats)
+    
+    Returns:
+        Сводки в порядке programs и количество пересчитанных
+    """
+    cache_path = output_dir / PROGRAM_SUMMARY_CACHE_NAME
+    cache = load_cache(cache_path)
+    new_cache = {}
+    stale = []
+    
+    for name, identity, program in programs:
+        cached = cache.get(name)
+        if (cached is not None and cached['file'] == identity
+                and all(lessons.get(lesson_id) == stats for lesson_id, stats in cached['lessons'].items())):
+            new_cache[name] = cached
+        else:
+            stale.append((name, identity, program))
+    
+    for (name, identity, program), summary in zip(stale, summarize_programs([item[2] for item in stale], lessons)):
+        new_cache[name] = {
+            "file": identity,
+            "lessons": {lesson_id: lessons.get(lesson_id) for lesson_id in scheduled_lessons(program)},
+            "summary": summary
+        }
+    
+    summaries = [new_cache[name]['summary'] for name, _, _ in programs]
+    write_if_changed(output_dir / PROGRAM_SUMMARY_NAME, json.dumps(
+        {"version": PROGRAM_SUMMARY_VERSION, "total_programs": len(summaries), "programs": summaries},
+        ensure_ascii=False, indent=2
+    ))
+    if stale or set(new_cache) != set(cache):
+        write_if_changed(cache_path, json.dumps({"version": PROGRAM_SUMMARY_VERSION, "programs": new_cache},
+                                                ensure_ascii=False))
+    return summaries, len(stale)
+
+
+def load_program_summaries(summaries_path: str) -> Dict[str, Dict]:
+    """Сводки из program_summaries.json по ID программы"""
+    with open(summaries_path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    return {summary['id']: summary for summary in data['programs']}
+
+
+def print_summary(summary: Dict):
+    print(f"\n📅 {summary['id']}: {summary['title']}")
+    print(f"   Недель: {summary['duration_weeks']}, занятий: {summary['active_days']}, "
+          f"дней отдыха: {summary['rest_days']}, всего {summary['total_minutes']} мин")
+    if summary['missing_lessons']:
+        print(f"   ⚠️  Уроки не найдены: {', '.join(summary['missing_lessons'])}")
+    for week in summary['weeks']:
+        level = f"{week['average_level']:.1f}" if week['average_level'] is not None else "-"
+        print(f"   неделя {week['week']:>2}: {week['minutes']:>4} мин, занятий {week['active_days']}, "
+              f"отдых {week['rest_days']}, уровень {level}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Сводки программ')
+    parser.add_argument('--summaries', default=f'./content/lessons/{PROGRAM_SUMMARY_NAME}',
+                        help='Путь к файлу сводок')
+    parser.add_argument('programs', nargs='*', help='ID программ (по умолчанию - все)')
+    
+    args = parser.parse_args()
+    
+    if not Path(args.summaries).exists():
+        print(f"❌ Файл сводок не найден: {args.summaries}")
+        return
+    
+    summaries = load_program_summaries(args.summaries)
+    for program_id in args.programs or list(summaries):
+        if program_id not in summaries:
+            print(f"\n❌ Программа не найдена: {program_id}")
+            continue
+        print_summary(summaries[program_id])
+
+
+if __name__ == '__main__':
+    main()
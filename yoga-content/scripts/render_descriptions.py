@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Генерация описаний уроков (description.md и description.html) по шаблонам из templates/
+Шаблоны компилируются один раз, неизменённые файлы не перезаписываются
+Использование: python render_descriptions.py --lessons ./content/lessons --templates ./templates
+"""
+
+import re
+import html
+import json
+import argparse
+from pathlib import Path
+from typing import Callable, Dict, List
+
+from catalog import write_if_changed
+
+
+TEMPLATE_TAG_RE = re.compile(r'(\{\{.*?\}\}|\{%.*?%\})')
+# Строка, на которой стоит только {% ... %}, удаляется из вывода целиком
+STANDALONE_BLOCK_RE = re.compile(r'^[ \t]*(\{%.*?%\})[ \t]*\n', re.MULTILINE)
+PATH_RE = re.compile(r'^[A-Za-z_]\w*(\.[A-Za-z_]\w*)*$')
+
+
+def _attr(value, name: str):
+    """Поле словаря (None, если значения нет)"""
+    return value.get(name) if isinstance(value, dict) else None
+
+
+def _text(value) -> str:
+    return '' if value is None else str(value)
+
+
+def _html(value) -> str:
+    return '' if value is None else html.escape(str(value))
+
+
+def compile_template(source: str, name: str, escape: bool = False) -> Callable[[Dict], str]:
+    """
+    Компиляция шаблона в функцию Python
+    
+    Поддерживаются {{ поле }} и {{ элемент.поле }}, {% for x in список %}...{% endfor %}
+    и {% if поле %}...{% endif %}. В HTML-шаблонах значения экранируются.
+    
+    Args:
+        source: Текст шаблона
+        name: Имя шаблона (для сообщений об ошибках)
+        escape: Экранировать значения для HTML
+    """
+    source = STANDALONE_BLOCK_RE.sub(r'\1', source)
+    
+    code = ["def render(ctx):", "    out = []", "    append = out.append"]
+    depth = 1
+    blocks: List[str] = []
+    loop_vars: List[str] = []
+    
+    def expression(path: str) -> str:
+        if not PATH_RE.match(path):
+            raise ValueError(f"Шаблон {name}: некорректное выражение '{path}'")
+        first, *rest = path.split('.')
+        expr = f"v_{first}" if first in loop_vars else f"ctx.get({first!r})"
+        for part in rest:
+            expr = f"_attr({expr}, {part!r})"
+        return expr
+    
+    for token in TEMPLATE_TAG_RE.split(source):
+        pad = "    " * depth
+        if token.startswith('{{'):
+            code.append(f"{pad}append(_fmt({expression(token[2:-2].strip())}))")
+        elif token.startswith('{%'):
+            words = token[2:-2].split()
+            if len(words) == 4 and words[0] == 'for' and words[2] == 'in':
+                code.append(f"{pad}for v_{words[1]} in ({expression(words[3])} or ()):")
+                loop_vars.append(words[1])
+            elif len(words) == 2 and words[0] == 'if':
+                code.append(f"{pad}if {expression(words[1])}:")
+            elif words in (['endfor'], ['endif']):
+                if not blocks or blocks[-1] != words[0][3:]:
+                    raise ValueError(f"Шаблон {name}: лишний {{% {words[0]} %}}")
+                blocks.pop()
+                if words[0] == 'endfor':
+                    loop_vars.pop()
+                depth -= 1
+                continue
+            else:
+                raise ValueError(f"Шаблон {name}: неизвестный тег {token}")
+            code.append(f"{pad}    pass")
+            blocks.append(words[0])
+            depth += 1
+        elif token:
+            code.append(f"{pad}append({token!r})")
+    
+    if blocks:
+        raise ValueError(f"Шаблон {name}: не закрыт {{% {blocks[-1]} %}}")
+    code.append("    return ''.join(out)")
+    
+    namespace = {'_attr': _attr, '_fmt': _html if escape else _text}
+    exec(compile('\n'.join(code), name, 'exec'), namespace)
+    return namespace['render']
+
+
+class DescriptionRenderer:
+    """Рендеринг описаний уроков по шаблонам с пропуском неизменённых файлов"""
+    
+    # Файл урока -> шаблон в templates/
+    OUTPUTS = {
+        'description.md': 'description.md',
+        'description.html': 'description.html',
+    }
+    
+    def __init__(self, templates_dir: str):
+        self.templates_dir = Path(templates_dir)
+        self.templates: Dict[str, Callable[[Dict], str]] = {}
+        for output_name, template_name in self.OUTPUTS.items():
+            template_path = self.templates_dir / template_name
+            with open(template_path, 'r', encoding='utf-8') as f:
+                self.templates[output_name] = compile_template(
+                    f.read(), str(template_path), escape=template_name.endswith('.html')
+                )
+    
+    def render(self, lesson_data: Dict) -> Dict[str, str]:
+        """Тексты всех файлов описания урока"""
+        return {output_name: template(lesson_data) for output_name, template in self.templates.items()}
+    
+    def write_lesson(self, lesson_data: Dict, lesson_path: Path) -> List[Path]:
+        """
+        Запись описаний одного урока
+        
+        Returns:
+            Файлы, которые были перезаписаны
+        """
+        written = []
+        for output_name, content in self.render(lesson_data).items():
+            output_path = lesson_path / output_name
+            if write_if_changed(output_path, content):
+                written.append(output_path)
+        return written
+    
+    def render_all(self, lessons_dir: str):
+        """Пакетный режим: описания всех уроков каталога за один проход"""
+        lessons_dir = Path(lessons_dir)
+        print(f"\n📝 Генерация описаний уроков в {lessons_dir}\n")
+        
+        lessons_count = 0
+        written_count = 0
+        for lesson_path in sorted(lessons_dir.iterdir()):
+            metadata_path = lesson_path / "metadata.json"
+            if not lesson_path.is_dir() or not metadata_path.exists():
+                continue
+            with open(metadata_path, 'r', encoding='utf-8') as f:
+                lesson_data = json.load(f)
+            written = self.write_lesson(lesson_data, lesson_path)
+            for output_path in written:
+                print(f"  ✓ Обновлено: {output_path}")
+            written_count += len(written)
+            lessons_count += 1
+        
+        print("\n" + "=" * 60)
+        print(f"\n📚 Уроков: {lessons_count}")
+        print(f"✅ Записано файлов: {written_count}")
+        print(f"⏭  Без изменений: {lessons_count * len(self.OUTPUTS) - written_count}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Генерация описаний уроков по шаблонам')
+    parser.add_argument('--lessons', default='./content/lessons', help='Папка с уроками')
+    parser.add_argument('--templates', default='./templates', help='Папка с шаблонами')
+    
+    args = parser.parse_args()
+    
+    renderer = DescriptionRenderer(args.templates)
+    renderer.render_all(args.lessons)
+
+
+if __name__ == '__main__':
+    main()
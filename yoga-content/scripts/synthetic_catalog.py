@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""
+Генератор синтетического каталога для бенчмарков
+Создаёт конфигурацию уроков по lesson.schema.json, программы с расписанием
+и маленькие тестовые видео (ffmpeg), готовые к импорту через import_lessons.py
+Использование: python synthetic_catalog.py --lessons 1000 --output /tmp/bench_catalog
+"""
+
+import json
+import random
+import shutil
+import argparse
+import subprocess
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional
+
+
+CATEGORIES = ['back_health', 'flexibility', 'hip_joints', 'meditation', 'relaxation']
+EQUIPMENT = ['Коврик для йоги', 'Блоки для йоги', 'Ремень', 'Болстер', 'Плед', 'Подушка', 'Стена', 'Стул']
+FOCUS_AREAS = ['Позвоночник', 'Поясница', 'Грудной отдел', 'Шейный отдел', 'Плечи',
+               'Тазобедренные суставы', 'Ноги', 'Руки', 'Корпус', 'Всё тело']
+TAGS = ['спина', 'утро', 'вечер', 'растяжка', 'баланс', 'дыхание', 'начинающий', 'сила',
+        'расслабление', 'шпагат', 'таз', 'шея', 'плечи', 'медитация', 'осанка', 'энергия']
+POSES = [('Поза ребенка', 'Balasana'), ('Кошка-корова', 'Marjaryasana'), ('Собака мордой вниз', 'Adho Mukha Svanasana'),
+         ('Поза голубя', 'Kapotasana'), ('Поза бабочки', 'Baddha Konasana'), ('Поза воина', 'Virabhadrasana'),
+         ('Наклон вперёд', 'Paschimottanasana'), ('Поза трупа', 'Shavasana')]
+BENEFITS = ['Снимает напряжение', 'Улучшает гибкость', 'Укрепляет мышцы спины', 'Успокаивает нервную систему',
+            'Улучшает осанку', 'Раскрывает тазобедренные суставы']
+INTENSITIES = ['Низкая', 'Средняя', 'Высокая']
+STYLES = ['Хатха', 'Виньяса', 'Инь-йога', 'Восстановительная', 'Терапевтическая']
+DURATIONS = [10, 15, 20, 25, 30, 45, 60]
+
+# Источники lavfi для тестовых видео: уроки по очереди получают разные ролики
+VIDEO_SOURCES = ['testsrc', 'testsrc2', 'smptebars', 'rgbtestsrc']
+# generate_thumbnails.py берёт кадр не дальше 30-й секунды, поэтому ролик чуть длиннее
+VIDEO_SECONDS = 32
+
+DEFAULT_CATEGORIES_DIR = Path(__file__).parent.parent / 'categories'
+
+
+@dataclass
+class SyntheticCatalog:
+    """Пути сгенерированного каталога"""
+    root: Path
+    lessons_count: int
+    programs_count: int
+    videos: List[Path] = field(default_factory=list)
+    
+    @property
+    def source_dir(self) -> Path:
+        """Исходные видео (--source для import_lessons.py)"""
+        return self.root / "source"
+    
+    @property
+    def config_path(self) -> Path:
+        """Конфигурация уроков (--config для import_lessons.py)"""
+        return self.root / "lessons_config.json"
+    
+    @property
+    def content_dir(self) -> Path:
+        return self.root / "content"
+    
+    @property
+    def lessons_dir(self) -> Path:
+        return self.content_dir / "lessons"
+    
+    @property
+    def programs_dir(self) -> Path:
+        return self.content_dir / "programs"
+    
+    @property
+    def categories_dir(self) -> Path:
+        return self.content_dir / "categories"
+    
+    def load_config(self) -> List[Dict]:
+        with open(self.config_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+
+def create_test_video(video_path: Path, seconds: int, size: str = '1280x720',
+                      rate: int = 25, source: str = 'testsrc'):
+    """Генерация тестового видео (источник lavfi) заданной длительности"""
+    subprocess.run(
+        [
+            'ffmpeg',
+            '-f', 'lavfi',
+            '-i', f'{source}=duration={seconds}:size={size}:rate={rate}',
+            '-c:v', 'libx264',
+            '-preset', 'ultrafast',
+            '-pix_fmt', 'yuv420p',
+            '-y',
+            str(video_path)
+        ],
+        capture_output=True,
+        check=True
+    )
+
+
+def lesson_id(index: int) -> str:
+    """
+    ID урока по порядковому номеру
+    
+    Схема допускает только трёхзначные ID, поэтому в каталогах больше
+    1000 уроков ID повторяются (папки различаются названием урока).
+    """
+    return f"{index % 1000:03d}"
+
+
+def synthetic_lesson(index: int, rng: random.Random, source_video: Optional[str] = None) -> Dict:
+    """Конфигурация синтетического урока, соответствующая lesson.schema.json"""
+    category = rng.choice(CATEGORIES)
+    poses = rng.sample(POSES, rng.randint(2, 5))
+    lesson = {
+        "id": lesson_id(index),
+        "title": f"Синтетический урок {index}",
+        "category": category,
+        "level": rng.randint(1, 3),
+        "duration": rng.choice(DURATIONS),
+        "description": f"Синтетический урок {index} для бенчмарка: {', '.join(name.lower() for name, _ in poses)}.",
+        "instructor": "Инструктор",
+        # Пути уточняет import_lessons.py после переноса видео
+        "video_url": "lessons/video.mp4",
+        "thumbnail_url": "lessons/thumbnail.jpg",
+        "tags": rng.sample(TAGS, rng.randint(2, 6)),
+        "poses": [{"name": name, "sanskrit_name": sanskrit, "duration": rng.choice([30, 60, 90])}
+                  for name, sanskrit in poses],
+        "benefits": rng.sample(BENEFITS, rng.randint(1, 3)),
+        "equipment": rng.sample(EQUIPMENT, rng.randint(1, 3)),
+        "focus_areas": rng.sample(FOCUS_AREAS, rng.randint(1, 3)),
+        "intensity": rng.choice(INTENSITIES),
+        "style": rng.choice(STYLES),
+        "music": rng.random() < 0.5
+    }
+    if source_video:
+        lesson["source_video"] = source_video
+    return lesson
+
+
+def synthetic_program(index: int, lessons: List[Dict], rng: random.Random) -> Dict:
+    """
+    Синтетическая программа по program.schema.json
+    
+    Расписание покрывает каждый день программы (duration_weeks * 7 записей):
+    3-4 занятия в неделю, остальные дни - отдых. Уроков в программе не больше,
+    чем занятий, поэтому каждый из них попадает в расписание.
+    """
+    weeks = rng.randint(1, 6)
+    program_lessons = rng.sample(lessons, min(len(lessons), rng.randint(3, min(8, 3 * weeks))))
+    lesson_ids = list(dict.fromkeys(lesson['id'] for lesson in program_lessons))
+    
+    schedule = []
+    position = 0
+    for week in range(weeks):
+        active_days = set(rng.sample(range(7), rng.randint(3, 4)))
+        for weekday in range(7):
+            day = week * 7 + weekday + 1
+            entry = {"day": day, "lesson_id": lesson_ids[position % len(lesson_ids)]}
+            if weekday in active_days:
+                position += 1
+            else:
+                entry["is_rest_day"] = True
+            schedule.append(entry)
+    
+    return {
+        "id": f"prog_{index:03d}",
+        "title": f"Синтетическая программа {index}",
+        "description": f"Синтетическая программа {index} на {weeks} нед. для бенчмарка генерации и валидации контента.",
+        "duration_weeks": weeks,
+        "lessons": lesson_ids,
+        "schedule": schedule,
+        "goal": "Проверка производительности скриптов контента",
+        "level": rng.randint(1, 3),
+        "category": rng.choice(CATEGORIES + ['mixed']),
+        "total_duration_minutes": sum(lesson['duration'] for lesson in program_lessons)
+    }
+
+
+def generate_catalog(root: Path, lessons_count: int, programs_count: Optional[int] = None,
+                     videos: int = len(VIDEO_SOURCES), seed: int = 42,
+                     categories_dir: Path = DEFAULT_CATEGORIES_DIR) -> SyntheticCatalog:
+    """
+    Генерация синтетического каталога в папке root
+    
+    Args:
+        root: Папка каталога (source/, lessons_config.json, content/)
+        lessons_count: Количество уроков
+        programs_count: Количество программ (по умолчанию - одна на 20 уроков, не больше 999)
+        videos: Количество тестовых видео (0 - без видео, ffmpeg не нужен)
+        seed: Зерно генератора: одинаковые параметры дают одинаковый каталог
+        categories_dir: Откуда скопировать описания категорий
+    """
+    if programs_count is None:
+        programs_count = min(999, max(3, lessons_count // 20))
+    catalog = SyntheticCatalog(root=Path(root), lessons_count=lessons_count, programs_count=programs_count)
+    rng = random.Random(seed)
+    
+    catalog.source_dir.mkdir(parents=True, exist_ok=True)
+    for i in range(videos):
+        video_path = catalog.source_dir / f"synthetic_{i:02d}.mp4"
+        create_test_video(video_path, VIDEO_SECONDS, size='320x180', rate=2,
+                          source=VIDEO_SOURCES[i % len(VIDEO_SOURCES)])
+        catalog.videos.append(video_path)
+    
+    lessons = [
+        synthetic_lesson(i, rng, catalog.videos[i % videos].name if videos else None)
+        for i in range(1, lessons_count + 1)
+    ]
+    with open(catalog.config_path, 'w', encoding='utf-8') as f:
+        json.dump(lessons, f, ensure_ascii=False)
+    
+    catalog.programs_dir.mkdir(parents=True, exist_ok=True)
+    for i in range(1, programs_count + 1):
+        program = synthetic_program(i, lessons, rng)
+        with open(catalog.programs_dir / f"synthetic_{i:03d}.json", 'w', encoding='utf-8') as f:
+            json.dump(program, f, ensure_ascii=False, indent=2)
+    
+    if catalog.categories_dir.exists():
+        shutil.rmtree(catalog.categories_dir)
+    shutil.copytree(categories_dir, catalog.categories_dir)
+    
+    return catalog
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Генерация синтетического каталога уроков')
+    parser.add_argument('--lessons', type=int, default=1000, help='Количество уроков')
+    parser.add_argument('--programs', type=int, help='Количество программ (по умолчанию - одна на 20 уроков)')
+    parser.add_argument('--videos', type=int, default=len(VIDEO_SOURCES),
+                        help='Количество тестовых видео (0 - без видео)')
+    parser.add_argument('--seed', type=int, default=42, help='Зерно генератора случайных чисел')
+    parser.add_argument('--output', required=True, help='Папка для каталога')
+    args = parser.parse_args()
+    
+    if args.videos and shutil.which('ffmpeg') is None:
+        parser.error("ffmpeg не найден: установите его или укажите --videos 0")
+    
+    catalog = generate_catalog(Path(args.output), args.lessons, args.programs, args.videos, args.seed)
+    print(f"✅ Каталог создан: {catalog.root}")
+    print(f"📚 Уроков: {catalog.lessons_count}, программ: {catalog.programs_count}, видео: {len(catalog.videos)}")
+    print(f"\nИмпорт: python import_lessons.py --source {catalog.source_dir} "
+          f"--config {catalog.config_path} --output {catalog.lessons_dir} --categories {catalog.categories_dir}")
+
+
+if __name__ == '__main__':
+    main()
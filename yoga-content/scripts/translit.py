@@ -0,0 +1,20 @@
+#!/usr/bin/env python3
+"""
+Транслитерация русского текста латиницей
+Используется для имён папок уроков и для поиска по запросам латиницей
+"""
+
+
+TRANSLIT_MAP = {
+    'а': 'a', 'б': 'b', 'в': 'v', 'г': 'g', 'д': 'd', 'е': 'e', 'ё': 'yo',
+    'ж': 'zh', 'з': 'z', 'и': 'i', 'й': 'y', 'к': 'k', 'л': 'l', 'м': 'm',
+    'н': 'n', 'о': 'o', 'п': 'p', 'р': 'r', 'с': 's', 'т': 't', 'у': 'u',
+    'ф': 'f', 'х': 'h', 'ц': 'ts', 'ч': 'ch', 'ш': 'sh', 'щ': 'sch',
+    'ъ': '', 'ы': 'y', 'ь': '', 'э': 'e', 'ю': 'yu', 'я': 'ya',
+    ' ': '_', '-': '_'
+}
+
+
+def transliterate(text: str) -> str:
+    """Транслитерация текста в нижнем регистре (символы вне таблицы не меняются)"""
+    return ''.join(TRANSLIT_MAP.get(char, char) for char in text.lower())
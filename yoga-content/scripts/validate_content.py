@@ -2,24 +2,227 @@
 """
 Скрипт для валидации контента йога-приложения
 Проверяет корректность метаданных, наличие файлов, ссылки между уроками и программами
+Использование: python validate_content.py --content ./content --schemas ./schemas [--format jsonl|sarif|human]
 """
 
 import os
+import sys
 import json
+import hashlib
+import struct
+import subprocess
+from collections import deque
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import closing, redirect_stdout
+from dataclasses import asdict, dataclass, field
 from pathlib import Path
-from typing import Dict, List, Set
+from typing import Deque, Dict, Iterator, List, Optional, Set, TextIO, Tuple
 import jsonschema
 
+from catalog import Catalog, LessonRecord, ProgramRecord
+from instrumentation import Metrics, add_arguments, instrumented
+
+
+@dataclass
+class Finding:
+    """Замечание валидации в машиночитаемом виде"""
+    code: str                 # Код проверки (L001, P002, ...)
+    severity: str             # error | warning
+    entity: str               # lesson | program | category | catalog
+    entity_id: Optional[str]  # ID урока/программы/категории
+    path: Optional[str]       # Файл, к которому относится замечание
+    message: str
+    
+    def to_dict(self) -> Dict:
+        return asdict(self)
+
+
+class ValidationAborted(Exception):
+    """Остановка валидации на первой ошибке (--fail-fast)"""
+
+
+class HumanSink:
+    """Вывод замечаний в консоль в привычном виде"""
+    
+    ICONS = {'error': "❌", 'warning': "⚠️ "}
+    
+    def __init__(self, stream: Optional[TextIO] = None):
+        self.stream = stream
+    
+    def emit(self, finding: Finding):
+        print(f"{self.ICONS[finding.severity]} {finding.message}", file=self.stream)
+    
+    def close(self):
+        pass
+
+
+class JsonLinesSink:
+    """Потоковая запись замечаний в JSON Lines (одна строка на замечание)"""
+    
+    def __init__(self, stream: TextIO):
+        self.stream = stream
+    
+    def emit(self, finding: Finding):
+        self.stream.write(json.dumps(finding.to_dict(), ensure_ascii=False) + "\n")
+        self.stream.flush()
+    
+    def close(self):
+        self.stream.flush()
+
+
+class SarifSink:
+    """
+    Потоковая запись замечаний в SARIF 2.1.0
+    
+    Заголовок документа пишется сразу, результаты - по мере появления,
+    закрывающие скобки - в close(), поэтому память не растёт с числом замечаний.
+    """
+    
+    def __init__(self, stream: TextIO):
+        self.stream = stream
+        self.count = 0
+        self.stream.write(
+            '{"$schema": "https://json.schemastore.org/sarif-2.1.0.json", "version": "2.1.0", '
+            '"runs": [{"tool": {"driver": {"name": "validate_content"}}, "results": ['
+        )
+    
+    def emit(self, finding: Finding):
+        result = {
+            "ruleId": finding.code,
+            "level": finding.severity,
+            "message": {"text": finding.message},
+            "properties": {"entity": finding.entity, "id": finding.entity_id}
+        }
+        if finding.path:
+            result["locations"] = [{
+                "physicalLocation": {"artifactLocation": {"uri": Path(finding.path).as_posix()}}
+            }]
+        if self.count:
+            self.stream.write(", ")
+        self.stream.write(json.dumps(result, ensure_ascii=False))
+        self.count += 1
+    
+    def close(self):
+        self.stream.write("]}]}\n")
+        self.stream.flush()
+
+
+SINKS = {'human': HumanSink, 'jsonl': JsonLinesSink, 'sarif': SarifSink}
+
+
+@dataclass
+class LessonCheck:
+    """
+    Результат проверки одного урока
+    
+    События хранятся в порядке проверки и применяются к валидатору
+    в главном потоке, поэтому вывод не зависит от числа потоков.
+    Замечания: (severity, message, code, path), сообщения: ('info', message).
+    """
+    lesson_id: str
+    entity: str = 'lesson'
+    events: List[Tuple] = field(default_factory=list)
+    is_valid: bool = True
+    found: bool = False  # metadata.json есть - урок учитывается в lesson_ids
+    folder: str = ''                  # Имя папки урока (ключ в кеше)
+    cache_key: Optional[Dict] = None  # Отпечаток входных файлов для кеша
+    from_cache: bool = False          # Результат взят из кеша
+    probe: Optional[Dict] = None      # Параметры видео (ffprobe)
+    
+    def info(self, message: str):
+        self.events.append(('info', message))
+    
+    def error(self, message: str, code: str, path: Optional[Path] = None):
+        self.events.append(('error', message, code, str(path) if path else None))
+        self.is_valid = False
+    
+    def warning(self, message: str, code: str, path: Optional[Path] = None):
+        self.events.append(('warning', message, code, str(path) if path else None))
+    
+    def replay(self, events: List[Tuple]):
+        """Добавление сохранённых событий (из кеша)"""
+        for event in events:
+            self.events.append(tuple(event))
+            if event[0] == 'error':
+                self.is_valid = False
+
+
+# Валидатор процесса-воркера для проверки схем в пуле процессов
+_worker_validator = None
+
+
+def _init_schema_worker(schemas_dir: str):
+    """Инициализация процесса-воркера: схемы компилируются один раз на процесс"""
+    global _worker_validator
+    _worker_validator = ContentValidator(content_dir='.', schemas_dir=schemas_dir)
+
+
+def _schema_error_in_worker(data: Dict, schema_name: str) -> Optional[str]:
+    """Проверка документа по схеме в процессе-воркере"""
+    return _worker_validator.schema_error(data, schema_name)
+
 
 class ContentValidator:
     """Валидатор контента приложения"""
     
-    def __init__(self, content_dir: str, schemas_dir: str):
+    # Кеш результатов проверки хранится в папке контента
+    CACHE_NAME = ".validation_cache.json"
+    CACHE_VERSION = 2
+    
+    # Все замечания прогона пишутся сюда по мере появления (JSON Lines)
+    FINDINGS_NAME = "validation_findings.jsonl"
+    CACHE_SECTIONS = ("lessons", "programs", "media")
+    # Уроков в работе на один поток при параллельной проверке
+    LESSONS_WINDOW_FACTOR = 4
+    
+    # Профиль видео для стриминга
+    MEDIA_PROFILE = {
+        "codecs": ["h264"],
+        "min_width": 1280,
+        "min_height": 720,
+        "min_bitrate": 1_500_000,   # бит/с
+        "max_bitrate": 8_000_000,
+        "duration_tolerance": 0.1   # допустимое расхождение с duration из metadata.json
+    }
+    
+    def __init__(self, content_dir: str, schemas_dir: str,
+                 jobs: int = 1, schema_processes: int = 0,
+                 use_cache: bool = False, media: bool = False,
+                 media_jobs: Optional[int] = None,
+                 sink=None, fail_fast: bool = False,
+                 catalog: Optional[Catalog] = None,
+                 metrics: Optional[Metrics] = None):
         self.content_dir = Path(content_dir)
+        # Общий каталог: папки сканируются один раз, metadata.json читается лениво
+        self.catalog = catalog or Catalog.for_content(self.content_dir)
+        # Замеры этапов (--metrics-out), по умолчанию выключены
+        self.metrics = metrics or Metrics(enabled=False)
         self.schemas_dir = Path(schemas_dir)
-        self.errors = []
-        self.warnings = []
+        # Потоки для проверки файлов уроков и процессы для проверки схем
+        self.jobs = max(1, jobs)
+        self.schema_processes = max(0, schema_processes)
+        # Замечания не накапливаются в памяти: они уходят в sink и в файл
+        # findings, итоговый отчёт строится повторным чтением этого файла
+        self.sink = sink or HumanSink()
+        self.fail_fast = fail_fast
+        self.findings_path = self.content_dir / self.FINDINGS_NAME
+        self._findings_file = None
+        self.error_count = 0
+        self.warning_count = 0
         self.lesson_ids = set()
+        # Скомпилированные валидаторы и хеши схем по имени схемы
+        self._validators = {}
+        self._schema_hashes = {}
+        # Кеш результатов: прошлый прогон и записи текущего прогона
+        self.use_cache = use_cache
+        self.cache_path = self.content_dir / self.CACHE_NAME
+        self.cache = self.load_cache() if use_cache else {section: {} for section in self.CACHE_SECTIONS}
+        self.new_cache = {section: {} for section in self.CACHE_SECTIONS}
+        self.cache_hits = 0
+        self.cache_misses = 0
+        # Глубокая проверка видео через ffprobe (опционально)
+        self.media = media
+        self.media_jobs = max(1, media_jobs or os.cpu_count() or 1)
         
     def load_schema(self, schema_name: str) -> Dict:
         """Загрузка JSON схемы"""
@@ -27,163 +230,579 @@ class ContentValidator:
         with open(schema_path, 'r', encoding='utf-8') as f:
             return json.load(f)
     
-    def add_error(self, message: str):
+    def get_validator(self, schema_name: str):
+        """
+        Валидатор для схемы (схема читается и проверяется один раз)
+        
+        jsonschema.validate на каждый вызов заново проверяет схему и
+        создаёт валидатор, поэтому объект валидатора кешируется.
+        """
+        validator = self._validators.get(schema_name)
+        if validator is None:
+            schema = self.load_schema(schema_name)
+            validator_class = jsonschema.validators.validator_for(schema)
+            validator_class.check_schema(schema)
+            validator = validator_class(schema)
+            self._validators[schema_name] = validator
+        return validator
+    
+    def schema_hash(self, schema_name: str) -> str:
+        """SHA-256 файла схемы (входит в ключ кеша)"""
+        digest = self._schema_hashes.get(schema_name)
+        if digest is None:
+            schema_path = self.schemas_dir / f"{schema_name}.schema.json"
+            digest = hashlib.sha256(schema_path.read_bytes()).hexdigest()
+            self._schema_hashes[schema_name] = digest
+        return digest
+    
+    def load_cache(self) -> Dict:
+        """Загрузка кеша результатов прошлой проверки"""
+        empty = {section: {} for section in self.CACHE_SECTIONS}
+        if not self.cache_path.exists():
+            return empty
+        try:
+            with open(self.cache_path, 'r', encoding='utf-8') as f:
+                cache = json.load(f)
+        except (json.JSONDecodeError, OSError):
+            return empty
+        if cache.get('version') != self.CACHE_VERSION:
+            return empty
+        return {section: cache.get(section, {}) for section in self.CACHE_SECTIONS}
+    
+    def save_cache(self):
+        """Атомарное сохранение кеша (только записи, встреченные в этом прогоне)"""
+        if not self.use_cache:
+            return
+        
+        # Без проверки видео результаты ffprobe из прошлых прогонов сохраняются
+        if not self.media:
+            self.new_cache['media'] = self.cache['media']
+        
+        # Все записи взяты из кеша и ничего не удалено - перезапись не нужна
+        unchanged = self.cache_misses == 0 and all(
+            self.new_cache[section].keys() == self.cache[section].keys()
+            for section in self.CACHE_SECTIONS
+        )
+        if unchanged and self.cache_path.exists():
+            return
+        
+        # json.dumps без отступов использует C-кодировщик, json.dump - нет
+        tmp_path = self.cache_path.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(json.dumps({"version": self.CACHE_VERSION, **self.new_cache}, ensure_ascii=False))
+        os.replace(tmp_path, self.cache_path)
+    
+    def lesson_cache_key(self, lesson: LessonRecord) -> Dict:
+        """Отпечаток всех файлов, от которых зависит результат проверки урока"""
+        return {
+            "metadata": lesson.file_identity("metadata.json"),
+            "video": lesson.file_identity("video.mp4"),
+            "thumbnail": lesson.file_identity("thumbnail.jpg"),
+            "description": lesson.file_identity("description.md"),
+            "schema": self.schema_hash('lesson')
+        }
+    
+    def report(self, finding: Finding):
+        """Запись замечания в поток вывода и в файл findings"""
+        if self._findings_file is None:
+            self._findings_file = open(self.findings_path, 'w', encoding='utf-8')
+        self._findings_file.write(json.dumps(finding.to_dict(), ensure_ascii=False) + "\n")
+        self.sink.emit(finding)
+        
+        if finding.severity == 'error':
+            self.error_count += 1
+            if self.fail_fast:
+                raise ValidationAborted(finding.message)
+        else:
+            self.warning_count += 1
+    
+    def add_error(self, message: str, code: str = "E000", entity: str = 'catalog',
+                  entity_id: Optional[str] = None, path: Optional[str] = None):
         """Добавление ошибки"""
-        self.errors.append(f"❌ {message}")
-        print(f"❌ {message}")
+        self.report(Finding(code, 'error', entity, entity_id, path, message))
     
-    def add_warning(self, message: str):
+    def add_warning(self, message: str, code: str = "W000", entity: str = 'catalog',
+                    entity_id: Optional[str] = None, path: Optional[str] = None):
         """Добавление предупреждения"""
-        self.warnings.append(f"⚠️  {message}")
-        print(f"⚠️  {message}")
+        self.report(Finding(code, 'warning', entity, entity_id, path, message))
+    
+    def apply_events(self, check: LessonCheck):
+        """Вывод сообщений и замечаний проверки (только из главного потока)"""
+        for event in check.events:
+            kind, message = event[0], event[1]
+            if kind == 'error':
+                self.add_error(message, event[2], check.entity, check.lesson_id, event[3])
+            elif kind == 'warning':
+                self.add_warning(message, event[2], check.entity, check.lesson_id, event[3])
+            else:
+                print(message)
     
-    def validate_json_schema(self, data: Dict, schema: Dict, item_name: str) -> bool:
+    def read_findings(self) -> Iterator[Finding]:
+        """Потоковое чтение замечаний текущего прогона"""
+        if self._findings_file is not None:
+            self._findings_file.flush()
+        if not self.findings_path.exists():
+            return
+        with open(self.findings_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                yield Finding(**json.loads(line))
+    
+    def schema_error(self, data: Dict, schema_name: str) -> Optional[str]:
+        """Текст ошибки валидации по JSON схеме или None"""
+        # best_match - та же ошибка, что выбрал бы jsonschema.validate
+        error = jsonschema.exceptions.best_match(self.get_validator(schema_name).iter_errors(data))
+        return None if error is None else error.message
+    
+    def validate_json_schema(self, data: Dict, schema_name: str, item_name: str) -> bool:
         """Валидация данных по JSON схеме"""
-        try:
-            jsonschema.validate(instance=data, schema=schema)
-            return True
-        except jsonschema.exceptions.ValidationError as e:
-            self.add_error(f"{item_name}: Ошибка схемы - {e.message}")
+        message = self.schema_error(data, schema_name)
+        if message is not None:
+            self.add_error(f"{item_name}: Ошибка схемы - {message}", "S001")
             return False
+        return True
     
-    def validate_lesson(self, lesson_path: Path) -> bool:
-        """Валидация одного урока"""
-        lesson_id = lesson_path.name.split('_')[0]
-        print(f"\n🔍 Проверка урока {lesson_id}: {lesson_path.name}")
+    def check_lesson(self, lesson: LessonRecord,
+                     schema_pool: Optional[Executor] = None) -> LessonCheck:
+        """
+        Проверка одного урока без изменения состояния валидатора
         
-        is_valid = True
+        Может выполняться в нескольких потоках одновременно.
         
-        # Проверка metadata.json
-        metadata_path = lesson_path / "metadata.json"
-        if not metadata_path.exists():
-            self.add_error(f"Урок {lesson_id}: Отсутствует metadata.json")
-            return False
+        Args:
+            lesson: Урок каталога
+            schema_pool: Пул процессов для проверки схемы (опционально)
+        """
+        lesson_path = lesson.path
+        lesson_id = lesson.id
+        check = LessonCheck(lesson_id=lesson_id, folder=lesson.folder)
+        
+        # Урок не менялся с прошлой проверки - берём результат из кеша
+        if self.use_cache:
+            check.cache_key = self.lesson_cache_key(lesson)
+            cached = self.cache['lessons'].get(lesson.folder)
+            if cached is not None and cached['key'] == check.cache_key:
+                check.replay(cached['events'])
+                check.found = cached['found']
+                check.from_cache = True
+                return check
         
-        with open(metadata_path, 'r', encoding='utf-8') as f:
-            metadata = json.load(f)
+        check.info(f"\n🔍 Проверка урока {lesson_id}: {lesson_path.name}")
+        
+        # Проверка metadata.json
+        metadata_path = lesson.metadata_path
+        with self.metrics.timer('validate.metadata', lesson.folder) as span:
+            metadata = lesson.metadata()
+            if self.metrics.enabled and metadata is not None:
+                span.bytes = lesson.file_identity(lesson.METADATA_NAME)[0]
+        if metadata is None:
+            check.error(f"Урок {lesson_id}: Отсутствует metadata.json", "L001", metadata_path)
+            return check
         
         # Валидация по схеме
-        schema = self.load_schema('lesson')
-        if not self.validate_json_schema(metadata, schema, f"Урок {lesson_id}"):
-            is_valid = False
+        with self.metrics.timer('validate.schema', lesson.folder):
+            if schema_pool is not None:
+                message = schema_pool.submit(_schema_error_in_worker, metadata, 'lesson').result()
+            else:
+                message = self.schema_error(metadata, 'lesson')
+        if message is not None:
+            check.error(f"Урок {lesson_id}: Ошибка схемы - {message}", "L002", metadata_path)
         
         # Проверка ID
         if metadata.get('id') != lesson_id:
-            self.add_error(f"Урок {lesson_id}: ID в метаданных ({metadata.get('id')}) не совпадает с папкой")
-            is_valid = False
+            check.error(f"Урок {lesson_id}: ID в метаданных ({metadata.get('id')}) не совпадает с папкой",
+                        "L003", metadata_path)
         
-        self.lesson_ids.add(lesson_id)
+        check.found = True
         
         # Проверка наличия видео
         video_path = lesson_path / "video.mp4"
-        if not video_path.exists():
-            self.add_warning(f"Урок {lesson_id}: Отсутствует видео файл")
+        video_identity = lesson.file_identity("video.mp4")
+        if video_identity is None:
+            check.warning(f"Урок {lesson_id}: Отсутствует видео файл", "L101", video_path)
         else:
             # Проверка размера видео
-            video_size_mb = video_path.stat().st_size / (1024 * 1024)
+            video_size_mb = video_identity[0] / (1024 * 1024)
             if video_size_mb < 1:
-                self.add_warning(f"Урок {lesson_id}: Видео слишком маленькое ({video_size_mb:.2f} MB)")
+                check.warning(f"Урок {lesson_id}: Видео слишком маленькое ({video_size_mb:.2f} MB)",
+                              "L102", video_path)
         
         # Проверка превью
         thumbnail_path = lesson_path / "thumbnail.jpg"
-        if not thumbnail_path.exists():
-            self.add_warning(f"Урок {lesson_id}: Отсутствует превью изображение")
+        if not lesson.has_file("thumbnail.jpg"):
+            check.warning(f"Урок {lesson_id}: Отсутствует превью изображение", "L103", thumbnail_path)
         
         # Проверка description.md
         description_path = lesson_path / "description.md"
-        if not description_path.exists():
-            self.add_warning(f"Урок {lesson_id}: Отсутствует description.md")
+        if not lesson.has_file("description.md"):
+            check.warning(f"Урок {lesson_id}: Отсутствует description.md", "L104", description_path)
         
         # Проверка длительности
         duration = metadata.get('duration', 0)
         if duration < 5 or duration > 90:
-            self.add_warning(f"Урок {lesson_id}: Необычная длительность ({duration} мин)")
+            check.warning(f"Урок {lesson_id}: Необычная длительность ({duration} мин)", "L105", metadata_path)
         
         # Проверка тегов
         tags = metadata.get('tags', [])
         if len(tags) < 2:
-            self.add_warning(f"Урок {lesson_id}: Мало тегов ({len(tags)})")
+            check.warning(f"Урок {lesson_id}: Мало тегов ({len(tags)})", "L106", metadata_path)
         
-        if is_valid:
-            print(f"  ✅ Урок {lesson_id} валиден")
+        if check.is_valid:
+            check.info(f"  ✅ Урок {lesson_id} валиден")
+        
+        return check
+    
+    def apply_check(self, check: LessonCheck) -> bool:
+        """Применение результата проверки урока (только из главного потока)"""
+        self.apply_events(check)
         
-        return is_valid
+        if check.found:
+            self.lesson_ids.add(check.lesson_id)
+        
+        if check.cache_key is not None:
+            if check.from_cache:
+                self.cache_hits += 1
+            else:
+                self.cache_misses += 1
+            self.new_cache['lessons'][check.folder] = {
+                "key": check.cache_key,
+                "events": check.events,
+                "found": check.found
+            }
+        return check.is_valid
+    
+    def validate_lesson(self, lesson: LessonRecord) -> bool:
+        """Валидация одного урока"""
+        return self.apply_check(self.timed_check(lesson))
+    
+    def timed_check(self, lesson: LessonRecord,
+                    schema_pool: Optional[Executor] = None) -> LessonCheck:
+        """check_lesson с замером времени урока"""
+        with self.metrics.timer('validate.lesson', lesson.folder):
+            return self.check_lesson(lesson, schema_pool)
     
     def validate_all_lessons(self) -> int:
         """Валидация всех уроков"""
-        lessons_dir = self.content_dir / "lessons"
+        lessons_dir = self.catalog.lessons_dir
         if not lessons_dir.exists():
-            self.add_error("Папка lessons не найдена")
+            self.add_error("Папка lessons не найдена", "G001", path=str(lessons_dir))
             return 0
         
         print("\n" + "=" * 60)
         print("📚 ВАЛИДАЦИЯ УРОКОВ")
         print("=" * 60)
         
+        lessons = self.catalog.lessons()
         valid_count = 0
-        total_count = 0
+        total_count = len(lessons)
         
-        for lesson_path in sorted(lessons_dir.iterdir()):
-            if lesson_path.is_dir() and not lesson_path.name.startswith('.'):
-                total_count += 1
-                if self.validate_lesson(lesson_path):
+        if self.jobs == 1 and not self.schema_processes:
+            for lesson in lessons:
+                if self.validate_lesson(lesson):
                     valid_count += 1
+        else:
+            with closing(self.check_lessons_concurrently(lessons)) as checks:
+                for check in checks:
+                    if self.apply_check(check):
+                        valid_count += 1
         
         print(f"\n✅ Валидных уроков: {valid_count}/{total_count}")
         return valid_count
     
-    def validate_program(self, program_path: Path) -> bool:
-        """Валидация программы"""
-        program_id = program_path.stem
-        print(f"\n🔍 Проверка программы {program_id}")
-        
-        is_valid = True
+    def check_lessons_concurrently(self, lessons: List[LessonRecord]) -> Iterator[LessonCheck]:
+        """
+        Параллельная проверка уроков
         
-        with open(program_path, 'r', encoding='utf-8') as f:
-            program_data = json.load(f)
-        
-        # Валидация по схеме
-        schema = self.load_schema('program')
-        if not self.validate_json_schema(program_data, schema, f"Программа {program_id}"):
-            is_valid = False
+        Чтение metadata.json и проверки файлов идут в пуле потоков (на сетевых
+        дисках время уходит на ожидание), проверка схем - в пуле процессов,
+        если он включён. Результаты отдаются в порядке уроков, как только готов
+        очередной, а в работе одновременно не больше jobs * LESSONS_WINDOW_FACTOR
+        уроков, поэтому отчёт пишется во время проверки и память не растёт
+        с размером каталога.
+        При закрытии генератора (например, ValidationAborted при --fail-fast)
+        ещё не начатые проверки отменяются.
+        """
+        # Компиляция схемы до запуска потоков
+        self.get_validator('lesson')
         
+        schema_pool = None
+        if self.schema_processes:
+            schema_pool = ProcessPoolExecutor(
+                max_workers=self.schema_processes,
+                initializer=_init_schema_worker,
+                initargs=(str(self.schemas_dir),)
+            )
+        executor = ThreadPoolExecutor(max_workers=self.jobs)
+        window = self.jobs * self.LESSONS_WINDOW_FACTOR
+        # Очередь в порядке отправки: результаты отдаются в порядке уроков
+        pending: Deque[Future] = deque()
+        try:
+            for lesson in lessons:
+                pending.append(executor.submit(self.timed_check, lesson, schema_pool))
+                if len(pending) >= window:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+        finally:
+            for future in pending:
+                future.cancel()
+            executor.shutdown(wait=True, cancel_futures=True)
+            if schema_pool is not None:
+                schema_pool.shutdown(cancel_futures=True)
+    
+    @staticmethod
+    def program_references(program_data: Dict) -> Dict:
+        """Данные программы, нужные для проверки ссылок на уроки"""
+        schedule = program_data.get('schedule', [])
+        return {
+            "lessons": program_data.get('lessons', []),
+            "schedule_lessons": sorted(set(item['lesson_id'] for item in schedule if 'lesson_id' in item)),
+            "duration_weeks": program_data.get('duration_weeks', 0),
+            "total_days": len(schedule)
+        }
+    
+    def check_program_references(self, check: LessonCheck, program_id: str,
+                                 references: Dict, program_path: Path):
+        """Проверка ссылок программы на уроки и расписания (зависит от lesson_ids)"""
         # Проверка ссылок на уроки
-        lessons = program_data.get('lessons', [])
+        lessons = references['lessons']
         for lesson_id in lessons:
             if lesson_id not in self.lesson_ids:
-                self.add_error(f"Программа {program_id}: Урок {lesson_id} не найден")
-                is_valid = False
+                check.error(f"Программа {program_id}: Урок {lesson_id} не найден", "P002", program_path)
         
         # Проверка расписания
-        schedule = program_data.get('schedule', [])
-        schedule_lessons = set(item['lesson_id'] for item in schedule if 'lesson_id' in item)
+        schedule_lessons = set(references['schedule_lessons'])
         
         # Все уроки из lessons должны быть в расписании
         for lesson_id in lessons:
             if lesson_id not in schedule_lessons:
-                self.add_warning(f"Программа {program_id}: Урок {lesson_id} не включён в расписание")
+                check.warning(f"Программа {program_id}: Урок {lesson_id} не включён в расписание",
+                              "P101", program_path)
         
         # Проверка длительности
-        duration_weeks = program_data.get('duration_weeks', 0)
-        total_days = len(schedule)
+        duration_weeks = references['duration_weeks']
+        total_days = references['total_days']
         expected_days = duration_weeks * 7
         
         if total_days != expected_days:
-            self.add_warning(
+            check.warning(
                 f"Программа {program_id}: Несоответствие длительности "
-                f"({duration_weeks} недель = {expected_days} дней, в расписании {total_days} дней)"
+                f"({duration_weeks} недель = {expected_days} дней, в расписании {total_days} дней)",
+                "P102", program_path
+            )
+    
+    def validate_program(self, program: ProgramRecord) -> bool:
+        """
+        Валидация программы
+        
+        Если файл программы и схема не менялись, проверка схемы берётся
+        из кеша, а заново выполняется только проверка ссылок на уроки.
+        """
+        program_path = program.path
+        program_id = program.id
+        check = LessonCheck(lesson_id=program_id, entity='program')
+        check.info(f"\n🔍 Проверка программы {program_id}")
+        
+        key = {"file": program.identity(), "schema": self.schema_hash('program')}
+        cached = self.cache['programs'].get(program_path.name)
+        
+        if self.use_cache and cached is not None and cached['key'] == key:
+            schema_events = cached['schema_events']
+            references = cached['references']
+            self.cache_hits += 1
+        else:
+            self.cache_misses += 1
+            with self.metrics.timer('validate.program', program_id):
+                program_data = program.data()
+                
+                # Валидация по схеме
+                message = self.schema_error(program_data, 'program')
+            schema_events = []
+            if message is not None:
+                schema_events.append(['error', f"Программа {program_id}: Ошибка схемы - {message}",
+                                      "P001", str(program_path)])
+            references = self.program_references(program_data)
+        
+        check.replay(schema_events)
+        self.check_program_references(check, program_id, references, program_path)
+        
+        if check.is_valid:
+            check.info(f"  ✅ Программа {program_id} валидна")
+        
+        if self.use_cache:
+            self.new_cache['programs'][program_path.name] = {
+                "key": key,
+                "schema_events": schema_events,
+                "references": references
+            }
+        
+        return self.apply_check(check)
+    
+    @staticmethod
+    def mp4_faststart(video_path: Path) -> Optional[bool]:
+        """
+        Проверка, что атом moov стоит до mdat (faststart)
+        
+        Читаются только заголовки атомов верхнего уровня. Если moov в конце
+        файла, плеер должен скачать всё видео до начала воспроизведения.
+        
+        Returns:
+            True - faststart, False - moov после mdat, None - не MP4 (или файл обрезан)
+        """
+        with open(video_path, 'rb') as f:
+            while True:
+                header = f.read(8)
+                if len(header) < 8:
+                    return None
+                size, kind = struct.unpack('>I4s', header)
+                header_size = 8
+                if size == 1:
+                    large_size = f.read(8)
+                    if len(large_size) < 8:
+                        return None
+                    size = struct.unpack('>Q', large_size)[0]
+                    header_size = 16
+                if kind == b'moov':
+                    return True
+                if kind == b'mdat':
+                    return False
+                if size < header_size:
+                    # size == 0 - атом до конца файла, дальше атомов нет
+                    return None
+                f.seek(size - header_size, os.SEEK_CUR)
+    
+    def probe_video(self, video_path: Path) -> Dict:
+        """Параметры видео через ffprobe (один запуск на файл)"""
+        with self.metrics.timer('validate.ffprobe', video_path.parent.name):
+            result = subprocess.run(
+                [
+                    'ffprobe', '-v', 'error',
+                    '-print_format', 'json',
+                    '-show_entries', 'format=duration,bit_rate:stream=codec_type,codec_name,width,height',
+                    str(video_path)
+                ],
+                capture_output=True,
+                text=True,
+                check=True
             )
+        data = json.loads(result.stdout)
+        video_stream = next(
+            (stream for stream in data.get('streams', []) if stream.get('codec_type') == 'video'), {}
+        )
+        media_format = data.get('format', {})
+        return {
+            "duration": float(media_format.get('duration', 0)),
+            "bit_rate": int(media_format.get('bit_rate', 0)),
+            "codec": video_stream.get('codec_name'),
+            "width": video_stream.get('width', 0),
+            "height": video_stream.get('height', 0),
+            "faststart": self.mp4_faststart(video_path)
+        }
+    
+    def check_media(self, lesson: LessonRecord) -> LessonCheck:
+        """
+        Проверка видео урока по профилю стриминга (выполняется в пуле потоков)
         
-        if is_valid:
-            print(f"  ✅ Программа {program_id} валидна")
+        Результат ffprobe кешируется по размеру и mtime видео, сами проверки
+        пересчитываются всегда, так как зависят от duration в metadata.json.
+        """
+        lesson_id = lesson.id
+        check = LessonCheck(lesson_id=lesson_id, folder=lesson.folder)
+        video_path = lesson.path / "video.mp4"
+        
+        check.cache_key = lesson.file_identity("video.mp4")
+        cached = self.cache['media'].get(lesson.folder)
+        if self.use_cache and cached is not None and cached['key'] == check.cache_key:
+            check.probe = cached['probe']
+            check.from_cache = True
+        else:
+            try:
+                check.probe = self.probe_video(video_path)
+            except subprocess.CalledProcessError as e:
+                check.error(f"Урок {lesson_id}: ffprobe не смог прочитать видео ({e.stderr.strip()})",
+                            "M001", video_path)
+                return check
+            except (json.JSONDecodeError, ValueError) as e:
+                check.error(f"Урок {lesson_id}: Некорректный ответ ffprobe ({e})", "M001", video_path)
+                return check
+        probe = check.probe
         
-        return is_valid
+        profile = self.MEDIA_PROFILE
+        metadata = lesson.metadata()
+        if metadata is not None:
+            declared = metadata.get('duration', 0)
+            actual = probe['duration'] / 60
+            if declared and abs(actual - declared) > declared * profile['duration_tolerance']:
+                check.warning(
+                    f"Урок {lesson_id}: Длительность видео {actual:.1f} мин "
+                    f"не совпадает с metadata.json ({declared} мин)",
+                    "M101", video_path
+                )
+        
+        if probe['codec'] not in profile['codecs']:
+            check.warning(f"Урок {lesson_id}: Кодек {probe['codec']} не подходит для стриминга "
+                          f"(ожидается {', '.join(profile['codecs'])})", "M102", video_path)
+        if probe['width'] < profile['min_width'] or probe['height'] < profile['min_height']:
+            check.warning(f"Урок {lesson_id}: Разрешение {probe['width']}x{probe['height']} "
+                          f"ниже {profile['min_width']}x{profile['min_height']}", "M103", video_path)
+        if not profile['min_bitrate'] <= probe['bit_rate'] <= profile['max_bitrate']:
+            check.warning(f"Урок {lesson_id}: Битрейт {probe['bit_rate'] / 1_000_000:.1f} Мбит/с "
+                          f"вне профиля ({profile['min_bitrate'] / 1_000_000:.1f}-"
+                          f"{profile['max_bitrate'] / 1_000_000:.1f} Мбит/с)", "M104", video_path)
+        if probe['faststart'] is False:
+            check.warning(f"Урок {lesson_id}: moov в конце файла, видео не оптимизировано для "
+                          f"стриминга (ffmpeg -i in.mp4 -c copy -movflags +faststart out.mp4)", "M105", video_path)
+        return check
+    
+    def validate_media(self) -> int:
+        """
+        Глубокая проверка видео всех уроков через ffprobe
+        
+        Returns:
+            Количество видео без замечаний
+        """
+        if not self.catalog.lessons_dir.exists():
+            return 0
+        
+        print("\n" + "=" * 60)
+        print("🎞  ПРОВЕРКА ВИДЕО")
+        print("=" * 60 + "\n")
+        
+        try:
+            subprocess.run(['ffprobe', '-version'], capture_output=True, check=True)
+        except (subprocess.CalledProcessError, FileNotFoundError):
+            self.add_warning("ffprobe не установлен, проверка видео пропущена", "G103")
+            return 0
+        
+        lessons = [lesson for lesson in self.catalog.lessons() if lesson.has_file("video.mp4")]
+        
+        clean_count = 0
+        executor = ThreadPoolExecutor(max_workers=self.media_jobs)
+        try:
+            for check in executor.map(self.check_media, lessons):
+                # apply_check не используется: он пишет в раздел кеша уроков
+                self.apply_events(check)
+                
+                if check.probe is not None and self.use_cache:
+                    self.new_cache['media'][check.folder] = {"key": check.cache_key, "probe": check.probe}
+                    if check.from_cache:
+                        self.cache_hits += 1
+                    else:
+                        self.cache_misses += 1
+                
+                if not check.events:
+                    clean_count += 1
+        finally:
+            # При --fail-fast не ждём оставшиеся запуски ffprobe
+            executor.shutdown(cancel_futures=True)
+        
+        print(f"\n✅ Видео без замечаний: {clean_count}/{len(lessons)}")
+        return clean_count
     
     def validate_all_programs(self) -> int:
         """Валидация всех программ"""
-        programs_dir = self.content_dir / "programs"
+        programs_dir = self.catalog.programs_dir
         if not programs_dir.exists():
-            self.add_warning("Папка programs не найдена")
+            self.add_warning("Папка programs не найдена", "G101", path=str(programs_dir))
             return 0
         
         print("\n" + "=" * 60)
@@ -193,9 +812,9 @@ class ContentValidator:
         valid_count = 0
         total_count = 0
         
-        for program_path in sorted(programs_dir.glob("*.json")):
+        for program in self.catalog.programs():
             total_count += 1
-            if self.validate_program(program_path):
+            if self.validate_program(program):
                 valid_count += 1
         
         print(f"\n✅ Валидных программ: {valid_count}/{total_count}")
@@ -203,9 +822,9 @@ class ContentValidator:
     
     def validate_categories(self):
         """Валидация категорий"""
-        categories_dir = self.content_dir / "categories"
+        categories_dir = self.catalog.categories_dir
         if not categories_dir.exists():
-            self.add_warning("Папка categories не найдена")
+            self.add_warning("Папка categories не найдена", "G102", path=str(categories_dir))
             return
         
         print("\n" + "=" * 60)
@@ -220,70 +839,159 @@ class ContentValidator:
             'relaxation.json'
         ]
         
+        found = {category.path.name for category in self.catalog.categories()}
         for category_file in expected_categories:
             category_path = categories_dir / category_file
-            if not category_path.exists():
-                self.add_warning(f"Категория {category_file} не найдена")
+            if category_file not in found:
+                self.add_warning(f"Категория {category_file} не найдена", "C101", 'category',
+                                 Path(category_file).stem, str(category_path))
             else:
                 print(f"  ✅ Категория {category_file} найдена")
     
     def generate_report(self):
-        """Генерация отчёта о валидации"""
+        """
+        Генерация отчёта о валидации
+        
+        Счётчики накоплены по ходу проверки, списки замечаний читаются
+        потоково из файла findings, поэтому память не зависит от их числа.
+        """
         print("\n" + "=" * 60)
         print("📊 ИТОГОВЫЙ ОТЧЁТ")
         print("=" * 60)
         
         print(f"\n📚 Всего уроков: {len(self.lesson_ids)}")
-        print(f"❌ Ошибок: {len(self.errors)}")
-        print(f"⚠️  Предупреждений: {len(self.warnings)}")
+        print(f"❌ Ошибок: {self.error_count}")
+        print(f"⚠️  Предупреждений: {self.warning_count}")
         
-        if self.errors:
+        if self.error_count:
             print("\n🔴 ОШИБКИ:")
-            for error in self.errors:
-                print(f"  {error}")
+            for finding in self.read_findings():
+                if finding.severity == 'error':
+                    print(f"  ❌ {finding.message}")
         
-        if self.warnings:
+        if self.warning_count:
             print("\n🟡 ПРЕДУПРЕЖДЕНИЯ:")
-            for warning in self.warnings:
-                print(f"  {warning}")
+            for finding in self.read_findings():
+                if finding.severity == 'warning':
+                    print(f"  ⚠️  {finding.message}")
         
-        if not self.errors and not self.warnings:
+        if not self.error_count and not self.warning_count:
             print("\n🎉 ВСЁ ОТЛИЧНО! Контент полностью валиден.")
-        elif not self.errors:
+        elif not self.error_count:
             print("\n✅ Критических ошибок нет. Есть предупреждения.")
         else:
             print("\n❌ Обнаружены критические ошибки. Требуется исправление.")
         
-        # Сохранение отчёта
+        # Сохранение отчёта (списки пишутся по одному элементу)
         report_path = self.content_dir / "validation_report.json"
         with open(report_path, 'w', encoding='utf-8') as f:
-            json.dump({
-                "total_lessons": len(self.lesson_ids),
-                "errors_count": len(self.errors),
-                "warnings_count": len(self.warnings),
-                "errors": self.errors,
-                "warnings": self.warnings
-            }, f, ensure_ascii=False, indent=2)
+            f.write('{\n')
+            f.write(f'  "total_lessons": {len(self.lesson_ids)},\n')
+            f.write(f'  "errors_count": {self.error_count},\n')
+            f.write(f'  "warnings_count": {self.warning_count},\n')
+            for severity, key, icon, last in (('error', 'errors', "❌ ", False),
+                                              ('warning', 'warnings', "⚠️  ", True)):
+                f.write(f'  "{key}": [')
+                first = True
+                for finding in self.read_findings():
+                    if finding.severity == severity:
+                        f.write('\n    ' if first else ',\n    ')
+                        f.write(json.dumps(icon + finding.message, ensure_ascii=False))
+                        first = False
+                f.write('\n  ]' if not first else ']')
+                f.write('\n' if last else ',\n')
+            f.write('}\n')
         
         print(f"\n📄 Отчёт сохранён: {report_path}")
+        print(f"📄 Замечания (JSON Lines): {self.findings_path}")
     
-    def run_full_validation(self):
-        """Запуск полной валидации"""
+    def run_full_validation(self) -> bool:
+        """
+        Запуск полной валидации
+        
+        Returns:
+            True, если ошибок нет
+        """
         print("\n" + "=" * 60)
         print("🚀 ЗАПУСК ПОЛНОЙ ВАЛИДАЦИИ КОНТЕНТА")
         print("=" * 60)
         
-        # Валидация уроков
-        self.validate_all_lessons()
+        self.start_run()
+        
+        aborted = False
+        try:
+            # Валидация уроков
+            self.validate_all_lessons()
+            
+            # Глубокая проверка видео (опционально)
+            if self.media:
+                self.validate_media()
+            
+            # Валидация программ
+            self.validate_all_programs()
+            
+            # Валидация категорий
+            self.validate_categories()
+        except ValidationAborted as e:
+            aborted = True
+            print(f"\n⛔ Валидация остановлена на первой ошибке: {e}")
+        
+        return self.finish_run(aborted)
+    
+    def start_run(self):
+        """Начало прогона: файл замечаний пересоздаётся на каждый прогон"""
+        if self.findings_path.exists():
+            self.findings_path.unlink()
+    
+    def seed_from_cache(self, revalidate: Set[str]):
+        """
+        Подготовка неполного прогона (pipeline.py --watch)
+        
+        Для уроков и программ, которые не проверяются заново, результаты
+        берутся из кеша: они остаются в кеше, а ID уроков - в lesson_ids
+        для проверки ссылок программ.
+        
+        Args:
+            revalidate: Папки уроков и имена файлов программ, которые будут проверены
+        """
+        lessons = {lesson.folder for lesson in self.catalog.lessons()}
+        for folder, entry in self.cache['lessons'].items():
+            if folder in lessons and folder not in revalidate:
+                self.new_cache['lessons'][folder] = entry
+                if entry['found']:
+                    self.lesson_ids.add(folder.split('_')[0])
+        
+        programs = {program.path.name for program in self.catalog.programs()}
+        for name, entry in self.cache['programs'].items():
+            if name in programs and name not in revalidate:
+                self.new_cache['programs'][name] = entry
+    
+    def finish_run(self, aborted: bool = False, report: bool = True) -> bool:
+        """
+        Завершение прогона: отчёт, закрытие файла замечаний, сохранение кеша
         
-        # Валидация программ
-        self.validate_all_programs()
+        Args:
+            aborted: Прогон прерван (--fail-fast), кеш не сохраняется
+            report: Записать validation_report.json (не нужен для неполного прогона)
         
-        # Валидация категорий
-        self.validate_categories()
+        Returns:
+            True, если ошибок нет
+        """
+        self.sink.close()
         
         # Генерация отчёта
-        self.generate_report()
+        if report:
+            self.generate_report()
+        if self._findings_file is not None:
+            self._findings_file.close()
+            self._findings_file = None
+        
+        # Кеш после прерванного прогона неполный - не сохраняем
+        if self.use_cache and not aborted:
+            self.save_cache()
+            print(f"♻️  Из кеша: {self.cache_hits} (проверок без изменений)")
+        
+        return self.error_count == 0
 
 
 def main():
@@ -292,15 +1000,47 @@ def main():
     parser = argparse.ArgumentParser(description='Валидация контента йога-приложения')
     parser.add_argument('--content', default='./content', help='Папка с контентом')
     parser.add_argument('--schemas', default='./schemas', help='Папка со схемами')
+    parser.add_argument('--jobs', type=int, default=1,
+                        help='Количество потоков для проверки уроков (по умолчанию 1)')
+    parser.add_argument('--schema-processes', type=int, default=0,
+                        help='Количество процессов для проверки схем (по умолчанию 0 - в потоках)')
+    parser.add_argument('--media', action='store_true',
+                        help='Глубокая проверка видео через ffprobe (длительность, кодек, битрейт, faststart)')
+    parser.add_argument('--media-jobs', type=int, default=os.cpu_count(),
+                        help='Количество параллельных запусков ffprobe (по умолчанию число ядер CPU)')
+    parser.add_argument('--format', choices=sorted(SINKS), default='human',
+                        help='Формат замечаний в stdout: human (по умолчанию), jsonl или sarif; '
+                             'в режимах jsonl/sarif остальной вывод идёт в stderr')
+    parser.add_argument('--fail-fast', action='store_true',
+                        help='Остановить валидацию на первой ошибке')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='Проверить весь каталог заново, не используя кеш результатов')
+    add_arguments(parser)
     
     args = parser.parse_args()
     
-    validator = ContentValidator(
-        content_dir=args.content,
-        schemas_dir=args.schemas
-    )
+    # В машиночитаемых режимах stdout занят потоком замечаний
+    sink = SINKS[args.format](sys.stdout)
+    progress = sys.stdout if args.format == 'human' else sys.stderr
+    
+    with instrumented(args, 'validate_content', progress) as metrics:
+        validator = ContentValidator(
+            content_dir=args.content,
+            schemas_dir=args.schemas,
+            jobs=args.jobs,
+            schema_processes=args.schema_processes,
+            use_cache=not args.no_cache,
+            media=args.media,
+            media_jobs=args.media_jobs,
+            sink=sink,
+            fail_fast=args.fail_fast,
+            metrics=metrics
+        )
+        
+        with redirect_stdout(progress):
+            is_valid = validator.run_full_validation()
     
-    validator.run_full_validation()
+    sys.exit(0 if is_valid else 1)
 
 
 if __name__ == '__main__':